@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+LLM-WebKit JSON 约束 logits processor 的 CPU 微基准
+
+对比 TokenStateManager.process_logit（逐个 .item() + 新建 -inf 张量）与
+JsonConstraintLogitsProcessor（预计算索引张量 + 原地 fill_）在模拟解码过程中的每步耗时。
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import torch
+
+from webmainbench.extractors.llm_webkit_extractor import (
+    TokenStateManager, JsonConstraintTable, JsonConstraintLogitsProcessor
+)
+
+VOCAB_SIZE = 151936  # Qwen 词表大小
+
+
+class FakeTokenizer:
+    """只包含约束所需token的简易tokenizer"""
+
+    def __init__(self):
+        tokens = ["{", "}", ' "', '":"', '",', "main", "other"] + [str(d) for d in range(10)]
+        self.token_to_id = {token: 1000 + i for i, token in enumerate(tokens)}
+        self.id_to_token = {i: token for token, i in self.token_to_id.items()}
+
+    def encode(self, text):
+        return [self.token_to_id[text]]
+
+    def decode(self, ids):
+        return "".join(self.id_to_token[i] for i in ids)
+
+
+def make_prompt(tokenizer, item_count, prompt_length):
+    """构造以 item 数量结尾的提示token序列"""
+    count_ids = [tokenizer.token_to_id[c] for c in str(item_count)]
+    filler = [7] * (prompt_length - len(JsonConstraintTable.MAX_COUNT_PATTERN) - len(count_ids))
+    return filler + list(JsonConstraintTable.MAX_COUNT_PATTERN) + count_ids
+
+
+def run_decode(processor, prompt, max_steps):
+    """贪心解码直到结束token，返回步数和总耗时"""
+    torch.manual_seed(0)
+    output_ids = []
+    elapsed = 0.0
+    for _ in range(max_steps):
+        logits = torch.randn(VOCAB_SIZE)
+        start = time.perf_counter()
+        logits = processor(prompt, output_ids, logits)
+        elapsed += time.perf_counter() - start
+        next_id = int(torch.argmax(logits))
+        if next_id == JsonConstraintTable.EOS_TOKEN_ID:
+            break
+        output_ids.append(next_id)
+    return len(output_ids) + 1, elapsed
+
+
+def main():
+    tokenizer = FakeTokenizer()
+    table = JsonConstraintTable(tokenizer)
+    manager = TokenStateManager(tokenizer)
+
+    for item_count, prompt_length in [(50, 8000), (300, 30000)]:
+        prompt = make_prompt(tokenizer, item_count, prompt_length)
+        max_steps = item_count * 6 + 10
+
+        # 预热索引张量表
+        run_decode(JsonConstraintLogitsProcessor(table), prompt, max_steps)
+
+        old_steps, old_time = run_decode(manager.process_logit, prompt, max_steps)
+        new_steps, new_time = run_decode(JsonConstraintLogitsProcessor(table), prompt, max_steps)
+        assert old_steps == new_steps
+
+        print(f"items={item_count}, prompt_tokens={prompt_length}, steps={new_steps}")
+        print(f"  TokenStateManager:             {old_time / old_steps * 1e6:10.1f} us/step")
+        print(f"  JsonConstraintLogitsProcessor: {new_time / new_steps * 1e6:10.1f} us/step")
+        print(f"  加速比: {old_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
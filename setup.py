@@ -57,6 +57,15 @@ setup(
         "unstructured": [
             "unstructured>=0.10.0",
         ],
+        "parquet": [
+            "pyarrow>=10.0.0",
+        ],
+        "zstd": [
+            "zstandard>=0.15.0",
+        ],
+        "orjson": [
+            "orjson>=3.6.0",
+        ],
         "dev": [
             "pytest>=7.0",
             "pytest-cov>=4.0",
@@ -0,0 +1,355 @@
+#!/usr/bin/env python
+"""测试数据集加载与索引"""
+
+import json
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+
+from webmainbench.data import (
+    BenchmarkDataset, DataLoader, DataSample, DataSaver, JsonlIndex, LazyBenchmarkDataset
+)
+from webmainbench.data.compression import open_file
+
+
+def write_dataset(file_path, num_samples: int = 20) -> None:
+    """写入带空行和无效行的测试数据集"""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        for i in range(num_samples):
+            f.write(json.dumps({
+                "track_id": f"id-{i:03d}",
+                "html": f"<html><body><p>第 {i} 个样本</p></body></html>",
+                "groundtruth_content": f"第 {i} 个样本",
+                "groundtruth_content_list": [],
+                "content_type": ["article", "forum", "blog"][i % 3],
+            }, ensure_ascii=False) + '\n')
+            if i == 7:
+                f.write('{"unknown_field": 1}\n')
+
+
+class TestJsonlIndex(unittest.TestCase):
+    """测试JSONL字节偏移索引"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.jsonl_path = Path(self.tmp_dir.name) / "dataset.jsonl"
+        write_dataset(self.jsonl_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_random_access(self):
+        """测试按id读取单个样本，索引保存后可直接加载"""
+        index = JsonlIndex.open(self.jsonl_path)
+        self.assertTrue(JsonlIndex.index_path(self.jsonl_path).exists())
+        self.assertEqual(len(index), 20)
+
+        sample = JsonlIndex.load(self.jsonl_path).get_sample("id-013")
+        self.assertEqual(sample.id, "id-013")
+        self.assertEqual(sample.groundtruth_content, "第 13 个样本")
+        self.assertIsNone(index.get_sample("missing"))
+
+    def test_stale_index_is_rebuilt(self):
+        """测试数据集文件修改后旧索引失效"""
+        JsonlIndex.open(self.jsonl_path)
+        write_dataset(self.jsonl_path, num_samples=5)
+        self.assertIsNone(JsonlIndex.load(self.jsonl_path))
+        self.assertEqual(len(JsonlIndex.open(self.jsonl_path)), 5)
+
+    def test_indexed_stream_matches_plain_stream(self):
+        """测试使用索引的流式读取与逐行解析结果一致"""
+        cases = [
+            {},
+            {"categories": ["forum", "blog"], "max_samples": 6},
+            {"skip_ids": {"id-001", "id-004"}, "shard_index": 1, "num_shards": 3},
+            {"categories": ["article"], "shard_index": 2, "num_shards": 3, "shard_by": "range"},
+        ]
+        for kwargs in cases:
+            with self.subTest(**{k: str(v) for k, v in kwargs.items()}):
+                plain = DataLoader.stream_jsonl_batched(self.jsonl_path, batch_size=4, **kwargs)
+                indexed = DataLoader.stream_jsonl_batched(self.jsonl_path, batch_size=4, use_index=True, **kwargs)
+                self.assertEqual([[s.to_dict() for s in batch] for batch in indexed],
+                                 [[s.to_dict() for s in batch] for batch in plain])
+
+
+class TestBenchmarkDataset(unittest.TestCase):
+    """测试数据集按id查找"""
+
+    def test_get_sample_after_direct_modification(self):
+        """测试 get_sample 返回第一个匹配的样本，且 samples 被直接修改后仍然正确"""
+        dataset = BenchmarkDataset(name="test")
+        first = DataSample(id="a", html="", groundtruth_content="1", groundtruth_content_list=[])
+        dataset.add_sample(first)
+        dataset.add_sample(DataSample(id="a", html="", groundtruth_content="2", groundtruth_content_list=[]))
+        self.assertIs(dataset.get_sample("a"), first)
+
+        dataset.samples.append(DataSample(id="b", html="", groundtruth_content="3", groundtruth_content_list=[]))
+        self.assertEqual(dataset.get_sample("b").groundtruth_content, "3")
+        dataset.samples.pop(0)
+        self.assertEqual(dataset.get_sample("a").groundtruth_content, "2")
+
+        # 整体替换为相同长度的新列表
+        replacement = [DataSample(id=f"b{i}", html="", groundtruth_content=str(i), groundtruth_content_list=[])
+                       for i in range(2)]
+        dataset.samples = replacement
+        self.assertIsNone(dataset.get_sample("a"))
+        self.assertIs(dataset.get_sample("b0"), replacement[0])
+
+        # 原地替换某个元素（长度不变）
+        dataset.samples[1] = DataSample(id="c", html="", groundtruth_content="c", groundtruth_content_list=[])
+        self.assertIsNone(dataset.get_sample("b1"))
+        self.assertEqual(dataset.get_sample("c").groundtruth_content, "c")
+        dataset.samples[1] = DataSample(id="b0", html="", groundtruth_content="dup", groundtruth_content_list=[])
+        self.assertIs(dataset.get_sample("b0"), replacement[0])
+        self.assertIsNone(dataset.get_sample("c"))
+
+    def test_from_dict_mapping_and_slots(self):
+        """测试 from_dict 的字段映射、忽略未知字段，以及样本没有 __dict__"""
+        sample = DataSample.from_dict({
+            "track_id": "a", "html": "<p>x</p>", "content": "x", "content_list": [{"type": "paragraph"}],
+            "language": "en", "layout_id": 3, "max_layer_n": 4,
+        })
+        self.assertEqual(sample.id, "a")
+        self.assertEqual(sample.groundtruth_content, "x")
+        self.assertEqual(sample.groundtruth_content_list, [{"type": "paragraph"}])
+        self.assertIsNone(sample.content_list)
+        self.assertEqual(sample.language, "en")
+        self.assertFalse(hasattr(sample, "__dict__"))
+        with self.assertRaises(AttributeError):
+            sample.layout_id = 3
+
+        sample.extracted_results = {"score": 1.0}
+        restored = pickle.loads(pickle.dumps(sample))
+        self.assertEqual(restored, sample)
+
+
+class TestLazyDataset(unittest.TestCase):
+    """测试基于 mmap 的惰性数据集"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.jsonl_path = Path(self.tmp_dir.name) / "dataset.jsonl"
+        write_dataset(self.jsonl_path)
+        self.eager = DataLoader.load_jsonl(self.jsonl_path)
+        self.lazy = DataLoader.load_jsonl(self.jsonl_path, lazy=True, cache_size=2)
+
+    def tearDown(self):
+        self.lazy.close()
+        self.tmp_dir.cleanup()
+
+    def test_lazy_samples_match_eager(self):
+        """测试惰性样本的字段与完整加载一致，且只缓存少量解码后的样本"""
+        self.assertIsInstance(self.lazy, LazyBenchmarkDataset)
+        self.assertEqual(len(self.lazy), len(self.eager))
+        for lazy_sample, sample in zip(self.lazy, self.eager):
+            self.assertNotIn("html", vars(lazy_sample))
+            self.assertEqual(lazy_sample.to_dict(), sample.to_dict())
+        self.assertLessEqual(len(self.lazy._cache), 2)
+        self.assertEqual(self.lazy.get_sample("id-005").html, self.eager.get_sample("id-005").html)
+
+    def test_open_without_decoding_records(self):
+        """测试已有索引时打开惰性数据集不解码任何记录，轻量字段来自索引"""
+        from unittest import mock
+        from webmainbench.data import lazy
+
+        with mock.patch.object(lazy, "loads", side_effect=AssertionError), \
+                mock.patch.object(DataSample, "from_dict", side_effect=AssertionError):
+            dataset = LazyBenchmarkDataset(self.jsonl_path)
+        with dataset:
+            self.assertEqual([(s.id, s.language, s.content_type) for s in dataset],
+                             [(s.id, s.language, s.content_type) for s in self.eager])
+            self.assertEqual(dataset[2].html, self.eager[2].html)
+
+    def test_pickle_and_assignment(self):
+        """测试序列化得到完整的 DataSample，赋值只修改当前样本"""
+
+        sample = self.lazy[3]
+        restored = pickle.loads(pickle.dumps(sample))
+        self.assertIs(type(restored), DataSample)
+        self.assertEqual(restored, self.eager[3])
+
+        sample.html = "<p>changed</p>"
+        self.assertEqual(sample.html, "<p>changed</p>")
+        self.assertEqual(self.lazy[4].html, self.eager[4].html)
+
+    def test_evaluate_lazy_dataset(self):
+        """测试在惰性数据集上评测（含多进程）与完整加载的结果一致"""
+        from webmainbench.evaluator import Evaluator
+
+        evaluator = Evaluator()
+        eager = evaluator.evaluate(self.eager, "trafilatura")
+        lazy = evaluator.evaluate(self.lazy, "trafilatura", num_workers=2)
+        strip_time = lambda results: [
+            {k: v for k, v in r.items() if k != 'extraction_time'} for r in results
+        ]
+        self.assertEqual(strip_time(lazy.sample_results), strip_time(eager.sample_results))
+        self.assertEqual(lazy.overall_metrics, eager.overall_metrics)
+
+
+def _is_pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+@unittest.skipUnless(_is_pyarrow_available(), "跳过：需要pyarrow")
+class TestParquetDataset(unittest.TestCase):
+    """测试Parquet列式数据集"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        jsonl_path = Path(self.tmp_dir.name) / "dataset.jsonl"
+        self.parquet_path = Path(self.tmp_dir.name) / "dataset.parquet"
+        write_dataset(jsonl_path)
+        self.dataset = DataLoader.load_jsonl(jsonl_path)
+        self.dataset.samples[0].tags = ["table"]
+        DataSaver.save_parquet(self.dataset, self.parquet_path, row_group_size=6)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        """测试保存后完整读取与原数据集一致"""
+        loaded = DataLoader.load_parquet(self.parquet_path)
+        self.assertEqual([s.to_dict() for s in loaded], [s.to_dict() for s in self.dataset])
+
+    def test_projection_and_filters(self):
+        """测试只读取指定列，过滤条件与逐个样本过滤一致"""
+        loaded = DataLoader.load_parquet(self.parquet_path, columns=["groundtruth_content", "content_type"],
+                                         categories=["forum", "blog"], max_samples=5)
+        expected = [s for s in self.dataset if s.content_type in ("forum", "blog")][:5]
+        self.assertEqual([s.id for s in loaded], [s.id for s in expected])
+        self.assertEqual([s.groundtruth_content for s in loaded], [s.groundtruth_content for s in expected])
+        self.assertTrue(all(s.html is None and s.url is None for s in loaded))
+
+        batches = list(DataLoader.stream_parquet_batched(self.parquet_path, batch_size=4, columns=["html"],
+                                                         languages=["zh"]))
+        self.assertEqual(batches, [])
+        with self.assertRaises(ValueError):
+            DataLoader.load_parquet(self.parquet_path, columns=["missing"])
+
+    def test_rescore_from_parquet(self):
+        """测试用Parquet groundtruth重新打分与JSONL一致"""
+        from webmainbench.evaluator import Evaluator
+
+        evaluator = Evaluator()
+        original = evaluator.evaluate(self.dataset, "trafilatura")
+        results_path = Path(self.tmp_dir.name) / "results.json"
+        DataSaver.save_evaluation_results(original, results_path, include_content=True)
+        rescored = evaluator.rescore(results_path, self.parquet_path)
+        self.assertEqual(rescored.overall_metrics, original.overall_metrics)
+        self.assertEqual(rescored.category_metrics, original.category_metrics)
+
+
+def _is_zstandard_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class TestCompressedFiles(unittest.TestCase):
+    """测试按扩展名透明压缩的数据集与结果文件"""
+
+    SUFFIXES = [".gz", ".bz2", ".xz"] + ([".zst"] if _is_zstandard_available() else [])
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.jsonl_path = Path(self.tmp_dir.name) / "dataset.jsonl"
+        write_dataset(self.jsonl_path)
+        self.dataset = DataLoader.load_jsonl(self.jsonl_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_dataset_round_trip(self):
+        """测试压缩数据集的保存、加载与流式读取"""
+        plain_path = Path(self.tmp_dir.name) / "saved.jsonl"
+        DataSaver.save_jsonl(self.dataset, plain_path)
+        expected = [s.to_dict() for s in DataLoader.load_jsonl(plain_path)]
+        for suffix in self.SUFFIXES:
+            with self.subTest(suffix=suffix):
+                path = Path(self.tmp_dir.name) / f"saved.jsonl{suffix}"
+                DataSaver.save_jsonl(self.dataset, path)
+                self.assertNotIn(b"groundtruth_content", path.read_bytes())
+
+                loaded = DataLoader.load_jsonl(path)
+                self.assertEqual(loaded.name, "saved")
+                self.assertEqual([s.to_dict() for s in loaded], expected)
+                compressed_path = Path(self.tmp_dir.name) / f"dataset.jsonl{suffix}"
+                with open(self.jsonl_path, 'rb') as src, open_file(compressed_path, 'wb') as dst:
+                    dst.write(src.read())
+                batches = DataLoader.stream_jsonl_batched(compressed_path, batch_size=6, categories=["blog"],
+                                                          shard_index=0, num_shards=2, shard_by="range")
+                plain = DataLoader.stream_jsonl_batched(self.jsonl_path, batch_size=6, categories=["blog"],
+                                                        shard_index=0, num_shards=2, shard_by="range")
+                self.assertEqual([[s.id for s in b] for b in batches], [[s.id for s in b] for b in plain])
+
+    def test_results_append_and_stream(self):
+        """测试压缩结果文件的追加写入、流式写入与读取"""
+        results = [{"sample_id": f"id-{i}", "extracted_content": "内容" * i} for i in range(5)]
+        for suffix in self.SUFFIXES:
+            with self.subTest(suffix=suffix):
+                appended = Path(self.tmp_dir.name) / f"appended.jsonl{suffix}"
+                DataSaver.append_intermediate_results(results[:2], appended)
+                DataSaver.append_intermediate_results(results[2:], appended)
+                self.assertEqual(list(DataLoader.stream_sample_results(appended)), results)
+
+                streamed = Path(self.tmp_dir.name) / f"streamed.jsonl{suffix}"
+                with DataSaver.create_streaming_writer(streamed) as writer:
+                    for result in results:
+                        writer.write_result(result)
+                self.assertEqual(list(DataLoader.stream_sample_results(streamed)), results)
+
+                saved = Path(self.tmp_dir.name) / f"results.json{suffix}"
+                DataSaver.save_evaluation_results({"sample_results": results}, saved, include_content=True)
+                self.assertEqual(list(DataLoader.stream_sample_results(saved)), results)
+
+    def test_index_rejects_compressed_file(self):
+        """测试压缩文件不能建立字节偏移索引"""
+        path = Path(self.tmp_dir.name) / "dataset.jsonl.gz"
+        DataSaver.save_jsonl(self.dataset, path)
+        with self.assertRaises(ValueError):
+            JsonlIndex.open(path)
+
+
+class TestSerialization(unittest.TestCase):
+    """测试JSON序列化层与标准库结果一致"""
+
+    def test_loads_matches_stdlib(self):
+        """测试快速后端拒绝的输入回退到标准库，解码结果一致"""
+        from webmainbench.data import serialization
+
+        documents = [
+            '{"id": "a", "html": "<p>中文</p>", "score": 0.1, "n": 3}',
+            '{"big": 123456789012345678901234567890}',
+            '{"score": NaN, "inf": Infinity}',
+            '"\\ud800"',
+        ]
+        for document in documents:
+            for data in (document, document.encode('utf-8')):
+                with self.subTest(data=data):
+                    expected = json.loads(document)
+                    result = serialization.loads(data)
+                    if isinstance(expected, dict) and "inf" in expected:
+                        self.assertNotEqual(result["score"], result["score"])
+                        self.assertEqual(result["inf"], expected["inf"])
+                    else:
+                        self.assertEqual(result, expected)
+                        self.assertEqual(repr(result), repr(expected))
+
+    def test_dumps_byte_identical(self):
+        """测试编码结果与 json.dumps(ensure_ascii=False) 逐字节一致"""
+        from webmainbench.data import serialization
+
+        record = {"sample_id": "a", "score": 1e-05, "content": "中文\u2028\t", "metrics": {"x": [1, 2.5, None]}}
+        self.assertEqual(serialization.dumps_line(record), json.dumps(record, ensure_ascii=False) + '\n')
+        self.assertEqual(serialization.dumps(record, indent=2), json.dumps(record, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
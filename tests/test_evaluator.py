@@ -0,0 +1,548 @@
+#!/usr/bin/env python
+"""测试评测器（串行与并行评测）"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from webmainbench.data import BenchmarkDataset, DataSample, DataSaver
+from webmainbench.evaluator import Evaluator
+from webmainbench.extractors import ExtractorFactory
+
+
+def _make_sample(i: int) -> DataSample:
+    """构造一个包含文本、代码、公式和表格的测试样本"""
+    groundtruth = f"""# 标题 {i}
+
+这是第 {i} 个样本的正文内容。
+
+```python
+print({i})
+```
+
+公式: $x_{i} = {i}$
+
+| A | B |
+|---|---|
+| {i} | {i * 2} |
+"""
+    predicted = groundtruth.replace("正文内容", "正文").replace(f"| {i * 2} |", f"| {i * 3} |")
+    return DataSample(
+        id=f"sample-{i:03d}",
+        html=f"<html><body><h1>标题 {i}</h1><p>这是第 {i} 个样本的正文内容。</p></body></html>",
+        groundtruth_content=groundtruth,
+        groundtruth_content_list=[],
+        llm_webkit_md=predicted if i % 5 else "",
+        url=f"https://example.com/{i}",
+        language="zh",
+        content_type=["article", "forum", "blog"][i % 3],
+    )
+
+
+def make_dataset(num_samples: int = 12) -> BenchmarkDataset:
+    """构造测试数据集"""
+    dataset = BenchmarkDataset(name="test_dataset")
+    for i in range(num_samples):
+        dataset.add_sample(_make_sample(i))
+    return dataset
+
+
+def write_jsonl(samples, file_path) -> None:
+    """将样本写成数据集JSONL格式"""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        for sample in samples:
+            f.write(json.dumps({
+                "id": sample.id,
+                "html": sample.html,
+                "groundtruth_content": sample.groundtruth_content,
+                "groundtruth_content_list": sample.groundtruth_content_list,
+                "url": sample.url,
+                "language": sample.language,
+                "content_type": sample.content_type,
+            }, ensure_ascii=False) + '\n')
+
+
+class TestParallelEvaluation(unittest.TestCase):
+    """测试多进程评测与串行评测结果一致"""
+
+    def setUp(self):
+        self.dataset = make_dataset()
+        self.evaluator = Evaluator()
+
+    def test_parallel_matches_serial(self):
+        """测试 num_workers 模式与串行结果一致"""
+        serial = self.evaluator.evaluate(self.dataset, ExtractorFactory.create("test-model"))
+        parallel = self.evaluator.evaluate(
+            self.dataset, ExtractorFactory.create("test-model"), num_workers=2, chunk_size=3
+        )
+
+        self.assertEqual(
+            [r['sample_id'] for r in parallel.sample_results],
+            [s.id for s in self.dataset.samples]
+        )
+        self.assertEqual(parallel.sample_results, serial.sample_results)
+        self.assertEqual(parallel.overall_metrics, serial.overall_metrics)
+        self.assertEqual(parallel.category_metrics, serial.category_metrics)
+        self.assertEqual(parallel.error_analysis, serial.error_analysis)
+
+    def test_parallel_batched_matches_serial(self):
+        """测试分批评测的 num_workers 模式与串行结果一致"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            jsonl_path = Path(tmp_dir) / "dataset.jsonl"
+            write_jsonl(self.dataset.samples, jsonl_path)
+
+            serial = self.evaluator.evaluate_batched(jsonl_path, "trafilatura", batch_size=5)
+            parallel = self.evaluator.evaluate_batched(
+                jsonl_path, "trafilatura", batch_size=5, num_workers=2
+            )
+
+        strip_time = lambda results: [
+            {k: v for k, v in r.items() if k != 'extraction_time'} for r in results
+        ]
+        self.assertEqual(strip_time(parallel.sample_results), strip_time(serial.sample_results))
+        self.assertEqual(parallel.overall_metrics, serial.overall_metrics)
+
+
+class TestPipelineEvaluation(unittest.TestCase):
+    """测试流水线模式与串行评测结果一致"""
+
+    def setUp(self):
+        self.dataset = make_dataset()
+        self.evaluator = Evaluator()
+
+    def test_pipeline_matches_serial(self):
+        """测试多线程抽取、多进程指标计算的流水线结果与串行一致"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            jsonl_path = Path(tmp_dir) / "dataset.jsonl"
+            write_jsonl(self.dataset.samples, jsonl_path)
+
+            serial = self.evaluator.evaluate_batched(jsonl_path, "trafilatura", batch_size=4)
+            pipelined = self.evaluator.evaluate_batched(
+                jsonl_path, "trafilatura", batch_size=4,
+                pipeline=True, queue_size=1, extract_workers=2, metric_workers=2
+            )
+
+        strip_time = lambda results: [
+            {k: v for k, v in r.items() if k != 'extraction_time'} for r in results
+        ]
+        self.assertEqual(strip_time(pipelined.sample_results), strip_time(serial.sample_results))
+        self.assertEqual(pipelined.overall_metrics, serial.overall_metrics)
+
+    def test_pipeline_bounds_items_in_flight(self):
+        """测试首个条目很慢时，读取端不会无限超前（重排缓冲有上限）"""
+        import threading
+        import time
+        from webmainbench.evaluator.pipeline import Stage, StagedPipeline
+
+        first_done = threading.Event()
+        read = []
+
+        def source():
+            for i in range(100):
+                read.append(i)
+                yield i
+
+        def slow_first(x):
+            if x == 0:
+                time.sleep(0.5)
+                first_done.set()
+            return x * 2
+
+        pipeline = StagedPipeline([Stage("work", slow_first, workers=3)], queue_size=2)
+        outputs = pipeline.run(source())
+        self.assertEqual(next(outputs), 0)
+        # 首个条目产出前，在途条目数不超过 queue_size + workers
+        self.assertTrue(first_done.is_set())
+        self.assertLessEqual(len(read), 2 + 3 + 1)
+        self.assertEqual(list(outputs), [x * 2 for x in range(1, 100)])
+
+    def test_pipeline_rejects_num_workers(self):
+        """测试流水线模式不能与 num_workers 同时使用"""
+        with self.assertRaises(ValueError):
+            self.evaluator.evaluate_batched(
+                "unused.jsonl", "trafilatura", pipeline=True, num_workers=2
+            )
+
+
+class TestRescore(unittest.TestCase):
+    """测试只重新计算指标的rescore模式"""
+
+    def setUp(self):
+        self.dataset = make_dataset()
+        self.evaluator = Evaluator()
+        self.original = self.evaluator.evaluate(self.dataset, ExtractorFactory.create("test-model"))
+
+    def test_rescore_json_matches_original(self):
+        """测试从保存的JSON结果重新打分与原始评测一致"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results_path = Path(tmp_dir) / "results.json"
+            DataSaver.save_evaluation_results(self.original, results_path, include_content=True)
+            rescored = self.evaluator.rescore(results_path, self.dataset, extractor_name="test-model")
+
+        self.assertEqual(rescored.extractor_name, "test-model")
+        self.assertEqual(rescored.sample_results, self.original.sample_results)
+        self.assertEqual(rescored.overall_metrics, self.original.overall_metrics)
+        self.assertEqual(rescored.category_metrics, self.original.category_metrics)
+
+    def test_rescore_jsonl_with_new_metric(self):
+        """测试从JSONL样本结果重新打分时使用新的指标配置，且跳过不在数据集中的样本"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results_path = Path(tmp_dir) / "results.jsonl"
+            extra = {'sample_id': 'unknown', 'extraction_success': True, 'extracted_content': 'x'}
+            DataSaver.append_intermediate_results(self.original.sample_results + [extra], results_path)
+
+            evaluator = Evaluator()
+            evaluator.metric_calculator.remove_metric("table_TEDS")
+            rescored = evaluator.rescore(results_path, self.dataset, num_workers=2)
+
+        self.assertEqual(rescored.extractor_name, "results")
+        self.assertEqual(rescored.total_samples, len(self.dataset.samples))
+        for original, result in zip(self.original.sample_results, rescored.sample_results):
+            self.assertEqual(result['sample_id'], original['sample_id'])
+            self.assertEqual(result['extraction_success'], original['extraction_success'])
+            if result['extraction_success']:
+                self.assertNotIn("table_TEDS", result['metrics'])
+                self.assertEqual(result['metrics']['text_edit'], original['metrics']['text_edit'])
+
+
+class TestMetricAggregator(unittest.TestCase):
+    """测试增量指标聚合"""
+
+    def _random_results(self, rng, count):
+        results = []
+        for _ in range(count):
+            metrics = {}
+            for name in ["text_edit", "code_edit", "table_edit", "table_TEDS", "formula_edit", "overall"]:
+                if rng.random() < 0.8:
+                    metrics[name] = {"score": rng.random(), "success": True}
+                elif rng.random() < 0.5:
+                    metrics[name] = {"score": 0.0, "success": False}
+            results.append({"metrics": metrics})
+        return results
+
+    def test_means_independent_of_batching(self):
+        """测试平均值与逐个样本累加的结果完全一致，与分批方式无关"""
+        import random
+        from webmainbench.evaluator.aggregator import CORE_METRICS, MetricAggregator
+
+        rng = random.Random(0)
+        results = self._random_results(rng, 257)
+
+        totals, counts = {}, {}
+        for result in results:
+            for name, data in result["metrics"].items():
+                if data["success"]:
+                    totals[name] = totals.get(name, 0.0) + data["score"]
+                    counts[name] = counts.get(name, 0) + 1
+        expected = {name: totals[name] / counts[name] for name in totals}
+        expected["overall"] = sum(expected[name] for name in CORE_METRICS) / len(CORE_METRICS)
+
+        for batch_size in (1, 7, 64, 257):
+            aggregator = MetricAggregator()
+            for start in range(0, len(results), batch_size):
+                aggregator.add_batch(results[start:start + batch_size])
+            self.assertEqual(aggregator.mean_scores(), expected)
+            self.assertEqual(aggregator.num_samples, len(results))
+
+    def test_statistics(self):
+        """测试标准差、最值与近似分位数"""
+        import random
+        import numpy as np
+        from webmainbench.evaluator.aggregator import MetricAggregator
+
+        rng = random.Random(1)
+        results = self._random_results(rng, 500)
+        aggregator = MetricAggregator()
+        for start in range(0, len(results), 33):
+            aggregator.add_batch(results[start:start + 33])
+
+        statistics = aggregator.statistics()
+        for name, stats in statistics.items():
+            scores = np.array([r["metrics"][name]["score"] for r in results
+                               if name in r["metrics"] and r["metrics"][name]["success"]])
+            self.assertEqual(stats["count"], len(scores))
+            self.assertAlmostEqual(stats["std"], float(np.std(scores, ddof=1)), places=10)
+            self.assertEqual(stats["min"], float(scores.min()))
+            self.assertEqual(stats["max"], float(scores.max()))
+            for q in (50, 90, 99):
+                lower = np.percentile(scores, q, method="lower")
+                upper = np.percentile(scores, q, method="higher")
+                self.assertGreaterEqual(stats[f"p{q}"], lower - 1e-3)
+                self.assertLessEqual(stats[f"p{q}"], upper + 1e-3)
+
+    def test_batched_output_file_keeps_every_result(self):
+        """测试分批评测写入 output_file 时最后不足一批的结果也被写入，且聚合覆盖全部样本"""
+        dataset = make_dataset()
+        evaluator = Evaluator()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            jsonl_path = Path(tmp_dir) / "dataset.jsonl"
+            output_path = Path(tmp_dir) / "results.jsonl"
+            write_jsonl(dataset.samples, jsonl_path)
+
+            in_memory = evaluator.evaluate_batched(jsonl_path, "trafilatura", batch_size=5)
+            streamed = evaluator.evaluate_batched(
+                jsonl_path, "trafilatura", batch_size=5, output_file=output_path
+            )
+            with open(output_path, encoding='utf-8') as f:
+                written = [json.loads(line) for line in f]
+
+        self.assertEqual(streamed.sample_results, [])
+        self.assertEqual([r['sample_id'] for r in written],
+                         [r['sample_id'] for r in in_memory.sample_results])
+        self.assertEqual(streamed.overall_metrics, in_memory.overall_metrics)
+        self.assertEqual(streamed.metric_statistics, in_memory.metric_statistics)
+        self.assertEqual(streamed.error_analysis['total_samples'], len(dataset.samples))
+
+    def test_batched_group_metrics_match_evaluate(self):
+        """测试分批评测的分类指标和分组指标与 evaluate 一致"""
+        dataset = make_dataset(num_samples=15)
+        evaluator = Evaluator()
+        full = evaluator.evaluate(dataset, "trafilatura")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            jsonl_path = Path(tmp_dir) / "dataset.jsonl"
+            output_path = Path(tmp_dir) / "results.jsonl"
+            write_jsonl(dataset.samples, jsonl_path)
+            batched = evaluator.evaluate_batched(
+                jsonl_path, "trafilatura", batch_size=4, output_file=output_path
+            )
+
+        self.assertIsNotNone(batched.category_metrics)
+        self.assertEqual(set(batched.category_metrics), {"article", "forum", "blog"})
+        self.assertEqual(batched.category_metrics, full.category_metrics)
+        self.assertEqual(batched.group_metrics, full.group_metrics)
+        self.assertEqual(set(full.group_metrics), {"content_type", "language", "difficulty", "domain"})
+        self.assertEqual(list(full.group_metrics["language"]), ["zh"])
+
+
+def _round_scores(sample_results):
+    """将样本结果中的分数舍入到 float32（紧凑存储读回的精度）"""
+    import numpy as np
+    return [
+        {**result, 'metrics': {
+            name: {**metric_data, 'score': float(np.float32(metric_data['score']))}
+            for name, metric_data in result['metrics'].items()
+        }} if 'metrics' in result else result
+        for result in sample_results
+    ]
+
+
+class TestCompactResults(unittest.TestCase):
+    """测试紧凑结果存储"""
+
+    def test_store_round_trip(self):
+        """测试样本结果按原有键顺序读回，分数表、成功标记与原结果一致"""
+        import numpy as np
+        from webmainbench.evaluator.result_store import CompactResultStore
+
+        results = [
+            {'sample_id': f's{i}', 'extraction_success': True, 'extraction_time': 0.1 * i,
+             'extracted_content': f'内容 {i}', 'extracted_content_list': [],
+             'metrics': {'text_edit': {'score': i / 3, 'success': True, 'details': {'distance': i}}},
+             'sample_metadata': {'language': 'zh'}}
+            for i in range(1500)
+        ]
+        results[3]['metrics']['table_TEDS'] = {'score': 0.0, 'success': False, 'details': {}, 'error': 'bad table'}
+        results[5] = {'sample_id': 's5', 'extraction_success': False, 'extraction_error': 'boom', 'metrics': {}}
+
+        with CompactResultStore() as store:
+            store.extend(results[:10])
+            for result in results[10:]:
+                store.append(result)
+
+            self.assertEqual(len(store), len(results))
+            self.assertEqual(list(store), _round_scores(results))
+            self.assertEqual([list(r) for r in store], [list(r) for r in results])
+            self.assertEqual(store[-1], _round_scores(results)[-1])
+            self.assertEqual(store[3:5], _round_scores(results)[3:5])
+            with self.assertRaises(IndexError):
+                store[len(results)]
+
+            self.assertEqual(store.metric_names, ['text_edit', 'table_TEDS'])
+            self.assertEqual(store.score_table.shape, (len(results), 2))
+            self.assertEqual(store.score_table.dtype.name, 'float32')
+            self.assertEqual(int((~store.extraction_success).sum()), 1)
+            table_scores = store.scores('table_TEDS', successful_only=False)
+            self.assertEqual(table_scores[3], 0.0)
+            self.assertEqual(int((table_scores == table_scores).sum()), 1)
+            self.assertTrue(all(score != score for score in store.scores('table_TEDS')))
+            self.assertEqual(store.scores('text_edit')[6], np.float32(2.0))
+
+    def test_compact_evaluate_matches_full(self):
+        """测试紧凑模式的聚合指标与完整结果一致，样本结果视图只有分数精度不同"""
+        from unittest import mock
+        from webmainbench.evaluator import evaluator as evaluator_module
+        from webmainbench.evaluator.result_store import CompactResultStore
+
+        dataset = make_dataset(num_samples=15)
+        evaluator = Evaluator()
+        full = evaluator.evaluate(dataset, "trafilatura")
+        with mock.patch.object(evaluator_module, "COMPACT_FLUSH_SIZE", 4):
+            compact = evaluator.evaluate(dataset, "trafilatura", compact_results=True)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            jsonl_path = Path(tmp_dir) / "dataset.jsonl"
+            write_jsonl(dataset.samples, jsonl_path)
+            batched = evaluator.evaluate_batched(jsonl_path, "trafilatura", batch_size=4)
+            compact_batched = evaluator.evaluate_batched(jsonl_path, "trafilatura", batch_size=4,
+                                                         compact_results=True)
+
+        strip_time = lambda results: [
+            {k: v for k, v in r.items() if k != 'extraction_time'} for r in results
+        ]
+        self.assertIsInstance(compact.sample_results, CompactResultStore)
+        self.assertEqual(compact.overall_metrics, full.overall_metrics)
+        self.assertEqual(compact.group_metrics, full.group_metrics)
+        self.assertEqual(strip_time(compact.to_dict()['sample_results']),
+                         strip_time(_round_scores(full.sample_results)))
+
+        self.assertIsInstance(compact_batched.sample_results, CompactResultStore)
+        self.assertEqual(compact_batched.overall_metrics, batched.overall_metrics)
+        self.assertEqual(compact_batched.metric_statistics, batched.metric_statistics)
+        self.assertEqual(strip_time(compact_batched.sample_results),
+                         strip_time(_round_scores(batched.sample_results)))
+
+
+class TestResumableRun(unittest.TestCase):
+    """测试运行目录的检查点与恢复评测"""
+
+    def setUp(self):
+        self.dataset = make_dataset(num_samples=15)
+        self.evaluator = Evaluator()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.jsonl_path = Path(self.tmp_dir.name) / "dataset.jsonl"
+        self.run_dir = Path(self.tmp_dir.name) / "run"
+        write_jsonl(self.dataset.samples, self.jsonl_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _read_results(self):
+        with open(self.run_dir / "results.jsonl", encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_resume_matches_uninterrupted_run(self):
+        """测试中断后恢复评测的结果与不中断的评测一致，且已完成的样本不重复抽取"""
+        from unittest import mock
+        from webmainbench.extractors.base import BaseExtractor
+
+        full = self.evaluator.evaluate_batched(self.jsonl_path, "trafilatura", batch_size=2)
+
+        extractor = ExtractorFactory.create("trafilatura")
+        original_extract = BaseExtractor.extract
+        extracted_ids = []
+
+        def crash_after_nine(extractor_self, html, url=None):
+            if len(extracted_ids) == 9:
+                raise KeyboardInterrupt
+            extracted_ids.append(url)
+            return original_extract(extractor_self, html, url)
+
+        with mock.patch.object(BaseExtractor, "extract", crash_after_nine):
+            with self.assertRaises(KeyboardInterrupt):
+                self.evaluator.evaluate_batched(self.jsonl_path, extractor, batch_size=2,
+                                                run_dir=self.run_dir, checkpoint_every=3)
+        # 4 个批次已写入结果，检查点停留在第 3 个批次，恢复时第 4 个批次会被截断并重新评测
+        self.assertEqual(len(self._read_results()), 8)
+        self.assertEqual(json.loads((self.run_dir / "manifest.json").read_text())["status"], "running")
+
+        extracted_ids.clear()
+        with mock.patch.object(BaseExtractor, "extract", crash_after_nine):
+            resumed = self.evaluator.evaluate_batched(self.jsonl_path, extractor, batch_size=2,
+                                                      run_dir=self.run_dir, resume=True, checkpoint_every=3)
+
+        self.assertEqual(len(extracted_ids), 9)
+        self.assertEqual(resumed.sample_results, [])
+        self.assertEqual(resumed.total_samples, full.total_samples)
+        self.assertEqual(resumed.overall_metrics, full.overall_metrics)
+        self.assertEqual(resumed.category_metrics, full.category_metrics)
+        self.assertEqual(resumed.group_metrics, full.group_metrics)
+        self.assertEqual(resumed.metric_statistics, full.metric_statistics)
+        self.assertEqual([r['sample_id'] for r in self._read_results()],
+                         [r['sample_id'] for r in full.sample_results])
+        self.assertEqual(json.loads((self.run_dir / "manifest.json").read_text())["status"], "completed")
+
+    def test_existing_run_requires_resume(self):
+        """测试运行目录已存在时必须指定 resume，且 manifest 不一致时拒绝恢复"""
+        self.evaluator.evaluate_batched(self.jsonl_path, "trafilatura", batch_size=5, run_dir=self.run_dir)
+
+        with self.assertRaises(ValueError):
+            self.evaluator.evaluate_batched(self.jsonl_path, "trafilatura", run_dir=self.run_dir)
+        with self.assertRaises(ValueError):
+            self.evaluator.evaluate_batched(self.jsonl_path, "trafilatura", batch_size=5, max_samples=5,
+                                            run_dir=self.run_dir, resume=True)
+        with self.assertRaises(ValueError):
+            self.evaluator.evaluate_batched(self.jsonl_path, "trafilatura", run_dir=self.run_dir,
+                                            output_file=Path(self.tmp_dir.name) / "out.jsonl")
+
+        # 已完成的运行恢复时不再处理任何样本
+        resumed = self.evaluator.evaluate_batched(self.jsonl_path, "trafilatura", batch_size=5,
+                                                  run_dir=self.run_dir, resume=True)
+        self.assertEqual(resumed.total_samples, len(self.dataset.samples))
+        self.assertEqual(len(self._read_results()), len(self.dataset.samples))
+
+
+class TestShardedEvaluation(unittest.TestCase):
+    """测试多机分片评测与合并"""
+
+    def setUp(self):
+        self.dataset = make_dataset(num_samples=17)
+        self.evaluator = Evaluator()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.jsonl_path = Path(self.tmp_dir.name) / "dataset.jsonl"
+        self.run_dir = Path(self.tmp_dir.name) / "run"
+        write_jsonl(self.dataset.samples, self.jsonl_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _assert_merge_matches_single_node(self, shard_by, num_shards, **kwargs):
+        output_path = Path(self.tmp_dir.name) / "single.jsonl"
+        merged_path = Path(self.tmp_dir.name) / "merged.jsonl"
+        single = self.evaluator.evaluate_batched(self.jsonl_path, "trafilatura", batch_size=3,
+                                                 output_file=output_path, **kwargs)
+        shard_sizes = []
+        for shard_index in range(num_shards):
+            shard = self.evaluator.evaluate_batched(
+                self.jsonl_path, "trafilatura", batch_size=3, run_dir=self.run_dir,
+                shard_index=shard_index, num_shards=num_shards, shard_by=shard_by, **kwargs
+            )
+            shard_sizes.append(shard.total_samples)
+        merged = self.evaluator.merge_shards(self.run_dir, output_file=merged_path)
+
+        self.assertEqual(sum(shard_sizes), single.total_samples)
+        self.assertTrue(all(size > 0 for size in shard_sizes))
+        self.assertEqual(merged.total_samples, single.total_samples)
+        self.assertEqual(merged.overall_metrics, single.overall_metrics)
+        self.assertEqual(merged.metric_statistics, single.metric_statistics)
+        self.assertEqual(merged.category_metrics, single.category_metrics)
+        self.assertEqual(merged.group_metrics, single.group_metrics)
+        self.assertEqual(merged.error_analysis, single.error_analysis)
+        read_results = lambda path: [
+            {k: v for k, v in json.loads(line).items() if k != 'extraction_time'}
+            for line in path.read_text(encoding='utf-8').splitlines()
+        ]
+        self.assertEqual(read_results(merged_path), read_results(output_path))
+
+    def test_hash_shards_merge_to_single_node_result(self):
+        """测试按id哈希分片合并后与单机评测完全一致"""
+        self._assert_merge_matches_single_node("hash", 3, max_samples=15)
+
+    def test_range_shards_merge_to_single_node_result(self):
+        """测试按行区间分片合并后与单机评测完全一致"""
+        self._assert_merge_matches_single_node("range", 4, categories=["article", "blog"])
+
+    def test_merge_requires_all_shards(self):
+        """测试缺少分片或参数不合法时报错"""
+        self.evaluator.evaluate_batched(self.jsonl_path, "trafilatura", run_dir=self.run_dir,
+                                        shard_index=0, num_shards=2)
+        with self.assertRaises(ValueError):
+            self.evaluator.merge_shards(self.run_dir)
+        with self.assertRaises(ValueError):
+            self.evaluator.evaluate_batched(self.jsonl_path, "trafilatura", shard_index=0, num_shards=2)
+        with self.assertRaises(ValueError):
+            self.evaluator.evaluate_batched(self.jsonl_path, "trafilatura", run_dir=self.run_dir,
+                                            shard_index=2, num_shards=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,12 @@
+import pickle
+import sqlite3
+import tempfile
 import unittest
+from pathlib import Path
+
+from webmainbench.extractors import ExtractionCache
 from webmainbench.extractors.factory import ExtractorFactory
-from webmainbench.extractors.base import ExtractionResult
+from webmainbench.extractors.base import BaseExtractor, ExtractionResult
 
 
 class TestExtractors(unittest.TestCase):
@@ -87,5 +93,172 @@ print(result)</code></pre>
             self.skipTest(f"Resiliparse 抽取器未注册: {e}")
 
 
+class TestExtractionResult(unittest.TestCase):
+    """测试抽取结果记录类型"""
+
+    def test_fields_and_round_trip(self):
+        """测试默认值、to_dict/from_dict 往返、pickle，以及不能添加未定义的属性"""
+        result = ExtractionResult(content="正文", extraction_time=0.5)
+        self.assertEqual(result.content_list, [])
+        self.assertTrue(result.success)
+        self.assertFalse(hasattr(result, "__dict__"))
+        with self.assertRaises(AttributeError):
+            result.extra = 1
+
+        self.assertEqual(ExtractionResult.from_dict(result.to_dict()), result)
+        self.assertEqual(pickle.loads(pickle.dumps(result)), result)
+        error = ExtractionResult.create_error_result("failed", extraction_time=1.0)
+        self.assertEqual((error.success, error.error_message, error.content), (False, "failed", ""))
+
+
+class _CountingExtractor(BaseExtractor):
+    """记录实际抽取次数的测试抽取器"""
+
+    version = "1.0"
+
+    def _setup(self):
+        self.calls = 0
+
+    def _extract_content(self, html, url=None):
+        self.calls += 1
+        if "fail" in html:
+            return ExtractionResult.create_error_result("failed")
+        return ExtractionResult(content=f"content:{html}", language="en")
+
+
+class TestExtractionCache(unittest.TestCase):
+    """测试持久化抽取结果缓存"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = Path(self.tmp_dir.name) / "cache.sqlite"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_hit_miss_and_key(self):
+        """测试命中/未命中统计，以及配置变化导致缓存失效"""
+        extractor = _CountingExtractor("counting")
+        extractor.cache = ExtractionCache(self.cache_path)
+
+        first = extractor.extract("<p>a</p>", "https://example.com")
+        second = extractor.extract("<p>a</p>", "https://example.com")
+        self.assertEqual(extractor.calls, 1)
+        self.assertEqual(second.to_dict(), first.to_dict())
+
+        # 失败结果不缓存
+        extractor.extract("<p>fail</p>")
+        extractor.extract("<p>fail</p>")
+        self.assertEqual(extractor.calls, 3)
+
+        # 配置变化后键不同
+        extractor.set_config({"option": 1})
+        extractor.extract("<p>a</p>", "https://example.com")
+        self.assertEqual(extractor.calls, 4)
+
+        stats = extractor.cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 4))
+        self.assertEqual(stats["entries"], 2)
+
+        # 新实例（新进程）可以读到磁盘上的缓存
+        other = _CountingExtractor("counting")
+        other.cache = pickle.loads(pickle.dumps(ExtractionCache(self.cache_path)))
+        self.assertEqual(other.extract("<p>a</p>", "https://example.com").content, "content:<p>a</p>")
+        self.assertEqual(other.calls, 0)
+
+    def test_size_eviction(self):
+        """测试超过大小上限时淘汰最久未使用的条目"""
+        cache = ExtractionCache(self.cache_path, max_size_mb=0.001)
+        extractor = _CountingExtractor("counting")
+        extractor.cache = cache
+
+        for i in range(20):
+            extractor.extract(f"<p>{i}</p>" * 10)
+
+        stats = cache.get_stats()
+        self.assertGreater(stats["evictions"], 0)
+        self.assertLessEqual(stats["size_bytes"], cache.max_size_bytes)
+        self.assertEqual(stats["entries"], 20 - stats["evictions"])
+
+        # 最近写入的条目保留
+        extractor.extract("<p>19</p>" * 10)
+        self.assertEqual(extractor.calls, 20)
+
+    def test_buffered_last_access(self):
+        """测试命中不立即写库，访问时间在写入、关闭时批量更新，淘汰仍按最近使用顺序"""
+        cache = ExtractionCache(self.cache_path, max_size_mb=0.0007)
+        value = "x" * 100
+
+        def last_access(key):
+            with sqlite3.connect(str(self.cache_path)) as conn:
+                return conn.execute("SELECT last_access FROM extraction_cache WHERE key = ?", (key,)).fetchone()[0]
+
+        cache.put("a", ExtractionResult(content=value, success=True))
+        cache.put("b", ExtractionResult(content=value, success=True))
+        before = last_access("a")
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(last_access("a"), before)
+
+        # 写入前先更新访问时间：a 刚被读过，淘汰的是 b
+        cache.put("c", ExtractionResult(content=value, success=True))
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+
+        accessed = last_access("a")
+        cache.get("a")
+        cache.close()
+        self.assertGreater(last_access("a"), accessed)
+
+    def test_running_size_total(self):
+        """测试覆盖写入、淘汰和清空后，维护的总大小与实际大小一致"""
+        cache = ExtractionCache(self.cache_path, max_size_mb=0.001)
+
+        def actual_size():
+            with sqlite3.connect(str(self.cache_path)) as conn:
+                return conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+
+        for i in range(30):
+            content = "x" * (i % 7 * 40)
+            cache.put(f"key-{i % 9}", ExtractionResult(content=content, success=True))
+            self.assertEqual(cache.get_stats()["size_bytes"], actual_size())
+        self.assertGreater(cache.evictions, 0)
+
+        # 其他实例（进程）的写入同样计入
+        other = ExtractionCache(self.cache_path)
+        other.put("other", ExtractionResult(content="y" * 100, success=True))
+        self.assertEqual(cache.get_stats()["size_bytes"], actual_size())
+
+        cache.clear()
+        self.assertEqual(cache.get_stats()["size_bytes"], 0)
+        other.close()
+        cache.close()
+
+    def test_evaluator_attaches_cache(self):
+        """测试Evaluator把缓存挂到抽取器上，第二次评测不再抽取"""
+        from webmainbench.data import BenchmarkDataset, DataSample
+        from webmainbench.evaluator import Evaluator
+
+        dataset = BenchmarkDataset(name="cache")
+        for i in range(3):
+            dataset.add_sample(DataSample(
+                id=str(i), html=f"<p>{i}</p>", groundtruth_content=f"content:<p>{i}</p>",
+                groundtruth_content_list=[]
+            ))
+
+        evaluator = Evaluator(extraction_cache=self.cache_path)
+        first_extractor = _CountingExtractor("counting")
+        first = evaluator.evaluate(dataset, first_extractor)
+        second_extractor = _CountingExtractor("counting")
+        second = evaluator.evaluate(dataset, second_extractor)
+
+        self.assertEqual((first_extractor.calls, second_extractor.calls), (3, 0))
+        # 缓存只在评测期间挂载，不留在调用方的抽取器上
+        self.assertIsNone(first_extractor.cache)
+        self.assertIsNone(second_extractor.cache)
+        self.assertEqual(second.overall_metrics, first.overall_metrics)
+        self.assertEqual(evaluator.extraction_cache.get_stats()["hits"], 3)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
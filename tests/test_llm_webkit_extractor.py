@@ -1,3 +1,5 @@
+import json
+import re
 import unittest
 from unittest.mock import Mock, patch
 from webmainbench.extractors.factory import ExtractorFactory
@@ -310,6 +312,154 @@ class TestLLMWebKitExtractor(unittest.TestCase):
             self.skipTest(f"LLM-WebKit dependencies not available: {e}")
 
 
+class _StubOutput:
+    """模拟vLLM的单条RequestOutput."""
+
+    def __init__(self, text):
+        self.outputs = [Mock(text=text)]
+
+
+class _StubLLM:
+    """模拟vLLM的LLM对象：记录每次generate调用，按提示中的item数返回分类JSON."""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, prompts, sampling_params):
+        self.calls.append(prompts)
+        prompt_list = prompts if isinstance(prompts, list) else [prompts]
+        outputs = []
+        for prompt in prompt_list:
+            item_count = prompt.count('_item_id="')
+            outputs.append(_StubOutput(json.dumps(
+                {str(i): "main" if i % 2 else "other" for i in range(1, item_count + 1)}
+            )))
+        return outputs
+
+
+def _stub_setup(self):
+    """替换_setup：不依赖llm_web_kit/vLLM，用桩对象完成简化、推理和重建."""
+    self._simplify_html = lambda html: (html, f"tag::{html}", None)
+    self._SamplingParams = lambda **kwargs: kwargs
+    self._model_loaded = True
+    self._use_transformers = False
+    self.model = _StubLLM()
+    self.tokenizer = Mock(apply_chat_template=lambda messages, **kwargs: messages[0]["content"])
+
+
+def _stub_reconstruct(self, original_html, classification_result, url=None, typical_raw_tag_html=None):
+    """按分类结果拼出正文，并带上传入的typical_raw_tag_html以便校验."""
+    main_ids = sorted(k for k, v in classification_result.items() if v == 1)
+    return f"{typical_raw_tag_html} -> {','.join(main_ids)}", []
+
+
+@patch('webmainbench.extractors.llm_webkit_extractor.LlmWebkitExtractor._reconstruct_content', _stub_reconstruct)
+@patch('webmainbench.extractors.llm_webkit_extractor.LlmWebkitExtractor._setup', _stub_setup)
+class TestLLMWebKitBatchExtract(unittest.TestCase):
+    """LLM-WebKit批量推理路径测试（使用桩LLM，无需GPU）."""
+
+    def setUp(self):
+        self.html_list = [
+            '<div _item_id="1">a</div><div _item_id="2">b</div>',
+            '',
+            '<div _item_id="1">c</div><div _item_id="2">d</div><div _item_id="3">e</div>',
+            '<div>no items</div>',
+        ]
+
+    def test_batch_extract_single_generate_call(self):
+        """测试整批只调用一次generate，且结果与逐条抽取一致."""
+        extractor = ExtractorFactory.create("llm-webkit")
+        batch_results = extractor.batch_extract(self.html_list)
+
+        self.assertEqual(len(extractor.model.calls), 1)
+        self.assertEqual(len(extractor.model.calls[0]), 2)
+
+        single = ExtractorFactory.create("llm-webkit")
+        single_results = [single.extract(html) for html in self.html_list]
+        self.assertEqual(len(single.model.calls), 2)
+
+        for batch_result, single_result in zip(batch_results, single_results):
+            self.assertEqual(batch_result.success, single_result.success)
+            self.assertEqual(batch_result.content, single_result.content)
+            self.assertEqual(batch_result.error_message, single_result.error_message)
+
+        self.assertEqual(batch_results[0].content, f"tag::{self.html_list[0]} -> item_id 1")
+        self.assertEqual(batch_results[2].content, f"tag::{self.html_list[2]} -> item_id 1,item_id 3")
+        self.assertFalse(batch_results[1].success)
+        self.assertFalse(batch_results[3].success)
+
+    def test_evaluator_uses_batch_path(self):
+        """测试Evaluator分批处理时走batch_extract路径."""
+        from webmainbench.data import DataSample
+        from webmainbench.evaluator import Evaluator
+
+        samples = [
+            DataSample(id=f"s{i}", html=html, groundtruth_content="a", groundtruth_content_list=[])
+            for i, html in enumerate(self.html_list)
+        ]
+        extractor = ExtractorFactory.create("llm-webkit")
+        results, errors = Evaluator()._process_batch(samples, extractor)
+
+        self.assertEqual(len(extractor.model.calls), 1)
+        self.assertEqual([r['sample_id'] for r in results], [s.id for s in samples])
+        self.assertEqual([r['extraction_success'] for r in results], [True, False, True, False])
+        self.assertEqual(len(errors), 2)
+
+
+class _ConstraintTokenizer:
+    """只包含JSON约束所需token的简易tokenizer."""
+
+    def __init__(self):
+        tokens = ["{", "}", ' "', '":"', '",', "main", "other"] + [str(d) for d in range(10)]
+        self.token_to_id = {token: 1000 + i for i, token in enumerate(tokens)}
+        self.id_to_token = {i: token for token, i in self.token_to_id.items()}
+
+    def encode(self, text):
+        return [self.token_to_id[text]]
+
+    def decode(self, ids):
+        return "".join(self.id_to_token[i] for i in ids)
+
+
+class TestJsonConstraintLogitsProcessor(unittest.TestCase):
+    """测试预计算的JSON约束logits processor与TokenStateManager行为一致."""
+
+    def _decode_both(self, item_count, seed):
+        import torch
+        from webmainbench.extractors.llm_webkit_extractor import (
+            TokenStateManager, JsonConstraintTable, JsonConstraintLogitsProcessor
+        )
+
+        tokenizer = _ConstraintTokenizer()
+        manager = TokenStateManager(tokenizer)
+        processor = JsonConstraintLogitsProcessor(JsonConstraintTable(tokenizer))
+        count_ids = [tokenizer.token_to_id[c] for c in str(item_count)]
+        prompt = [1, 2, 3] + list(JsonConstraintTable.MAX_COUNT_PATTERN) + count_ids + [4, 5]
+
+        generator = torch.Generator().manual_seed(seed)
+        output_ids = []
+        for _ in range(item_count * 6 + 10):
+            logits = torch.randn(JsonConstraintTable.EOS_TOKEN_ID + 10, generator=generator)
+            expected = manager.process_logit(prompt, output_ids, logits.clone())
+            actual = processor(prompt, output_ids, logits.clone())
+            self.assertTrue(torch.equal(expected, actual), f"step {len(output_ids)} differs")
+
+            next_id = int(torch.argmax(actual))
+            if next_id == JsonConstraintTable.EOS_TOKEN_ID:
+                break
+            output_ids.append(next_id)
+        else:
+            self.fail("decoding did not finish")
+        return tokenizer.decode(output_ids)
+
+    def test_matches_token_state_manager(self):
+        """测试逐步输出与TokenStateManager完全一致，且生成合法JSON."""
+        for item_count, seed in [(1, 0), (3, 1), (12, 2), (105, 3)]:
+            text = self._decode_both(item_count, seed)
+            # 约束输出以 ",} 结尾，与_clean_output一样去掉尾逗号
+            data = json.loads(re.sub(r',\s*}', '}', text))
+            self.assertEqual(list(data), [str(i) for i in range(1, item_count + 1)])
+            self.assertTrue(set(data.values()) <= {"main", "other"})
 
 
 if __name__ == '__main__':
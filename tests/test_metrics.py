@@ -227,6 +227,56 @@ $$\\int_{0}^{\\infty} e^{-x} dx = 1$$
                 self.assertTrue(result.success or result.score == 0.0,
                                 f"空内容的{metric_name}应该正确处理")
 
+    def test_split_content_once_per_sample(self):
+        """测试每个样本只分割一次内容，且结果与各指标单独分割一致"""
+        from unittest.mock import patch
+        from webmainbench.metrics.base import BaseMetric
+
+        original_split = BaseMetric.split_content_spans
+        with patch.object(BaseMetric, 'split_content_spans', side_effect=original_split) as mock_split:
+            results = self.calculator.calculate_all(
+                predicted_content=self.predicted_content,
+                groundtruth_content=self.groundtruth_content
+            )
+
+        # 预测和真值各分割一次
+        self.assertEqual(mock_split.call_count, 2)
+
+        # 不传分割上下文时，各指标单独计算的结果保持一致
+        for metric_name in ['code_edit', 'formula_edit', 'table_edit', 'text_edit']:
+            standalone = self.calculator.metrics[metric_name].calculate(
+                self.predicted_content, self.groundtruth_content
+            )
+            self.assertEqual(results[metric_name].score, standalone.score)
+            self.assertEqual(results[metric_name].details, standalone.details)
+
+    def test_calculate_batch_matches_calculate_all(self):
+        """测试批量计算与逐个样本计算结果一致，且每个编辑距离指标只调用一次 cpdist"""
+        from unittest.mock import patch
+        from webmainbench.metrics import text_metrics
+
+        samples = [
+            {'predicted_content': self.predicted_content, 'groundtruth_content': self.groundtruth_content},
+            {'predicted_content': self.groundtruth_content, 'groundtruth_content': self.groundtruth_content},
+            {'predicted_content': "", 'groundtruth_content': self.groundtruth_content},
+            {'predicted_content': "只有文字", 'groundtruth_content': "只有文字，没有表格"},
+            {'predicted_content': "", 'groundtruth_content': "",
+             'predicted_content_list': [{"type": "code", "content": "print(1)"}]},
+        ]
+        with patch.object(text_metrics, 'cpdist', wraps=text_metrics.cpdist) as mock_cpdist:
+            batch_results = self.calculator.calculate_batch(samples)
+        self.assertEqual(mock_cpdist.call_count, 4)
+
+        for sample, batch_result in zip(samples, batch_results):
+            single_result = self.calculator.calculate_all(
+                predicted_content=sample['predicted_content'],
+                groundtruth_content=sample['groundtruth_content'],
+                predicted_content_list=sample.get('predicted_content_list'),
+            )
+            self.assertEqual(list(batch_result), list(single_result))
+            for metric_name, result in single_result.items():
+                self.assertEqual(batch_result[metric_name].to_dict(), result.to_dict())
+
 
 class TestErrorHandling(unittest.TestCase):
     """测试错误处理"""
@@ -471,6 +521,203 @@ def test():
         print("✅ 所有指标都正确得到满分!")
 
 
+def _replace_loop_split(text):
+    """按旧实现（逐个 str.replace 移除片段）分割，作为分段器的参考"""
+    import re
+    from webmainbench.metrics.html_tables import find_html_tables
+    from webmainbench.metrics.segmenter import _CODE_RE, _FORMULA_RES, _markdown_tables
+
+    segments, code, formula = [], [], []
+    for match in _CODE_RE.finditer(text):
+        segment = match.group(0)
+        segments.append(segment)
+        content = '\n'.join(segment.split('\n')[1:-1]) if segment.startswith('```') else segment[1:-1].strip()
+        if content:
+            code.append(content)
+    for pattern in _FORMULA_RES:
+        for match in pattern.finditer(text):
+            segments.append(match.group(0))
+            if match.group(1).strip():
+                formula.append(match.group(1).strip())
+    tables = find_html_tables(text) + [text[start:end] for start, end in _markdown_tables(text)]
+    segments.extend(tables)
+
+    clean_text = text
+    for segment in segments:
+        clean_text = clean_text.replace(segment, '', 1)
+    clean_text = re.sub(r'\n\s*\n', '\n\n', clean_text).strip()
+    return {'code': '\n'.join(code), 'formula': '\n'.join(formula),
+            'table': '\n'.join(tables), 'text': clean_text}
+
+
+class TestMarkdownSegmenter(unittest.TestCase):
+    """测试单次分段的markdown分割"""
+
+    def _random_page(self, rng, blocks):
+        pieces = [
+            "段落 {i}，包含 `code_{i}` 和公式 $x_{i}^2$。",
+            "```python\ndef f{i}(x):\n    return x * {i}\n```",
+            "$$\\sum_{{k=0}}^{{{i}}} k$$",
+            "行内 \\(a_{i}\\) 与行间 \\[b_{i}\\]",
+            "| a | b |\n|---|---|\n| {i} | x |",
+            "<table><tr><td>h</td><td colspan=\"2\">v {i}</td></tr></table>",
+            "# 标题 {i}\n\n普通文本 {i}，价格 \\$5。",
+        ]
+        return "\n\n".join(rng.choice(pieces).format(i=i) for i in range(blocks))
+
+    def test_matches_replace_loop(self):
+        """测试与逐个替换的旧实现结果一致"""
+        import random
+        from webmainbench.metrics.base import BaseMetric
+
+        rng = random.Random(0)
+        for _ in range(50):
+            text = self._random_page(rng, rng.randint(1, 40))
+            self.assertEqual(BaseMetric.split_content(text), _replace_loop_split(text))
+
+        # 未转义的 $ 使公式匹配相互重叠，移除的片段可能跨越已移除的区域
+        texts = [
+            '$5 `pip install x` $5 $5 $x^2$',
+            '价格 $5 和 $6，公式 $a$ 与 `$b` $c$',
+            '$$a$ $b$$ `c` $d$',
+        ]
+        for _ in range(50):
+            texts.append(self._random_page(rng, rng.randint(1, 40)).replace('\\$5', '$5'))
+        for text in texts:
+            with self.subTest(text=text[:40]):
+                self.assertEqual(BaseMetric.split_content(text), _replace_loop_split(text))
+
+    def test_span_offsets(self):
+        """测试各片段的偏移与原文对应，剩余文本由未覆盖区间组成"""
+        from webmainbench.metrics.segmenter import segment_markdown
+
+        text = "前言 `x = 1`\n\n$$a+b$$\n\n| a | b |\n|---|---|\n| 1 | 2 |\n\n结尾"
+        segments = segment_markdown(text)
+
+        self.assertEqual([segments.content(span) for span in segments.parts['code']], ['x = 1'])
+        self.assertEqual([segments.content(span) for span in segments.parts['formula']], ['a+b'])
+        table_span = segments.parts['table'][0]
+        self.assertEqual(text[table_span.start:table_span.end], '| a | b |\n|---|---|\n| 1 | 2 |')
+        self.assertEqual([text[span.start:span.end] for span in segments.text_spans],
+                         ['前言 ', '\n\n', '\n\n', '\n\n结尾'])
+        self.assertEqual(segments.join('text'), '前言 \n\n结尾')
+
+    def test_lazy_content_split(self):
+        """测试按需拼接的分割结果与 split_content 一致，长度无需拼接字符串"""
+        import random
+        from webmainbench.metrics.base import BaseMetric
+
+        rng = random.Random(1)
+        for _ in range(20):
+            text = self._random_page(rng, rng.randint(1, 30))
+            parts = BaseMetric.split_content_spans(text)
+            for kind in ('code', 'formula', 'table'):
+                self.assertEqual(parts.length(kind), len(BaseMetric.split_content(text)[kind]))
+                self.assertFalse(parts.is_materialized(kind))
+            self.assertEqual(dict(parts), BaseMetric.split_content(text))
+
+        content_list = [{"type": "code", "content": "print(1)"}]
+        parts = BaseMetric.split_content_spans("ignored", content_list)
+        self.assertEqual(parts['code'], 'print(1)')
+        self.assertEqual(parts.spans('code'), [])
+        self.assertEqual(dict(BaseMetric.split_content_spans("")), BaseMetric.split_content(""))
+
+    def test_table_edit_empty_side(self):
+        """测试一侧没有表格时不拼接另一侧的表格字符串，结果与直接计算一致"""
+        from webmainbench.metrics.base import BaseMetric
+        from webmainbench.metrics.table_metrics import TableEditMetric
+
+        metric = TableEditMetric("table_edit")
+        predicted = "正文\n\n| a | b |\n|---|---|\n| 1 | 2 |"
+        groundtruth = "只有正文"
+        predicted_parts = BaseMetric.split_content_spans(predicted)
+        groundtruth_parts = BaseMetric.split_content_spans(groundtruth)
+
+        lazy = metric.calculate(predicted, groundtruth, predicted_parts=predicted_parts,
+                                groundtruth_parts=groundtruth_parts)
+        eager = metric.calculate(predicted, groundtruth,
+                                 predicted_parts=BaseMetric.split_content(predicted),
+                                 groundtruth_parts=BaseMetric.split_content(groundtruth))
+        self.assertFalse(predicted_parts.is_materialized('table'))
+        self.assertEqual(lazy.score, eager.score)
+        self.assertEqual(lazy.details, eager.details)
+
+
+class TestEditDistanceModes(unittest.TestCase):
+    """测试编辑距离的 banded / anchored 计算方式"""
+
+    def _page(self, rng, lines):
+        words = ["lorem", "ipsum", "dolor", "sit", "amet", "forum", "reply", "quote"]
+        return "\n".join(" ".join(rng.choice(words) for _ in range(rng.randint(3, 12)))
+                         for _ in range(lines))
+
+    def test_banded_cutoff(self):
+        """测试差异在阈值内时结果精确，超过阈值时距离按较长文本长度计并标记为近似"""
+        from webmainbench.metrics.text_metrics import EditDistanceMetric
+
+        exact = EditDistanceMetric("edit")
+        banded = EditDistanceMetric("edit", {"distance_mode": "banded", "max_distance_ratio": 0.3})
+
+        close = banded.calculate("hello world", "hello word")
+        self.assertEqual(close.score, exact.calculate("hello world", "hello word").score)
+        self.assertFalse(close.details["approximate"])
+
+        far = banded.calculate("abcdefghij", "zyxwvutsrq")
+        self.assertTrue(far.details["approximate"])
+        self.assertEqual(far.details["distance"], 10)
+        self.assertEqual(far.score, 0.0)
+
+        failed = banded.calculate("a" * 1000, "b" * 1000)
+        self.assertEqual((failed.score, failed.details["distance"]), (0.0, 1000))
+        self.assertNotIn("approximate", exact.calculate("abc", "abd").details)
+
+    def test_banded_never_exceeds_exact(self):
+        """测试 banded 的分数不高于精确分数（近似距离是上界）"""
+        import random
+        from webmainbench.metrics.text_metrics import EditDistanceMetric
+
+        rng = random.Random(0)
+        exact = EditDistanceMetric("edit")
+        for ratio in (0.1, 0.3, 0.5):
+            banded = EditDistanceMetric("edit", {"distance_mode": "banded", "max_distance_ratio": ratio})
+            for _ in range(50):
+                predicted = self._page(rng, rng.randint(1, 8))
+                groundtruth = self._page(rng, rng.randint(1, 8)) if rng.random() < 0.5 else predicted[::-1]
+                exact_result = exact.calculate(predicted, groundtruth)
+                banded_result = banded.calculate(predicted, groundtruth)
+                self.assertLessEqual(banded_result.score, exact_result.score)
+                self.assertGreaterEqual(banded_result.details["distance"], exact_result.details["distance"])
+
+    def test_anchored_upper_bound(self):
+        """测试按行锚定的编辑距离不小于精确值，且对相似的长文本接近精确值"""
+        import random
+        from webmainbench.metrics.text_metrics import EditDistanceMetric
+
+        rng = random.Random(0)
+        exact = EditDistanceMetric("edit")
+        anchored = EditDistanceMetric("edit", {"distance_mode": "anchored", "anchor_min_length": 0})
+        for _ in range(20):
+            predicted = self._page(rng, rng.randint(1, 60))
+            lines = predicted.split("\n")
+            groundtruth = "\n".join(line if rng.random() > 0.2 else line[::-1]
+                                    for line in lines if rng.random() > 0.1)
+            exact_result = exact.calculate(predicted, groundtruth)
+            anchored_result = anchored.calculate(predicted, groundtruth)
+            self.assertGreaterEqual(anchored_result.details["distance"], exact_result.details["distance"])
+            self.assertAlmostEqual(anchored_result.score, exact_result.score, delta=0.05)
+
+        # 较短的文本仍精确计算
+        short = EditDistanceMetric("edit", {"distance_mode": "anchored"}).calculate("a\nb", "a\nc")
+        self.assertFalse(short.details["approximate"])
+
+    def test_unknown_mode(self):
+        """测试未知的计算方式"""
+        from webmainbench.metrics.text_metrics import EditDistanceMetric
+
+        with self.assertRaises(ValueError):
+            EditDistanceMetric("edit", {"distance_mode": "fast"})
+
+
 def run_visual_test():
     """运行可视化测试（保留原有的打印功能）"""
     print("=== 新指标功能测试 ===\n")
@@ -235,5 +235,113 @@ class TestTableExtraction(unittest.TestCase):
         self.assertIn(expected_table, result['table'])
 
 
+def _random_markup(rng, count):
+    """随机拼接标签和文本片段（含未闭合、多余结束标签、嵌套表格、实体等）"""
+    pieces = [
+        '<table>', '</table>', '<TABLE border="1">', '<Table\n>', '<table/>', '<tr>', '</tr>',
+        '<td>', '</td >', '<td colspan=2>', '<th/>', '<tbody>', '</tbody>', '<div>', '</div>',
+        '<p>', '</p>', '<b>', '</b>', '<br>', '<hr/>', '<col span=2>', '<img src="a>b">',
+        '<a href=\'q\'>', '</a>', '<td class=" a  b" nowrap title=\'x"y\'>', '<td b=1 a=2 b=3>',
+        '<pre>', '</pre>', '<!-- note -->', '<script>x</script>', '<https://x.com>', '</br>',
+        'text', ' a < b ', '<3', '\n', '  ', '\n \n', '| a | b |', '&nbsp;', '&amp;x', '&#32;',
+        '&copy x', '&unknown;', 'R&D;', 'Q&A', '&notit;', '&#128;', '&#x41;', '&gt', '`code`', '$x$',
+        'a&#', 'Q&#A ', '&#;', '&#x', '&#65', '&amp',
+    ]
+    return ''.join(rng.choice(pieces) for _ in range(rng.randint(0, count)))
+
+
+class TestHtmlParserBackends(unittest.TestCase):
+    """测试快速HTML解析与 BeautifulSoup 的结果一致"""
+
+    def _fixture_texts(self):
+        import json
+        texts = []
+        data_file = os.path.join(os.path.dirname(__file__), '..', 'data', 'test_model.jsonl')
+        with open(data_file, encoding='utf-8') as f:
+            for line in f:
+                item = json.loads(line)
+                for key in ('groundtruth_llm_webkit_md', 'llm_webkit_md', 'html'):
+                    if item.get(key):
+                        texts.append(item[key])
+        return texts
+
+    def test_split_parity_on_fixtures(self):
+        """测试数据集样例上两种后端的分割结果完全相同"""
+        for text in self._fixture_texts():
+            self.assertEqual(BaseMetric.split_content(text, html_parser='fast'),
+                             BaseMetric.split_content(text, html_parser='bs4'))
+
+    def test_table_parity_on_random_markup(self):
+        """测试随机标签组合下两种后端提取的表格HTML完全相同"""
+        import random
+        from webmainbench.metrics.html_tables import find_html_tables
+
+        rng = random.Random(0)
+        for _ in range(2000):
+            text = _random_markup(rng, 30)
+            self.assertEqual(find_html_tables(text, 'fast'), find_html_tables(text, 'bs4'), repr(text))
+
+    def test_table_parity_on_character_references(self):
+        """测试未知实体、未以分号结尾的引用及文本末尾的引用与 BeautifulSoup 结果一致"""
+        from webmainbench.metrics.html_tables import find_html_tables
+        from webmainbench.metrics.table_metrics import TableEditMetric
+
+        texts = [
+            '<table><tr><td>R&D;</td><td>x &foo; y</td></tr></table>',
+            '<table><tr><td>a &gt',
+            '<table><tr><td>a &gt;</td><td>&notit; &notin; &#128; &#x41; Q&A</td></tr></table>',
+            '<table><tr><td title="R&D; &gt">q</td></tr></table>',
+            # 表格之前未结束的 &# 使 html.parser 把其后的全文当作文本
+            'a&#<table>x</table>',
+            'Q&#A <table><tr><td>1</td></tr></table>',
+            'x &#; y <table><tr><td>1</td></tr></table>',
+        ]
+        for text in texts:
+            with self.subTest(text=text):
+                self.assertEqual(find_html_tables(text, 'fast'), find_html_tables(text, 'bs4'))
+
+        groundtruth = '<table><tr><td>R&amp;D</td><td>x &amp;foo y</td></tr></table>'
+        predicted = texts[0]
+        scores = [
+            TableEditMetric('table_edit', {'html_parser': html_parser}).calculate(predicted, groundtruth).score
+            for html_parser in ('fast', 'bs4')
+        ]
+        self.assertEqual(scores[0], scores[1])
+
+        # 同一篇 markdown 的各项指标在两种后端下相同
+        from webmainbench.metrics import MetricCalculator
+        markdown = 'Q&#A 说明文字\n\n<table><tr><td>1</td><td>2</td></tr></table>\n\n结尾'
+        reference = '说明文字\n\n<table><tr><td>1</td><td>2</td></tr></table>'
+        results = [
+            MetricCalculator({'html_parser': html_parser}).calculate_all(markdown, reference)
+            for html_parser in ('fast', 'bs4')
+        ]
+        self.assertEqual(
+            {name: (result.score, result.success) for name, result in results[0].items()},
+            {name: (result.score, result.success) for name, result in results[1].items()},
+        )
+
+    def test_fast_path_without_bs4(self):
+        """测试规整表格及无表格文本不经过 BeautifulSoup"""
+        from unittest import mock
+        from webmainbench.metrics import html_tables
+
+        text = "文字 `a < b`\n<table><tr><td colspan=\"2\">x &amp; y</td></tr></table>\n| a |"
+        # 每种字符引用只在第一次出现时与 BeautifulSoup 的解码结果核对一次
+        html_tables.find_html_tables(text, 'fast')
+        with mock.patch.object(html_tables, 'BeautifulSoup', side_effect=AssertionError):
+            self.assertEqual(html_tables.find_html_tables(text, 'fast'),
+                             ['<table><tr><td colspan="2">x &amp; y</td></tr></table>'])
+            self.assertEqual(html_tables.find_html_tables("没有表格的文本 <b>x</b>", 'fast'), [])
+
+        # 注释等不支持的写法回退到 BeautifulSoup
+        with mock.patch.object(html_tables, 'BeautifulSoup', wraps=html_tables.BeautifulSoup) as soup:
+            html_tables.find_html_tables("<!-- x --><table></table>", 'fast')
+            self.assertEqual(soup.call_count, 1)
+
+        with self.assertRaises(ValueError):
+            html_tables.check_html_parser('lxml')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -449,6 +449,149 @@ class TestTEDSEdgeCases(unittest.TestCase):
         self.assertLess(result.score, 1.0)
 
 
+def _reference_tree_distance(tree1, tree2, structure_only=True):
+    """按定义递归计算的有序森林编辑距离（带记忆化），仅用于小树校验"""
+    from functools import lru_cache
+
+    def freeze(node):
+        label = (node['tag'], node['attrs'].get('colspan'), node['attrs'].get('rowspan'),
+                 None if structure_only else node['text'])
+        return (label, tuple(freeze(child) for child in node['children']))
+
+    def size(forest):
+        return sum(1 + size(children) for _, children in forest)
+
+    @lru_cache(maxsize=None)
+    def dist(forest1, forest2):
+        if not forest1:
+            return size(forest2)
+        if not forest2:
+            return size(forest1)
+        (v_label, v_children), (w_label, w_children) = forest1[-1], forest2[-1]
+        return min(
+            dist(forest1[:-1] + v_children, forest2) + 1,
+            dist(forest1, forest2[:-1] + w_children) + 1,
+            dist(v_children, w_children) + dist(forest1[:-1], forest2[:-1])
+            + (0 if v_label == w_label else 1),
+        )
+
+    return dist((freeze(tree1),), (freeze(tree2),))
+
+
+def _random_table_html(rng, max_nodes):
+    """生成随机嵌套结构的表格HTML（含tbody、colspan和文本）"""
+    def element(depth):
+        tag = rng.choice(["tr", "td", "b", "tbody"] if depth else ["td", "th"])
+        attrs = ' colspan="2"' if rng.random() < 0.2 else ""
+        inner = rng.choice(["", "x", " y ", "z"])
+        if depth and rng.random() < 0.6:
+            inner += "".join(element(depth - 1) for _ in range(rng.randint(1, 3)))
+        return f"<{tag}{attrs}>{inner}</{tag}>"
+
+    html = "<table>" + "".join(element(2) for _ in range(rng.randint(1, 3))) + "</table>"
+    return html if html.count("<") // 2 <= max_nodes else _random_table_html(rng, max_nodes)
+
+
+class TestTreeEditAlgorithm(unittest.TestCase):
+    """Zhang–Shasha 树编辑距离与紧凑表格树测试"""
+
+    def _trees(self, teds, html_str):
+        from bs4 import BeautifulSoup
+        from webmainbench.metrics.table_tree import TableTree
+
+        table = BeautifulSoup(html_str, 'html.parser').find('table')
+        return teds._element_to_tree(table), TableTree.from_element(table, teds.ignore_nodes)
+
+    def test_zhang_shasha_matches_reference(self):
+        """测试在随机小表格上与按定义递归的参考实现一致"""
+        import random
+        from webmainbench.metrics.teds_metrics import _zhang_shasha
+
+        rng = random.Random(0)
+        for structure_only in (True, False):
+            teds = TEDSMetric("teds", {"structure_only": structure_only})
+            for _ in range(100):
+                dict1, tree1 = self._trees(teds, _random_table_html(rng, 10))
+                dict2, tree2 = self._trees(teds, _random_table_html(rng, 10))
+                distance = _zhang_shasha(tree1, tree2, structure_only)
+                self.assertEqual(distance, _reference_tree_distance(dict1, dict2, structure_only))
+                # 旧版自顶向下算法给出的是上界
+                self.assertLessEqual(distance, teds._tree_edit_distance(dict1, dict2))
+
+    def test_table_tree_matches_dict_tree(self):
+        """测试紧凑表格树与原字典树的节点、文本和父子关系一致"""
+        import random
+        from webmainbench.metrics.table_tree import _interner
+
+        def postorder(node, out):
+            child_ids = [postorder(child, out) for child in node['children']]
+            out.append((node['tag'], node['text'], node['attrs'].get('colspan'), child_ids))
+            return len(out) - 1
+
+        rng = random.Random(1)
+        teds = TEDSMetric("teds")
+        for _ in range(50):
+            dict_tree, tree = self._trees(teds, _random_table_html(rng, 30) + "<!-- note -->")
+            expected = []
+            postorder(dict_tree, expected)
+            names = {value_id: value for value, value_id in _interner._ids.items()}
+
+            self.assertEqual(len(tree), len(expected))
+            for index, (tag, text, colspan, child_ids) in enumerate(expected):
+                self.assertEqual(names[int(tree.tags[index])], tag)
+                self.assertEqual(names[int(tree.texts[index])], text)
+                self.assertEqual(names[int(tree.colspans[index])], colspan)
+                self.assertEqual([int(i) for i in tree.parents[child_ids]], [index] * len(child_ids))
+                self.assertEqual([int(i) for i in tree.next_siblings[child_ids[:-1]]], child_ids[1:])
+
+    def test_algorithms_agree_on_tables(self):
+        """测试两种算法在常规表格上得分一致，且可通过配置选择"""
+        rows = [f"<tr><td>{i}</td><td>value {i}</td></tr>" for i in range(40)]
+        table1 = "<table>" + "".join(rows) + "</table>"
+        table2 = "<table>" + "".join(rows[:25] + rows[27:] + ["<tr><td>x</td></tr>"]) + "</table>"
+        table_edit = MetricResult(metric_name="table_edit", score=1.0, success=True)
+
+        results = {}
+        for algorithm in ("zhang_shasha", "simple"):
+            for metric_class in (TEDSMetric, StructureTEDSMetric):
+                teds = metric_class("teds", {"tree_edit_algorithm": algorithm})
+                result = teds.calculate(table1, table2, table_edit_result=table_edit)
+                results[(algorithm, metric_class)] = result
+                self.assertEqual(result.details["tree_edit_algorithm"], algorithm)
+
+        for metric_class in (TEDSMetric, StructureTEDSMetric):
+            self.assertEqual(results[("zhang_shasha", metric_class)].score,
+                             results[("simple", metric_class)].score)
+        self.assertLess(results[("zhang_shasha", TEDSMetric)].score, 1.0)
+
+        with self.assertRaises(ValueError):
+            TEDSMetric("teds", {"tree_edit_algorithm": "unknown"})
+
+    def test_html_parser_backends_agree(self):
+        """测试快速解析与 BeautifulSoup 构建的表格树和得分完全相同"""
+        import random
+        from webmainbench.metrics.table_tree import parse_table_trees
+
+        rng = random.Random(2)
+        tables = [_random_table_html(rng, 30) for _ in range(100)]
+        tables += [table.replace("<td", "<td class=' a  b' rowspan=2", 1) + "<!-- x -->" for table in tables[:10]]
+        table_edit = MetricResult(metric_name="table_edit", score=1.0, success=True)
+
+        for algorithm in ("zhang_shasha", "simple"):
+            fast = TEDSMetric("teds", {"tree_edit_algorithm": algorithm, "html_parser": "fast"})
+            bs4 = TEDSMetric("teds", {"tree_edit_algorithm": algorithm, "html_parser": "bs4"})
+            for table1, table2 in zip(tables, tables[1:]):
+                self.assertEqual(fast._parse_html_table(table1), bs4._parse_html_table(table1))
+                fast_tree, = parse_table_trees([table1], fast.ignore_nodes, "fast")
+                bs4_tree, = parse_table_trees([table1], bs4.ignore_nodes, "bs4")
+                self.assertEqual(fast_tree.labels.tolist(), bs4_tree.labels.tolist())
+                self.assertEqual(fast_tree.parents.tolist(), bs4_tree.parents.tolist())
+                self.assertEqual(
+                    fast.calculate(table1, table2, table_edit_result=table_edit).score,
+                    bs4.calculate(table1, table2, table_edit_result=table_edit).score,
+                )
+
+
 def run_all_teds_tests():
     """Run all TEDS tests - 运行所有TEDS测试"""
     loader = unittest.TestLoader()
@@ -460,7 +603,8 @@ def run_all_teds_tests():
         # TestTEDSBasic,
         TestTEDSAdvanced,
         TestStructureTEDS,
-        TestTEDSEdgeCases
+        TestTEDSEdgeCases,
+        TestTreeEditAlgorithm
     ]
 
     for test_class in test_classes:
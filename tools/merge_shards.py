@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+合并多机分片评测的结果
+
+各机器以相同参数运行 evaluate_batched(..., run_dir=共享目录, shard_index=i, num_shards=n)，
+全部分片完成后在任意一台机器上运行：
+
+python tools/merge_shards.py runs/llm-webkit results/llm-webkit.json --results-file results/llm-webkit.jsonl
+"""
+
+import argparse
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from webmainbench import DataSaver, Evaluator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合并分片评测结果")
+    parser.add_argument("run_dir", help="各分片共用的运行目录")
+    parser.add_argument("output", help="合并后的评测结果JSON文件")
+    parser.add_argument("--results-file", default=None, help="可选：按数据集顺序写入全部样本结果的JSONL文件")
+    args = parser.parse_args()
+
+    result = Evaluator().merge_shards(args.run_dir, output_file=args.results_file)
+    DataSaver.save_evaluation_results(result, args.output)
+    print(f"Overall Score: {result.overall_metrics.get('overall', 0.0):.4f}")
+    print(f"结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
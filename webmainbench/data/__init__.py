@@ -5,6 +5,8 @@ This module handles loading, saving and managing benchmark datasets.
 """
 
 from .dataset import BenchmarkDataset, DataSample
+from .index import JsonlIndex
+from .lazy import LazyBenchmarkDataset, LazyDataSample
 from .loader import DataLoader
 from .saver import DataSaver
 
@@ -12,5 +14,8 @@ __all__ = [
     "BenchmarkDataset",
     "DataSample", 
     "DataLoader",
+    "JsonlIndex",
+    "LazyBenchmarkDataset",
+    "LazyDataSample",
     "DataSaver",
 ] 
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+Parquet storage for benchmark datasets.
+
+Every DataSample field is a compressed string column; list and dict
+fields (content lists, tags, extraction results) are stored as JSON
+text. Loads read only the requested columns, and category / language /
+difficulty filters are pushed down to the Parquet scan, so filtering or
+rescoring never decodes the HTML columns. Requires ``pyarrow``.
+"""
+
+import dataclasses
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from .dataset import DataSample
+from .serialization import dumps, loads
+
+SAMPLE_FIELDS = tuple(f.name for f in dataclasses.fields(DataSample))
+JSON_FIELDS = ("groundtruth_content_list", "content_list", "tags", "extracted_results")
+REQUIRED_FIELDS = ("id", "html", "groundtruth_content", "groundtruth_content_list")
+# 重新计算指标只需要 groundtruth 和分组元数据
+RESCORE_COLUMNS = ("id", "groundtruth_content", "groundtruth_content_list",
+                   "url", "domain", "language", "content_type", "difficulty")
+# load_parquet/stream_parquet_batched 的过滤参数 -> 列名
+FILTER_COLUMNS = {"categories": "content_type", "languages": "language", "difficulties": "difficulty"}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("pyarrow is required for Parquet datasets: pip install webmainbench[parquet]") from e
+    return pyarrow
+
+
+def write_parquet(samples: Iterable[DataSample],
+                  file_path: Union[str, Path],
+                  include_results: bool = True,
+                  compression: str = "zstd",
+                  row_group_size: int = 1000) -> None:
+    """Write samples to a Parquet file with one compressed string column per field."""
+    pa = _import_pyarrow()
+    fields = [name for name in SAMPLE_FIELDS if include_results or name != "extracted_results"]
+    columns: Dict[str, List[Optional[str]]] = {name: [] for name in fields}
+    for sample in samples:
+        for name in fields:
+            value = getattr(sample, name)
+            if name in JSON_FIELDS and value is not None:
+                value = dumps(value)
+            columns[name].append(value)
+
+    schema = pa.schema([(name, pa.string()) for name in fields])
+    table = pa.table(columns, schema=schema)
+    pa.parquet.write_table(table, str(file_path), compression=compression, row_group_size=row_group_size)
+
+
+def iter_parquet_samples(file_path: Union[str, Path],
+                         columns: Optional[Sequence[str]] = None,
+                         categories: Optional[List[str]] = None,
+                         languages: Optional[List[str]] = None,
+                         difficulties: Optional[List[str]] = None,
+                         max_samples: Optional[int] = None) -> Iterator[DataSample]:
+    """
+    Read samples from a Parquet file in file order.
+
+    Only ``columns`` (plus ``id``) are read; fields that are not read are
+    None. The filters are evaluated by the Parquet scan.
+    """
+    pa = _import_pyarrow()
+    dataset = pa.dataset.dataset(str(file_path), format="parquet")
+    if columns:
+        columns = ["id"] + [name for name in columns if name != "id"]
+        unknown = [name for name in columns if name not in dataset.schema.names]
+        if unknown:
+            raise ValueError(f"Unknown columns in {file_path}: {', '.join(unknown)}")
+    else:
+        columns = [name for name in dataset.schema.names if name in SAMPLE_FIELDS]
+
+    expression = None
+    for values, column in ((categories, FILTER_COLUMNS["categories"]),
+                           (languages, FILTER_COLUMNS["languages"]),
+                           (difficulties, FILTER_COLUMNS["difficulties"])):
+        if values:
+            condition = pa.dataset.field(column).isin(list(values))
+            expression = condition if expression is None else expression & condition
+
+    sample_count = 0
+    for record_batch in dataset.to_batches(columns=columns, filter=expression):
+        for row in record_batch.to_pylist():
+            yield _row_to_sample(row)
+            sample_count += 1
+            if max_samples and sample_count >= max_samples:
+                return
+
+
+def _row_to_sample(row: Dict[str, Any]) -> DataSample:
+    values = {name: None for name in REQUIRED_FIELDS}
+    for name, value in row.items():
+        if name in JSON_FIELDS and value is not None:
+            value = loads(value)
+        values[name] = value
+    return DataSample(**values)
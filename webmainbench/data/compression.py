@@ -0,0 +1,64 @@
+"""
+Transparent compression for dataset and result files.
+
+The codec is chosen by file extension (``.gz``, ``.bz2``, ``.xz``, ``.zst``);
+other paths are opened as plain files. Compressed files are read and
+written as streams, and appending adds a new compressed member/frame, which
+all four formats decode as one continuous stream. ``.zst`` requires the
+optional ``zstandard`` package.
+"""
+
+import bz2
+import gzip
+import lzma
+from pathlib import Path
+from typing import IO, Optional, Union
+
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+# gzip 默认压缩级别 9 写入大结果文件太慢
+GZIP_LEVEL = 6
+
+
+def compression_of(file_path: Union[str, Path]) -> Optional[str]:
+    """Codec implied by the extension of ``file_path`` (None for plain files)."""
+    return COMPRESSION_SUFFIXES.get(Path(file_path).suffix.lower())
+
+
+def strip_compression(file_path: Union[str, Path]) -> Path:
+    """``file_path`` without its compression extension, e.g. ``results.jsonl`` for ``results.jsonl.zst``."""
+    file_path = Path(file_path)
+    return file_path.with_suffix('') if compression_of(file_path) else file_path
+
+
+def data_suffix(file_path: Union[str, Path]) -> str:
+    """Suffix of the data inside the file, e.g. ``.jsonl`` for ``results.jsonl.zst``."""
+    return strip_compression(file_path).suffix.lower()
+
+
+def open_file(file_path: Union[str, Path], mode: str = 'r',
+              encoding: Optional[str] = 'utf-8', newline: Optional[str] = None) -> IO:
+    """
+    Open ``file_path`` like ``open``, compressing or decompressing by extension.
+
+    ``mode`` is one of r/w/a/x with an optional ``b``; text mode uses ``encoding``.
+    """
+    binary = 'b' in mode
+    base_mode = mode.replace('b', '').replace('t', '')
+    text_kwargs = {} if binary else {"encoding": encoding, "newline": newline}
+    codec = compression_of(file_path)
+    file_path = str(file_path)
+
+    if codec is None:
+        return open(file_path, mode, **text_kwargs)
+    codec_mode = base_mode + ('b' if binary else 't')
+    if codec == "gzip":
+        return gzip.open(file_path, codec_mode, compresslevel=GZIP_LEVEL, **text_kwargs)
+    if codec == "bz2":
+        return bz2.open(file_path, codec_mode, **text_kwargs)
+    if codec == "xz":
+        return lzma.open(file_path, codec_mode, **text_kwargs)
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstandard is required for .zst files: pip install zstandard") from e
+    return zstandard.open(file_path, codec_mode, **text_kwargs)
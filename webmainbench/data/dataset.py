@@ -3,15 +3,24 @@ Dataset classes for WebMainBench.
 """
 
 from abc import ABC, abstractmethod
+import dataclasses
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Any, Union
 import json
 from pathlib import Path
 
+from ..utils.helpers import with_slots
 
+
+@with_slots
 @dataclass
 class DataSample:
-    """Single data sample in the benchmark dataset."""
+    """
+    Single data sample in the benchmark dataset.
+
+    Fields are stored in ``__slots__``: a fully loaded dataset keeps no
+    per-sample ``__dict__``.
+    """
     
     # Required fields
     id: str
@@ -56,29 +65,22 @@ class DataSample:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "DataSample":
         """Create from dictionary, ignoring unknown fields and supporting field mapping."""
-        # 获取类的所有字段名
-        import dataclasses
-        field_names = {f.name for f in dataclasses.fields(cls)}
-        
-        # 定义字段名映射（外部字段名 -> 内部字段名）
-        field_mapping = {
-            "track_id": "id",  # track_id 映射到 id
-            "content": "groundtruth_content",  # content 映射到 groundtruth_content
-            "content_list": "groundtruth_content_list",  # content_list 映射到 groundtruth_content_list
-        }
-        
-        # 只提取定义的字段，忽略其他字段
-        filtered_data = {}
+        # 单次遍历：字段映射表在模块加载时建好，忽略 layout_id、max_layer_n 等未定义字段
+        values = {}
         for key, value in data.items():
-            # 首先检查是否需要字段映射
-            mapped_key = field_mapping.get(key, key)
-            
-            # 如果映射后的字段名在类字段中，则添加
-            if mapped_key in field_names:
-                filtered_data[mapped_key] = value
-            # 忽略未定义的字段，如 layout_id、max_layer_n 等
-        
-        return cls(**filtered_data)
+            name = _FIELD_MAPPING.get(key)
+            if name is not None:
+                values[name] = value
+        return cls(**values)
+
+
+# 外部字段名 -> 内部字段名；content / content_list 是 groundtruth 的外部名称
+_FIELD_MAPPING = {f.name: f.name for f in dataclasses.fields(DataSample)}
+_FIELD_MAPPING.update({
+    "track_id": "id",
+    "content": "groundtruth_content",
+    "content_list": "groundtruth_content_list",
+})
 
 
 class BenchmarkDataset:
@@ -89,17 +91,41 @@ class BenchmarkDataset:
         self.description = description
         self.samples: List[DataSample] = []
         self._metadata: Dict[str, Any] = {}
+        # id -> 样本在 samples 中的位置（重复 id 取第一个）。samples 是公开的列表，可能被整体替换或直接修改：
+        # 列表对象或长度变化时重建；命中时核对该位置的样本 id，不符或未命中时按当前列表重建后再查
+        self._sample_positions: Dict[str, int] = {}
+        self._indexed_samples: Optional[List[DataSample]] = None
+        self._indexed_count = 0
     
     def add_sample(self, sample: DataSample) -> None:
         """Add a data sample to the dataset."""
         self.samples.append(sample)
+        if self._indexed_samples is self.samples and self._indexed_count == len(self.samples) - 1:
+            self._sample_positions.setdefault(sample.id, self._indexed_count)
+            self._indexed_count += 1
     
     def get_sample(self, sample_id: str) -> Optional[DataSample]:
         """Get a sample by ID."""
-        for sample in self.samples:
-            if sample.id == sample_id:
-                return sample
+        rebuilt = self._indexed_samples is not self.samples or self._indexed_count != len(self.samples)
+        if rebuilt:
+            self._build_sample_index()
+        position = self._sample_positions.get(sample_id)
+        if position is not None and self.samples[position].id == sample_id:
+            return self.samples[position]
+        if not rebuilt:
+            self._build_sample_index()
+            position = self._sample_positions.get(sample_id)
+            if position is not None:
+                return self.samples[position]
         return None
+
+    def _build_sample_index(self) -> None:
+        positions: Dict[str, int] = {}
+        for position, sample in enumerate(self.samples):
+            positions.setdefault(sample.id, position)
+        self._sample_positions = positions
+        self._indexed_samples = self.samples
+        self._indexed_count = len(self.samples)
     
     def filter_by_criteria(self, **kwargs) -> List[DataSample]:
         """Filter samples by criteria (e.g., language='en', difficulty='hard')."""
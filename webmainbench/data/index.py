@@ -0,0 +1,164 @@
+"""
+Byte-offset index for JSONL datasets.
+
+The sidecar file ``<dataset>.jsonl.idx`` stores, for every line that loads
+as a DataSample, its byte offset and length, line number, sample id and
+content_type, plus the light metadata fields (see ``LIGHT_FIELDS``). With
+it a sample can be read by id with a single seek, category filters, id-based
+sharding and resume skipping can be decided, and a lazy dataset can be set
+up, without decoding the HTML of the other lines.
+"""
+
+import bisect
+import dataclasses
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from .compression import compression_of
+from .dataset import DataSample
+from .serialization import dumps, loads
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 2
+
+# 访问时才从文件解码的字段；其余（轻量）字段保存在索引中
+HEAVY_FIELDS = (
+    "html", "groundtruth_content", "groundtruth_content_list",
+    "content_list", "content", "llm_webkit_md", "llm_webkit_html",
+)
+LIGHT_FIELDS = tuple(f.name for f in dataclasses.fields(DataSample) if f.name not in HEAVY_FIELDS)
+
+
+class JsonlIndex:
+    """Sample positions of a JSONL dataset file, in file order."""
+
+    def __init__(self, file_path: Union[str, Path],
+                 offsets: List[int], lengths: List[int], line_numbers: List[int],
+                 ids: List[str], categories: List[Optional[str]],
+                 metadata: List[Dict[str, Any]]):
+        self.file_path = Path(file_path)
+        self.offsets = offsets
+        self.lengths = lengths
+        self.line_numbers = line_numbers
+        self.ids = ids
+        self.categories = categories
+        # 每个样本取值非空的轻量字段
+        self.metadata = metadata
+        self._positions: Dict[str, int] = {}
+        # 重复 id 与 BenchmarkDataset.get_sample 一致，取第一个
+        for position, sample_id in enumerate(ids):
+            self._positions.setdefault(sample_id, position)
+
+    @staticmethod
+    def index_path(file_path: Union[str, Path]) -> Path:
+        """Path of the sidecar index of ``file_path``."""
+        file_path = Path(file_path)
+        return file_path.with_name(file_path.name + INDEX_SUFFIX)
+
+    @classmethod
+    def build(cls, file_path: Union[str, Path]) -> "JsonlIndex":
+        """Scan ``file_path`` once and index every line that loads as a DataSample."""
+        if compression_of(file_path):
+            raise ValueError(f"Byte offsets need an uncompressed JSONL file: {file_path}")
+        offsets, lengths, line_numbers, ids, categories, metadata = [], [], [], [], [], []
+        offset = 0
+        with open(file_path, 'rb') as f:
+            for line_idx, line in enumerate(f):
+                if line.strip():
+                    try:
+                        sample = DataSample.from_dict(loads(line))
+                    except Exception as e:
+                        print(f"Warning: Failed to load sample at line {line_idx}: {e}")
+                    else:
+                        offsets.append(offset)
+                        lengths.append(len(line))
+                        line_numbers.append(line_idx)
+                        ids.append(sample.id)
+                        categories.append(sample.content_type)
+                        metadata.append(_light_metadata(sample))
+                offset += len(line)
+        return cls(file_path, offsets, lengths, line_numbers, ids, categories, metadata)
+
+    @classmethod
+    def load(cls, file_path: Union[str, Path]) -> Optional["JsonlIndex"]:
+        """The saved index of ``file_path``, or None if it is missing or out of date."""
+        index_path = cls.index_path(file_path)
+        if not index_path.exists():
+            return None
+        with open(index_path, 'rb') as f:
+            data = loads(f.read())
+        stat = os.stat(file_path)
+        if (data.get("version") != INDEX_VERSION or data["source_size"] != stat.st_size
+                or data["source_mtime_ns"] != stat.st_mtime_ns):
+            return None
+        return cls(file_path, data["offsets"], data["lengths"], data["line_numbers"],
+                   data["ids"], data["categories"], data["metadata"])
+
+    def save(self) -> None:
+        """Write the sidecar index next to the dataset file."""
+        stat = os.stat(self.file_path)
+        index_path = self.index_path(self.file_path)
+        tmp_path = index_path.with_name(index_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(dumps({
+                "version": INDEX_VERSION,
+                "source_size": stat.st_size,
+                "source_mtime_ns": stat.st_mtime_ns,
+                "offsets": self.offsets,
+                "lengths": self.lengths,
+                "line_numbers": self.line_numbers,
+                "ids": self.ids,
+                "categories": self.categories,
+                "metadata": self.metadata,
+            }))
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def open(cls, file_path: Union[str, Path], rebuild: bool = False) -> "JsonlIndex":
+        """Load the index of ``file_path``, building and saving it if needed."""
+        index = None if rebuild else cls.load(file_path)
+        if index is None:
+            index = cls.build(file_path)
+            index.save()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def position(self, sample_id: str) -> Optional[int]:
+        """Position of ``sample_id`` in the file (None if it is not in the dataset)."""
+        return self._positions.get(sample_id)
+
+    def positions(self, categories: Optional[Iterable[str]] = None) -> List[int]:
+        """Positions of all samples, or of the samples whose content_type is in ``categories``."""
+        if not categories:
+            return list(range(len(self)))
+        categories = set(categories)
+        return [position for position, category in enumerate(self.categories) if category in categories]
+
+    def line_position(self, line_number: int) -> int:
+        """Position of the first sample at or after ``line_number``."""
+        return bisect.bisect_left(self.line_numbers, line_number)
+
+    def read(self, position: int) -> Dict[str, Any]:
+        """Decode the JSON object at ``position``."""
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offsets[position])
+            return loads(f.read(self.lengths[position]))
+
+    def get_sample(self, sample_id: str) -> Optional[DataSample]:
+        """Read a single sample by id."""
+        position = self.position(sample_id)
+        return None if position is None else DataSample.from_dict(self.read(position))
+
+    def iter_samples(self, positions: Iterable[int]) -> Iterator[DataSample]:
+        """Read the samples at ``positions`` (in the given order) through one file handle."""
+        with open(self.file_path, 'rb') as f:
+            for position in positions:
+                f.seek(self.offsets[position])
+                yield DataSample.from_dict(loads(f.read(self.lengths[position])))
+
+
+def _light_metadata(sample: DataSample) -> Dict[str, Any]:
+    return {name: getattr(sample, name) for name in LIGHT_FIELDS if getattr(sample, name) is not None}
@@ -0,0 +1,123 @@
+"""
+Lazily loaded JSONL datasets.
+
+``LazyBenchmarkDataset`` memory-maps the JSONL file and keeps only the
+light metadata of every sample (id, url, language, content_type, ...),
+which is read from the sidecar index, so setting up the dataset does not
+decode any record.
+The heavy fields (HTML, groundtruth content, content lists) are decoded
+from the mapped file when they are accessed; the last few decoded samples
+are kept in a small LRU cache and the rest are dropped, so a full
+evaluation needs memory for a handful of pages instead of the whole file.
+"""
+
+import dataclasses
+import mmap
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from .dataset import BenchmarkDataset, DataSample
+from .index import HEAVY_FIELDS, LIGHT_FIELDS, JsonlIndex
+from .serialization import loads
+
+
+class LazyDataSample(DataSample):
+    """
+    DataSample whose heavy fields are read from a ``LazyBenchmarkDataset`` on access.
+
+    Assigning a heavy field stores the value on the sample. Pickling (e.g.
+    for worker processes) produces a plain, fully loaded DataSample.
+    """
+
+    def __init__(self, dataset: "LazyBenchmarkDataset", position: int, metadata: Dict[str, Any]):
+        self._dataset = dataset
+        self._position = position
+        self._overrides: Dict[str, Any] = {}
+        for name in LIGHT_FIELDS:
+            setattr(self, name, metadata.get(name))
+
+    def to_sample(self) -> DataSample:
+        """A fully loaded copy of this sample."""
+        return DataSample(**{f.name: getattr(self, f.name) for f in dataclasses.fields(DataSample)})
+
+    def __reduce__(self):
+        return (DataSample, tuple(getattr(self, f.name) for f in dataclasses.fields(DataSample)))
+
+
+def _lazy_field(name: str) -> property:
+    def getter(self: LazyDataSample) -> Any:
+        if name in self._overrides:
+            return self._overrides[name]
+        return getattr(self._dataset._decode(self._position), name)
+
+    def setter(self: LazyDataSample, value: Any) -> None:
+        self._overrides[name] = value
+
+    return property(getter, setter)
+
+
+for _name in HEAVY_FIELDS:
+    setattr(LazyDataSample, _name, _lazy_field(_name))
+del _name
+
+
+class LazyBenchmarkDataset(BenchmarkDataset):
+    """BenchmarkDataset over a memory-mapped JSONL file (see module docstring)."""
+
+    def __init__(self, file_path: Union[str, Path], name: Optional[str] = None,
+                 description: str = "", cache_size: int = 4):
+        """
+        Args:
+            file_path: Path to the JSONL file
+            name: Dataset name (default: file name without suffix)
+            description: Dataset description
+            cache_size: Number of decoded samples kept in memory
+        """
+        self.file_path = Path(file_path)
+        super().__init__(name or self.file_path.stem, description)
+        self.cache_size = max(cache_size, 1)
+        self._cache: "OrderedDict[int, DataSample]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._index = JsonlIndex.open(self.file_path)
+
+        self._file = open(self.file_path, 'rb')
+        # 空文件不能 mmap
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if len(self._index) else None
+
+        # 轻量字段直接取自索引，不解码任何记录
+        for position, metadata in enumerate(self._index.metadata):
+            self.add_sample(LazyDataSample(self, position, metadata))
+
+    def _load(self, position: int) -> DataSample:
+        offset, length = self._index.offsets[position], self._index.lengths[position]
+        return DataSample.from_dict(loads(self._mmap[offset:offset + length]))
+
+    def _decode(self, position: int) -> DataSample:
+        """The fully decoded sample at ``position`` (through the LRU cache)."""
+        with self._lock:
+            sample = self._cache.get(position)
+            if sample is not None:
+                self._cache.move_to_end(position)
+                return sample
+        sample = self._load(position)
+        with self._lock:
+            self._cache[position] = sample
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return sample
+
+    def close(self) -> None:
+        """Release the memory map and the file handle."""
+        self._cache.clear()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self) -> "LazyBenchmarkDataset":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
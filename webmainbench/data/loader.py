@@ -2,33 +2,52 @@
 Data loader for WebMainBench.
 """
 
-import json
+import hashlib
+import itertools
 import jsonlines
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union, Iterator
+from typing import List, Dict, Any, Optional, Set, Tuple, Union, Iterator
 from .dataset import BenchmarkDataset, DataSample
+from .columnar import iter_parquet_samples
+from .compression import data_suffix, open_file, strip_compression
+from .index import JsonlIndex
+from .serialization import loads
+from .lazy import LazyBenchmarkDataset
+
+# 分片方式: hash 按样本id的稳定哈希分配，range 按文件行号切成连续区间
+SHARD_MODES = ("hash", "range")
+
+
+def stable_shard(sample_id: str, num_shards: int) -> int:
+    """样本id所属的分片（md5，跨进程、跨机器稳定，不受 PYTHONHASHSEED 影响）"""
+    digest = hashlib.md5(str(sample_id).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % num_shards
 
 
 class DataLoader:
     """Data loader for various input formats."""
     
     @staticmethod
-    def load_jsonl(file_path: Union[str, Path], **kwargs) -> BenchmarkDataset:
+    def load_jsonl(file_path: Union[str, Path], lazy: bool = False, **kwargs) -> BenchmarkDataset:
         """
         Load dataset from JSONL file.
         
         Args:
             file_path: Path to the JSONL file
+            lazy: Return a LazyBenchmarkDataset that memory-maps the file and decodes
+                HTML/groundtruth fields only when they are accessed
             **kwargs: Additional parameters for dataset creation
         
         Returns:
             BenchmarkDataset instance
         """
         file_path = Path(file_path)
-        dataset_name = kwargs.get('name', file_path.stem)
+        dataset_name = kwargs.get('name', strip_compression(file_path).stem)
+        if lazy:
+            return LazyBenchmarkDataset(file_path, name=dataset_name, cache_size=kwargs.get('cache_size', 4))
         dataset = BenchmarkDataset(name=dataset_name)
         
-        with jsonlines.open(file_path, 'r') as reader:
+        with open_file(file_path) as f, jsonlines.Reader(f, loads=loads) as reader:
             for idx, line in enumerate(reader):
                 try:
                     # 使用DataSample.from_dict()来正确处理字段映射和过滤
@@ -41,6 +60,36 @@ class DataLoader:
         
         return dataset
     
+    @staticmethod
+    def load_parquet(file_path: Union[str, Path],
+                     columns: Optional[List[str]] = None,
+                     categories: Optional[List[str]] = None,
+                     languages: Optional[List[str]] = None,
+                     difficulties: Optional[List[str]] = None,
+                     max_samples: Optional[int] = None,
+                     **kwargs) -> BenchmarkDataset:
+        """
+        Load dataset from a Parquet file written by DataSaver.save_parquet.
+        
+        Args:
+            file_path: Path to the Parquet file
+            columns: Fields to read (default: all); other fields are None,
+                e.g. columnar.RESCORE_COLUMNS for rescoring without the HTML
+            categories: content_type filter, pushed down to the Parquet scan
+            languages: language filter, pushed down to the Parquet scan
+            difficulties: difficulty filter, pushed down to the Parquet scan
+            max_samples: Maximum number of samples
+            **kwargs: Additional parameters for dataset creation
+        
+        Returns:
+            BenchmarkDataset instance
+        """
+        file_path = Path(file_path)
+        dataset = BenchmarkDataset(name=kwargs.get('name', file_path.stem))
+        for sample in iter_parquet_samples(file_path, columns, categories, languages, difficulties, max_samples):
+            dataset.add_sample(sample)
+        return dataset
+    
     @staticmethod
     def load_json(file_path: Union[str, Path], **kwargs) -> BenchmarkDataset:
         """
@@ -54,11 +103,11 @@ class DataLoader:
             BenchmarkDataset instance
         """
         file_path = Path(file_path)
-        dataset_name = kwargs.get('name', file_path.stem)
+        dataset_name = kwargs.get('name', strip_compression(file_path).stem)
         dataset = BenchmarkDataset(name=dataset_name)
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open_file(file_path) as f:
+            data = loads(f.read())
         
         # Handle different JSON structures
         if isinstance(data, list):
@@ -110,15 +159,15 @@ class DataLoader:
         
         for file_path in dir_path.glob(pattern):
             try:
-                if file_path.suffix == '.jsonl':
+                if data_suffix(file_path) == '.jsonl':
                     dataset = DataLoader.load_jsonl(file_path, **kwargs)
-                elif file_path.suffix == '.json':
+                elif data_suffix(file_path) == '.json':
                     dataset = DataLoader.load_json(file_path, **kwargs)
                 else:
                     print(f"Warning: Unsupported file format: {file_path}")
                     continue
                 
-                datasets[file_path.stem] = dataset
+                datasets[strip_compression(file_path).stem] = dataset
                 
             except Exception as e:
                 print(f"Error loading {file_path}: {e}")
@@ -140,16 +189,18 @@ class DataLoader:
             Merged BenchmarkDataset instance
         """
         merged = BenchmarkDataset(name=name)
+        used_ids = set()
         
         for dataset in datasets:
             for sample in dataset.samples:
                 # Ensure unique IDs
                 original_id = sample.id
                 counter = 1
-                while merged.get_sample(sample.id) is not None:
+                while sample.id in used_ids:
                     sample.id = f"{original_id}_{counter}"
                     counter += 1
                 
+                used_ids.add(sample.id)
                 merged.add_sample(sample)
         
         return merged
@@ -157,7 +208,9 @@ class DataLoader:
     @staticmethod
     def stream_jsonl(file_path: Union[str, Path],
                     categories: Optional[List[str]] = None,
-                    max_samples: Optional[int] = None) -> Iterator[DataSample]:
+                    max_samples: Optional[int] = None,
+                    line_range: Optional[Tuple[int, int]] = None,
+                    use_index: bool = False) -> Iterator[DataSample]:
         """
         流式读取JSONL文件，逐个返回DataSample，减少内存使用。
         
@@ -165,15 +218,23 @@ class DataLoader:
             file_path: JSONL文件路径
             categories: 类别过滤列表
             max_samples: 最大样本数限制
+            line_range: 只读取行号在 [start, end) 内的样本，区间外的行不解析
+            use_index: 使用（必要时构建）字节偏移索引，只解码符合条件的行
             
         Yields:
             DataSample: 逐个生成的数据样本
         """
         file_path = Path(file_path)
+        if use_index:
+            index = JsonlIndex.open(file_path)
+            yield from index.iter_samples(DataLoader._index_positions(index, categories, max_samples, line_range))
+            return
+        start, end = line_range or (0, None)
         
         sample_count = 0
-        with jsonlines.open(file_path, 'r') as reader:
-            for line_idx, line in enumerate(reader):
+        with open_file(file_path) as f, \
+                jsonlines.Reader(itertools.islice(f, start, end), loads=loads) as reader:
+            for line_idx, line in enumerate(reader, start):
                 try:
                     # 创建样本
                     sample = DataSample.from_dict(line)
@@ -198,7 +259,12 @@ class DataLoader:
     def stream_jsonl_batched(file_path: Union[str, Path],
                            batch_size: int = 50,
                            categories: Optional[List[str]] = None,
-                           max_samples: Optional[int] = None) -> Iterator[List[DataSample]]:
+                           max_samples: Optional[int] = None,
+                           skip_ids: Optional[Set[str]] = None,
+                           shard_index: Optional[int] = None,
+                           num_shards: Optional[int] = None,
+                           shard_by: str = "hash",
+                           use_index: bool = False) -> Iterator[List[DataSample]]:
         """
         流式读取JSONL文件，按批次返回DataSample列表。
         
@@ -207,25 +273,143 @@ class DataLoader:
             batch_size: 批次大小
             categories: 类别过滤列表
             max_samples: 最大样本数限制
+            skip_ids: 跳过的样本id（如恢复评测时已完成的样本），仍计入 max_samples
+            shard_index: 只返回第 shard_index 个分片的样本（从0开始）
+            num_shards: 分片总数
+            shard_by: 分片方式，"hash"（样本id的稳定哈希）或 "range"（连续的行区间，不支持 max_samples）
+            use_index: 使用（必要时构建）字节偏移索引，跳过的样本和其他分片的样本不再解码
             
         Yields:
             List[DataSample]: 批次数据样本列表
         """
-        batch = []
-        sample_count = 0
+        line_range = None
+        if num_shards is not None:
+            DataLoader._check_shard(shard_index, num_shards, shard_by)
+            if shard_by == "range":
+                if max_samples:
+                    raise ValueError("shard_by='range' cannot be combined with max_samples")
+                line_range = DataLoader.shard_line_range(file_path, shard_index, num_shards)
+        
+        def keep(sample_id: str) -> bool:
+            if skip_ids and sample_id in skip_ids:
+                return False
+            # 哈希分片在 max_samples 之后过滤，各分片合起来与单机评测的样本相同
+            return shard_by != "hash" or num_shards is None or stable_shard(sample_id, num_shards) == shard_index
+        
+        if use_index:
+            index = JsonlIndex.open(file_path)
+            positions = DataLoader._index_positions(index, categories, max_samples, line_range)
+            samples = index.iter_samples(p for p in positions if keep(index.ids[p]))
+        else:
+            samples = (sample for sample in DataLoader.stream_jsonl(file_path, categories, max_samples, line_range)
+                       if keep(sample.id))
         
-        for sample in DataLoader.stream_jsonl(file_path, categories, max_samples):
+        batch = []
+        for sample in samples:
             batch.append(sample)
-            sample_count += 1
-            
-            # 达到批次大小或样本数限制时返回批次
-            if len(batch) >= batch_size or (max_samples and sample_count >= max_samples):
+            if len(batch) >= batch_size:
                 yield batch
                 batch = []
-                
-                if max_samples and sample_count >= max_samples:
-                    break
         
         # 返回最后一批（如果有）
         if batch:
-            yield batch 
\ No newline at end of file
+            yield batch
+    
+    @staticmethod
+    def stream_parquet_batched(file_path: Union[str, Path],
+                               batch_size: int = 50,
+                               columns: Optional[List[str]] = None,
+                               categories: Optional[List[str]] = None,
+                               languages: Optional[List[str]] = None,
+                               difficulties: Optional[List[str]] = None,
+                               max_samples: Optional[int] = None) -> Iterator[List[DataSample]]:
+        """
+        流式读取Parquet文件，按批次返回DataSample列表。
+        
+        Args:
+            file_path: Parquet文件路径
+            batch_size: 批次大小
+            columns: 读取的字段（默认全部），未读取的字段为None
+            categories: 类别过滤列表（下推到Parquet扫描）
+            languages: 语言过滤列表（下推到Parquet扫描）
+            difficulties: 难度过滤列表（下推到Parquet扫描）
+            max_samples: 最大样本数限制
+            
+        Yields:
+            List[DataSample]: 批次数据样本列表
+        """
+        batch = []
+        for sample in iter_parquet_samples(file_path, columns, categories, languages, difficulties, max_samples):
+            batch.append(sample)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    @staticmethod
+    def _index_positions(index: JsonlIndex,
+                         categories: Optional[List[str]],
+                         max_samples: Optional[int],
+                         line_range: Optional[Tuple[int, int]]) -> List[int]:
+        """按类别、行区间和样本数限制筛选索引中的样本位置，与 stream_jsonl 的筛选顺序一致"""
+        positions = index.positions(categories)
+        if line_range:
+            start, end = index.line_position(line_range[0]), index.line_position(line_range[1])
+            positions = [position for position in positions if start <= position < end]
+        if max_samples:
+            positions = positions[:max_samples]
+        return positions
+    
+    @staticmethod
+    def _check_shard(shard_index: Optional[int], num_shards: int, shard_by: str) -> None:
+        if shard_by not in SHARD_MODES:
+            raise ValueError(f"Unknown shard_by: {shard_by} (expected one of {', '.join(SHARD_MODES)})")
+        if num_shards < 1 or shard_index is None or not 0 <= shard_index < num_shards:
+            raise ValueError(f"Invalid shard {shard_index} of {num_shards}")
+    
+    @staticmethod
+    def count_lines(file_path: Union[str, Path]) -> int:
+        """统计文件行数（按块读取换行符，不解析JSON）"""
+        count = 0
+        last_chunk = b''
+        with open_file(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                count += chunk.count(b'\n')
+                last_chunk = chunk
+        # 最后一行没有换行符
+        if last_chunk and not last_chunk.endswith(b'\n'):
+            count += 1
+        return count
+    
+    @staticmethod
+    def shard_line_range(file_path: Union[str, Path], shard_index: int, num_shards: int) -> Tuple[int, int]:
+        """第 shard_index 个分片的行区间 [start, end)，各分片行数最多相差1"""
+        total_lines = DataLoader.count_lines(file_path)
+        return (shard_index * total_lines // num_shards, (shard_index + 1) * total_lines // num_shards)
+    
+    @staticmethod
+    def stream_sample_results(file_path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+        """
+        流式读取保存的样本评测结果（sample_results）。
+        
+        支持分批评测输出的JSONL文件（每行一个样本结果），以及
+        save_evaluation_results保存的JSON文件（读取其中的sample_results）。
+        
+        Args:
+            file_path: 结果文件路径
+            
+        Yields:
+            Dict: 逐个生成的样本结果
+        """
+        file_path = Path(file_path)
+        
+        if data_suffix(file_path) == '.json':
+            with open_file(file_path) as f:
+                data = loads(f.read())
+            yield from data.get('sample_results', [])
+            return
+        
+        with open_file(file_path) as f, jsonlines.Reader(f, loads=loads) as reader:
+            for sample_result in reader:
+                yield sample_result
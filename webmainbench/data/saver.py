@@ -2,12 +2,14 @@
 Data saver for WebMainBench.
 """
 
-import json
 import jsonlines
 from pathlib import Path
 from typing import Union, List, Dict, Any, TYPE_CHECKING
 
+from .columnar import write_parquet
+from .compression import compression_of, open_file
 from .dataset import BenchmarkDataset, DataSample
+from .serialization import dumps, dumps_line
 
 if TYPE_CHECKING:
     from ..evaluator import EvaluationResult
@@ -32,13 +34,33 @@ class DataSaver:
         file_path = Path(file_path)
         file_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with jsonlines.open(file_path, 'w') as writer:
+        with open_file(file_path, 'w') as f, jsonlines.Writer(f) as writer:
             for sample in dataset.samples:
                 sample_dict = sample.to_dict()
                 if not include_results:
                     sample_dict.pop('extracted_results', None)
                 writer.write(sample_dict)
     
+    @staticmethod
+    def save_parquet(dataset: BenchmarkDataset,
+                     file_path: Union[str, Path],
+                     include_results: bool = True,
+                     compression: str = "zstd",
+                     row_group_size: int = 1000) -> None:
+        """
+        Save dataset to a Parquet file (one compressed column per field).
+        
+        Args:
+            dataset: BenchmarkDataset to save
+            file_path: Output file path
+            include_results: Whether to include extraction results
+            compression: Parquet compression codec (zstd, snappy, gzip, ...)
+            row_group_size: Samples per row group
+        """
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        write_parquet(dataset.samples, file_path, include_results, compression, row_group_size)
+    
     @staticmethod
     def save_json(dataset: BenchmarkDataset, 
                   file_path: Union[str, Path],
@@ -74,13 +96,14 @@ class DataSaver:
                 sample_dict.pop('extracted_results', None)
             data["samples"].append(sample_dict)
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=indent, ensure_ascii=False)
+        with open_file(file_path, 'w') as f:
+            f.write(dumps(data, indent=indent))
     
     @staticmethod
     def save_evaluation_results(results: Union["EvaluationResult", Dict[str, Any]], 
                               file_path: Union[str, Path],
-                              format: str = "json") -> None:
+                              format: str = "json",
+                              include_content: bool = False) -> None:
         """
         Save evaluation results.
         
@@ -88,6 +111,8 @@ class DataSaver:
             results: EvaluationResult instance or evaluation results dictionary
             file_path: Output file path
             format: Output format ("json" or "jsonl")
+            include_content: Keep extracted_content/extracted_content_list so the
+                file can be re-scored with Evaluator.rescore
         """
         file_path = Path(file_path)
         file_path.parent.mkdir(parents=True, exist_ok=True)
@@ -99,13 +124,14 @@ class DataSaver:
             results_dict = results
         
         # 移除extracted_content和extracted_content_list字段以减少文件大小
-        results_dict = DataSaver._remove_content_fields(results_dict)
+        if not include_content:
+            results_dict = DataSaver._remove_content_fields(results_dict)
         
         if format.lower() == "json":
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(results_dict, f, indent=2, ensure_ascii=False)
+            with open_file(file_path, 'w') as f:
+                f.write(dumps(results_dict, indent=2))
         elif format.lower() == "jsonl":
-            with jsonlines.open(file_path, 'w') as writer:
+            with open_file(file_path, 'w') as f, jsonlines.Writer(f) as writer:
                 if isinstance(results_dict, dict) and 'samples' in results_dict:
                     for sample_result in results_dict['samples']:
                         writer.write(sample_result)
@@ -190,7 +216,7 @@ class DataSaver:
             # Final field order
             fieldnames = basic_fields + sorted_metrics
             
-            with open(file_path, 'w', newline='', encoding='utf-8') as f:
+            with open_file(file_path, 'w', newline='') as f:
                 writer = csv.DictWriter(f, fieldnames=fieldnames)
                 writer.writeheader()
                 writer.writerows(csv_data)
@@ -276,13 +302,10 @@ class DataSaver:
     @staticmethod
     def _save_jsonl_list(data_list: List[Dict[str, Any]], file_path: Union[str, Path]) -> None:
         """Save list of dictionaries as JSONL file."""
-        import json
-        
         file_path = Path(file_path)
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with open_file(file_path, 'w') as f:
             for item in data_list:
-                json.dump(item, f, ensure_ascii=False)
-                f.write('\n')
+                f.write(dumps_line(item))
     
     @staticmethod
     def _remove_content_fields(data: Dict[str, Any]) -> Dict[str, Any]:
@@ -322,10 +345,9 @@ class DataSaver:
         file_path.parent.mkdir(parents=True, exist_ok=True)
         
         # 追加模式写入JSONL
-        with open(file_path, 'a', encoding='utf-8') as f:
+        with open_file(file_path, 'a') as f:
             for result in results:
-                json.dump(result, f, ensure_ascii=False)
-                f.write('\n')
+                f.write(dumps_line(result))
     
     @staticmethod
     def save_streaming_results(results_iterator,
@@ -348,7 +370,7 @@ class DataSaver:
         saved_count = 0
         batch = []
         
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with open_file(file_path, 'w') as f:
             for result in results_iterator:
                 batch.append(result)
                 saved_count += 1
@@ -356,15 +378,13 @@ class DataSaver:
                 # 达到批次大小时写入
                 if len(batch) >= batch_size:
                     for item in batch:
-                        json.dump(item, f, ensure_ascii=False)
-                        f.write('\n')
+                        f.write(dumps_line(item))
                     batch = []
             
             # 保存最后一批
             if batch:
                 for item in batch:
-                    json.dump(item, f, ensure_ascii=False)
-                    f.write('\n')
+                    f.write(dumps_line(item))
         
         return saved_count
     
@@ -390,9 +410,10 @@ class StreamingResultWriter:
         self.file_path.parent.mkdir(parents=True, exist_ok=True)
         self.file_handle = None
         self.count = 0
+        self._compressed = compression_of(self.file_path) is not None
     
     def __enter__(self):
-        self.file_handle = open(self.file_path, 'w', encoding='utf-8')
+        self.file_handle = open_file(self.file_path, 'w')
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -402,9 +423,10 @@ class StreamingResultWriter:
     def write_result(self, result: Dict[str, Any]) -> None:
         """写入单个结果"""
         if self.file_handle:
-            json.dump(result, self.file_handle, ensure_ascii=False)
-            self.file_handle.write('\n')
-            self.file_handle.flush()  # 确保立即写入
+            self.file_handle.write(dumps_line(result))
+            # 确保立即写入；压缩文件每次 flush 都会结束一个压缩块，只在关闭时写出
+            if not self._compressed:
+                self.file_handle.flush()
             self.count += 1
     
     def get_count(self) -> int:
@@ -454,5 +476,5 @@ class StreamingResultWriter:
             analysis_data.append(row)
         
         # Save as JSON for easy loading into analysis tools
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(analysis_data, f, indent=2, ensure_ascii=False) 
\ No newline at end of file
+        with open_file(file_path, 'w') as f:
+            f.write(dumps(analysis_data, indent=2)) 
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+JSON serialization used by the dataset and result readers/writers.
+
+Decoding of bytes input (index reads, lazy mmap reads, run results) uses
+``orjson`` when it is installed and the standard library otherwise. Input
+orjson rejects (NaN/Infinity literals, lone surrogate escapes) or would
+decode differently (integers beyond 64 bits) goes to the standard library,
+so both backends return the same objects. The gain is about 2x on
+dict-heavy result records and small on HTML-heavy dataset lines.
+
+Encoding always uses the C-accelerated standard library encoder with
+``ensure_ascii=False``: the native encoders cannot produce its ``", "`` /
+``": "`` separators or Python's float repr (``1e-05``), and result files
+must be byte-identical whichever backend is installed. Writers call
+``dumps`` once per record instead of ``json.dump``, whose chunked
+``iterencode`` path takes about twice as long on typical result records.
+"""
+
+import json
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+    BACKEND = "orjson"
+    _fast_loads: Optional[Callable[[Union[str, bytes]], Any]] = orjson.loads
+except ImportError:
+    BACKEND = "json"
+    _fast_loads = None
+
+
+# orjson 把超出 int64/uint64 的整数解码为 float。这样的整数至少有19位，
+# 含19位连续数字的文档交给标准库解码（bytes.translate 在C里逐字节扫描）
+_DIGIT_TABLE = bytes(0x30 if 0x30 <= c <= 0x39 else 0x20 for c in range(256))
+_LONG_DIGIT_RUN = b'0' * 19
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """
+    Decode one JSON document, returning what ``json.loads`` would.
+
+    Bytes input (UTF-8) goes through orjson when it is installed. str input
+    always uses the standard library: encoding it for orjson costs more than
+    orjson saves on HTML-heavy lines.
+    """
+    if not isinstance(data, str):
+        data = bytes(data)
+        if _fast_loads is not None and _LONG_DIGIT_RUN not in data.translate(_DIGIT_TABLE):
+            try:
+                return _fast_loads(data)
+            except ValueError:
+                pass
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: Optional[int] = None) -> str:
+    """Encode ``obj`` exactly as ``json.dumps(obj, ensure_ascii=False, indent=indent)``."""
+    return json.dumps(obj, ensure_ascii=False, indent=indent)
+
+
+def dumps_line(obj: Any) -> str:
+    """``dumps`` followed by a newline, for JSONL files."""
+    return json.dumps(obj, ensure_ascii=False) + '\n'
@@ -0,0 +1,275 @@
+"""
+Streaming metric aggregation for WebMainBench evaluations.
+
+Sample results are folded into running NumPy arrays (count, sum, Welford
+mean/M2, min, max and a fixed-bin histogram per metric) batch by batch, so
+the summary of a run does not need the sample results to be kept in memory.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 全局 overall 固定为这5个核心指标平均值的平均
+CORE_METRICS = ("text_edit", "code_edit", "table_edit", "table_TEDS", "formula_edit")
+DEFAULT_PERCENTILES = (50, 90, 99)
+# 分组统计使用的样本元数据字段；样本数不足 MIN_GROUP_SAMPLES 的分组不报告
+GROUP_FIELDS = ("content_type", "language", "difficulty", "domain")
+MIN_GROUP_SAMPLES = 3
+
+
+class MetricAggregator:
+    """
+    Incremental per-metric statistics over sample results.
+
+    Sums are accumulated in sample order (``np.cumsum`` is sequential), so
+    means are identical to summing the scores one by one no matter how the
+    samples are batched. Percentiles come from a histogram over
+    ``score_range`` with ``histogram_bins`` bins: memory is constant and the
+    error is at most half a bin; scores outside the range fall into the edge
+    bins. ``histogram_bins=0`` disables percentiles.
+    """
+
+    def __init__(self, metric_names: Sequence[str] = CORE_METRICS + ("overall",),
+                 histogram_bins: int = 1000,
+                 score_range: Tuple[float, float] = (0.0, 1.0)):
+        """
+        Args:
+            metric_names: Metrics that are always reported (others are added when seen)
+            histogram_bins: Number of histogram bins used for percentiles (0 disables them)
+            score_range: Score range covered by the histogram
+        """
+        self.histogram_bins = histogram_bins
+        self.score_range = score_range
+        self.num_samples = 0
+        self.metric_names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.sums = np.zeros(0, dtype=np.float64)
+        self.means = np.zeros(0, dtype=np.float64)
+        self.m2 = np.zeros(0, dtype=np.float64)
+        self.mins = np.zeros(0, dtype=np.float64)
+        self.maxs = np.zeros(0, dtype=np.float64)
+        self.histograms = np.zeros((0, histogram_bins), dtype=np.int64)
+        self._add_metrics(metric_names)
+
+    def _add_metrics(self, metric_names: Iterable[str]) -> None:
+        new_names = [name for name in metric_names if name not in self._index]
+        if not new_names:
+            return
+        for name in new_names:
+            self._index[name] = len(self.metric_names)
+            self.metric_names.append(name)
+        extra = len(new_names)
+        self.counts = np.concatenate([self.counts, np.zeros(extra, dtype=np.int64)])
+        self.sums = np.concatenate([self.sums, np.zeros(extra)])
+        self.means = np.concatenate([self.means, np.zeros(extra)])
+        self.m2 = np.concatenate([self.m2, np.zeros(extra)])
+        self.mins = np.concatenate([self.mins, np.full(extra, np.inf)])
+        self.maxs = np.concatenate([self.maxs, np.full(extra, -np.inf)])
+        self.histograms = np.vstack([self.histograms, np.zeros((extra, self.histogram_bins), dtype=np.int64)])
+
+    def add(self, sample_result: Dict[str, Any]) -> None:
+        """Add one sample result."""
+        self.add_batch([sample_result])
+
+    def add_batch(self, sample_results: List[Dict[str, Any]]) -> None:
+        """
+        Add sample results (dicts with a ``metrics`` mapping as produced by the
+        Evaluator). Only successful metric scores are counted.
+        """
+        if not sample_results:
+            return
+        self._add_metrics(name for result in sample_results for name in result.get("metrics", {}))
+
+        scores = np.full((len(sample_results), len(self.metric_names)), np.nan)
+        for row, result in enumerate(sample_results):
+            for name, metric_data in result.get("metrics", {}).items():
+                if metric_data.get("success", False):
+                    scores[row, self._index[name]] = metric_data["score"]
+        self.num_samples += len(sample_results)
+
+        valid = ~np.isnan(scores)
+        batch_counts = valid.sum(axis=0)
+        zero_filled = np.where(valid, scores, 0.0)
+        # 逐行累加，与逐个样本求和的结果完全一致
+        self.sums = np.cumsum(np.vstack([self.sums, zero_filled]), axis=0)[-1]
+
+        # Welford/Chan: 合并本批次的均值和二阶中心矩
+        has_scores = batch_counts > 0
+        batch_means = np.divide(zero_filled.sum(axis=0), batch_counts,
+                                out=np.zeros(len(batch_counts)), where=has_scores)
+        batch_m2 = np.where(valid, (scores - batch_means) ** 2, 0.0).sum(axis=0)
+        total_counts = self.counts + batch_counts
+        delta = batch_means - self.means
+        safe_totals = np.maximum(total_counts, 1)
+        self.means = np.where(has_scores, self.means + delta * batch_counts / safe_totals, self.means)
+        self.m2 = np.where(has_scores, self.m2 + batch_m2 + delta ** 2 * self.counts * batch_counts / safe_totals,
+                           self.m2)
+        self.counts = total_counts
+
+        self.mins = np.minimum(self.mins, np.where(valid, scores, np.inf).min(axis=0))
+        self.maxs = np.maximum(self.maxs, np.where(valid, scores, -np.inf).max(axis=0))
+
+        if not self.histogram_bins:
+            return
+        low, high = self.score_range
+        positions = np.floor((np.where(valid, scores, low) - low) / (high - low) * self.histogram_bins)
+        bins = np.clip(positions, 0, self.histogram_bins - 1).astype(np.int64)
+        rows, columns = np.nonzero(valid)
+        np.add.at(self.histograms, (columns, bins[rows, columns]), 1)
+
+    def mean_scores(self) -> Dict[str, float]:
+        """
+        Mean score of every metric (0.0 for metrics without successful scores).
+
+        ``overall`` is the average of the core metric means, as reported by
+        the Evaluator.
+        """
+        if self.num_samples == 0:
+            return {}
+        means = {
+            name: self.sums[i] / self.counts[i] if self.counts[i] > 0 else 0.0
+            for i, name in enumerate(self.metric_names)
+        }
+        means = {name: float(value) for name, value in means.items()}
+        means["overall"] = sum(means[name] for name in CORE_METRICS) / len(CORE_METRICS)
+        return means
+
+    def statistics(self, percentiles: Sequence[int] = DEFAULT_PERCENTILES) -> Dict[str, Dict[str, float]]:
+        """Count, mean, sample standard deviation, min, max and approximate percentiles per metric."""
+        statistics = {}
+        for i, name in enumerate(self.metric_names):
+            count = int(self.counts[i])
+            if count == 0:
+                continue
+            stats = {
+                "count": count,
+                "mean": float(self.sums[i] / count),
+                "std": float(np.sqrt(self.m2[i] / (count - 1))) if count > 1 else 0.0,
+                "min": float(self.mins[i]),
+                "max": float(self.maxs[i]),
+            }
+            for q in (percentiles if self.histogram_bins else ()):
+                stats[f"p{q}"] = self._percentile(i, q)
+            statistics[name] = stats
+        return statistics
+
+    def state_dict(self) -> Dict[str, Any]:
+        """JSON-serializable state; ``from_state_dict`` restores an identical aggregator."""
+        seen = self.counts > 0
+        return {
+            "metric_names": list(self.metric_names),
+            "num_samples": self.num_samples,
+            "histogram_bins": self.histogram_bins,
+            "score_range": list(self.score_range),
+            "counts": self.counts.tolist(),
+            "sums": self.sums.tolist(),
+            "means": self.means.tolist(),
+            "m2": self.m2.tolist(),
+            # 没有分数的指标最值为 ±inf，保存为 None
+            "mins": [value if has_scores else None for value, has_scores in zip(self.mins.tolist(), seen)],
+            "maxs": [value if has_scores else None for value, has_scores in zip(self.maxs.tolist(), seen)],
+            # 直方图只保存非零的桶: [[指标序号, 桶序号, 计数], ...]
+            "histograms": [list(map(int, entry)) for entry in zip(*np.nonzero(self.histograms),
+                                                                  self.histograms[self.histograms > 0])],
+        }
+
+    @classmethod
+    def from_state_dict(cls, state: Dict[str, Any]) -> "MetricAggregator":
+        """Restore an aggregator saved with ``state_dict``."""
+        aggregator = cls(state["metric_names"], histogram_bins=state["histogram_bins"],
+                         score_range=tuple(state["score_range"]))
+        aggregator.num_samples = state["num_samples"]
+        aggregator.counts = np.asarray(state["counts"], dtype=np.int64)
+        aggregator.sums = np.asarray(state["sums"], dtype=np.float64)
+        aggregator.means = np.asarray(state["means"], dtype=np.float64)
+        aggregator.m2 = np.asarray(state["m2"], dtype=np.float64)
+        aggregator.mins = np.asarray([np.inf if v is None else v for v in state["mins"]], dtype=np.float64)
+        aggregator.maxs = np.asarray([-np.inf if v is None else v for v in state["maxs"]], dtype=np.float64)
+        for metric_index, bin_index, count in state["histograms"]:
+            aggregator.histograms[metric_index, bin_index] = count
+        return aggregator
+
+    def _percentile(self, index: int, q: float) -> float:
+        cumulative = np.cumsum(self.histograms[index])
+        rank = max(int(np.ceil(q / 100 * cumulative[-1])), 1)
+        bin_index = int(np.searchsorted(cumulative, rank))
+        low, high = self.score_range
+        value = low + (bin_index + 0.5) * (high - low) / self.histogram_bins
+        return float(min(max(value, self.mins[index]), self.maxs[index]))
+
+
+class GroupedMetricAggregator:
+    """
+    One ``MetricAggregator`` per value of each sample metadata field.
+
+    Groups are updated batch by batch, so per-category reports need neither
+    the sample results nor the samples to be kept in memory.
+    """
+
+    def __init__(self, group_fields: Sequence[str] = GROUP_FIELDS, **aggregator_kwargs):
+        """
+        Args:
+            group_fields: Metadata fields to group by
+            **aggregator_kwargs: Passed to every ``MetricAggregator`` (percentiles are
+                off by default: only mean scores are reported per group)
+        """
+        self.group_fields = tuple(group_fields)
+        self.aggregator_kwargs = {"histogram_bins": 0, **aggregator_kwargs}
+        self.groups: Dict[str, Dict[str, MetricAggregator]] = {field: {} for field in self.group_fields}
+
+    def add_batch(self, sample_results: List[Dict[str, Any]],
+                  metadata: List[Dict[str, Any]]) -> None:
+        """
+        Add sample results with their metadata (same order; a missing value is grouped as 'unknown').
+        """
+        for field in self.group_fields:
+            members: Dict[str, List[Dict[str, Any]]] = {}
+            for sample_result, sample_metadata in zip(sample_results, metadata):
+                value = sample_metadata.get(field) or 'unknown'
+                members.setdefault(value, []).append(sample_result)
+            groups = self.groups[field]
+            for value, group_results in members.items():
+                if value not in groups:
+                    groups[value] = MetricAggregator(**self.aggregator_kwargs)
+                groups[value].add_batch(group_results)
+
+    def group_scores(self, field: str,
+                     min_samples: int = MIN_GROUP_SAMPLES) -> Optional[Dict[str, Dict[str, float]]]:
+        """Mean scores of every group of ``field`` with at least ``min_samples`` samples (None if none)."""
+        scores = {
+            value: aggregator.mean_scores()
+            for value, aggregator in self.groups[field].items()
+            if aggregator.num_samples >= min_samples
+        }
+        return scores or None
+
+    def all_group_scores(self, min_samples: int = MIN_GROUP_SAMPLES) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """``group_scores`` of every field that has at least one reported group."""
+        all_scores = {}
+        for field in self.group_fields:
+            scores = self.group_scores(field, min_samples)
+            if scores:
+                all_scores[field] = scores
+        return all_scores
+
+    def state_dict(self) -> Dict[str, Any]:
+        """JSON-serializable state; ``from_state_dict`` restores an identical aggregator."""
+        return {
+            "group_fields": list(self.group_fields),
+            "groups": {
+                field: {value: aggregator.state_dict() for value, aggregator in groups.items()}
+                for field, groups in self.groups.items()
+            },
+        }
+
+    @classmethod
+    def from_state_dict(cls, state: Dict[str, Any]) -> "GroupedMetricAggregator":
+        """Restore an aggregator saved with ``state_dict``."""
+        grouped = cls(state["group_fields"])
+        for field, groups in state["groups"].items():
+            grouped.groups[field] = {
+                value: MetricAggregator.from_state_dict(group_state) for value, group_state in groups.items()
+            }
+        return grouped
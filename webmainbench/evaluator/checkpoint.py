@@ -0,0 +1,168 @@
+"""
+Run directories for checkpointed, resumable batched evaluations.
+
+A run directory holds:
+
+- ``manifest.json``: what is evaluated (dataset, extractor, configs) and the run status
+- ``results.jsonl``: sample results, appended and fsynced after every batch
+- ``checkpoint.json``: written atomically every few batches; the aggregator
+  state, extraction errors and the size of ``results.jsonl`` at that point
+
+The processed sample ids are the ids in ``results.jsonl`` up to the
+checkpointed size plus the ids in the checkpointed error list (samples
+whose evaluation raised have no result).
+On resume the results file is truncated back to the checkpointed size, so
+results written after the last checkpoint are evaluated again and the
+restored aggregators match the file exactly.
+
+A sharded run keeps one such directory per shard under the common run
+directory (``shard-00000-of-00004`` ...), so shards on different machines
+only need a shared filesystem; ``load_shard_runs`` checks that they belong
+to the same evaluation before they are merged.
+"""
+
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Union
+
+from ..data.serialization import dumps, dumps_line, loads
+
+MANIFEST_FILE = "manifest.json"
+RESULTS_FILE = "results.jsonl"
+CHECKPOINT_FILE = "checkpoint.json"
+SHARD_DIR_FORMAT = "shard-{shard_index:05d}-of-{num_shards:05d}"
+# manifest 中随运行状态或分片变化的字段，合并分片时不比较
+RUN_STATE_KEYS = ("shard_index", "status", "created_at", "updated_at")
+
+
+def atomic_write_json(file_path: Union[str, Path], data: Any) -> None:
+    """Write JSON to a temporary file and rename it over ``file_path``."""
+    file_path = Path(file_path)
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(dumps(data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+class RunDirectory:
+    """Manifest, results and checkpoint files of one evaluation run."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.manifest_path = self.path / MANIFEST_FILE
+        self.results_path = self.path / RESULTS_FILE
+        self.checkpoint_path = self.path / CHECKPOINT_FILE
+
+    def exists(self) -> bool:
+        """Whether a run has been started in this directory."""
+        return self.manifest_path.exists()
+
+    def create(self, manifest: Dict[str, Any]) -> None:
+        """Start a new run: write the manifest and an empty results file."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.results_path.write_bytes(b'')
+        now = datetime.now().isoformat()
+        atomic_write_json(self.manifest_path, {**manifest, "status": "running",
+                                               "created_at": now, "updated_at": now})
+
+    def load_manifest(self) -> Dict[str, Any]:
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return loads(f.read())
+
+    def update_manifest(self, **fields) -> None:
+        manifest = self.load_manifest()
+        manifest.update(fields, updated_at=datetime.now().isoformat())
+        atomic_write_json(self.manifest_path, manifest)
+
+    def check_manifest(self, manifest: Dict[str, Any]) -> None:
+        """
+        Raise ValueError if the run was started for a different evaluation.
+
+        Only the keys of ``manifest`` are compared.
+        """
+        saved = self.load_manifest()
+        mismatched = [key for key, value in manifest.items() if saved.get(key) != value]
+        if mismatched:
+            raise ValueError(
+                f"Run directory {self.path} belongs to a different evaluation "
+                f"(mismatched: {', '.join(mismatched)})"
+            )
+
+    def load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """The last checkpoint, or None if none was written yet."""
+        if not self.checkpoint_path.exists():
+            return None
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            return loads(f.read())
+
+    def save_checkpoint(self, state: Dict[str, Any]) -> None:
+        """Atomically save ``state`` together with the current size of the results file."""
+        atomic_write_json(self.checkpoint_path, {
+            **state,
+            "results_size": self.results_path.stat().st_size,
+            "saved_at": datetime.now().isoformat(),
+        })
+
+    def append_results(self, results: List[Dict[str, Any]]) -> None:
+        """Append sample results and fsync them."""
+        with open(self.results_path, 'a', encoding='utf-8') as f:
+            for result in results:
+                f.write(dumps_line(result))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def restore(self, checkpoint: Optional[Dict[str, Any]]) -> Set[str]:
+        """
+        Roll the results file back to ``checkpoint`` and return the processed sample ids.
+
+        Without a checkpoint the results file is emptied.
+        """
+        results_size = checkpoint["results_size"] if checkpoint else 0
+        with open(self.results_path, 'r+b') as f:
+            f.truncate(results_size)
+
+        processed_ids = set()
+        with open(self.results_path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    processed_ids.add(loads(line)['sample_id'])
+        if checkpoint:
+            # 评测出错的样本没有结果，其 id 记录在错误列表中
+            processed_ids.update(error['sample_id'] for error in checkpoint.get("extraction_errors", []))
+        return processed_ids
+
+
+def shard_run_dir(run_dir: Union[str, Path], shard_index: int, num_shards: int) -> Path:
+    """Directory of one shard inside a sharded run directory."""
+    return Path(run_dir) / SHARD_DIR_FORMAT.format(shard_index=shard_index, num_shards=num_shards)
+
+
+def load_shard_runs(run_dir: Union[str, Path]) -> List[RunDirectory]:
+    """
+    The completed shard runs of ``run_dir``, ordered by shard index.
+
+    Raises ValueError if a shard is missing or unfinished, or if the shards
+    were started for different evaluations.
+    """
+    runs = [RunDirectory(path) for path in sorted(Path(run_dir).glob("shard-*-of-*"))]
+    runs = [run for run in runs if run.exists()]
+    if not runs:
+        raise ValueError(f"No shard runs found in {run_dir}")
+
+    manifests = [run.load_manifest() for run in runs]
+    num_shards = manifests[0].get("num_shards")
+    indices = sorted(manifest.get("shard_index") for manifest in manifests)
+    if indices != list(range(num_shards or 0)):
+        raise ValueError(f"Expected shards 0..{num_shards} in {run_dir}, found {indices}")
+
+    common = {key: value for key, value in manifests[0].items() if key not in RUN_STATE_KEYS}
+    for run, manifest in zip(runs, manifests):
+        if {key: value for key, value in manifest.items() if key not in RUN_STATE_KEYS} != common:
+            raise ValueError(f"Shard {run.path} belongs to a different evaluation")
+        if manifest.get("status") != "completed":
+            raise ValueError(f"Shard {run.path} has not completed")
+    ordered = sorted(zip(manifests, runs), key=lambda pair: pair[0]["shard_index"])
+    return [run for _, run in ordered]
@@ -3,15 +3,28 @@ Main evaluator for WebMainBench.
 """
 
 from dataclasses import dataclass
-from typing import Dict, Any, List, Optional, Union, Iterator
+from typing import Dict, Any, List, Optional, Sequence, Union, Iterator
+import json
 import time
 import itertools
+from concurrent.futures import Executor
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
 from ..data import BenchmarkDataset, DataSample, DataLoader, DataSaver
-from ..extractors import BaseExtractor, ExtractorFactory
+from ..data.columnar import RESCORE_COLUMNS
+from ..data.compression import strip_compression
+from ..extractors import BaseExtractor, ExtractorFactory, ExtractionResult, ExtractionCache
 from ..metrics import MetricCalculator, MetricResult
+from .aggregator import GROUP_FIELDS, GroupedMetricAggregator, MetricAggregator
+from .checkpoint import RunDirectory, load_shard_runs, shard_run_dir
+from .parallel import create_process_pool, default_chunk_size, map_samples, map_scores
+from .pipeline import Stage, StagedPipeline
+from .result_store import CompactResultStore
+
+# compact_results 模式下每积累这么多样本结果聚合一次并写入紧凑存储
+COMPACT_FLUSH_SIZE = 1000
 
 
 @dataclass
@@ -27,15 +40,21 @@ class EvaluationResult:
     # Overall metrics
     overall_metrics: Dict[str, float]
     
-    # Sample-level results
-    sample_results: List[Dict[str, Any]]
+    # Sample-level results (a CompactResultStore with compact_results=True)
+    sample_results: Sequence[Dict[str, Any]]
     
     # Category-wise metrics (if applicable)
     category_metrics: Optional[Dict[str, Dict[str, float]]] = None
     
+    # Metrics grouped by sample metadata field (content_type/language/difficulty/domain) and value
+    group_metrics: Optional[Dict[str, Dict[str, Dict[str, float]]]] = None
+    
     # Error analysis
     error_analysis: Optional[Dict[str, Any]] = None
     
+    # Per-metric count/mean/std/min/max/percentiles
+    metric_statistics: Optional[Dict[str, Dict[str, float]]] = None
+    
     # Configuration
     extractor_config: Optional[Dict[str, Any]] = None
     metric_config: Optional[Dict[str, Any]] = None
@@ -50,9 +69,12 @@ class EvaluationResult:
                 "total_samples": self.total_samples,
             },
             "overall_metrics": self.overall_metrics,
-            "sample_results": self.sample_results,
+            "sample_results": (self.sample_results if isinstance(self.sample_results, list)
+                               else list(self.sample_results)),
             "category_metrics": self.category_metrics,
+            "group_metrics": self.group_metrics,
             "error_analysis": self.error_analysis,
+            "metric_statistics": self.metric_statistics,
             "extractor_config": self.extractor_config,
             "metric_config": self.metric_config,
         }
@@ -69,7 +91,9 @@ class EvaluationResult:
             overall_metrics=data.get("overall_metrics", {}),
             sample_results=data.get("sample_results", []),
             category_metrics=data.get("category_metrics"),
+            group_metrics=data.get("group_metrics"),
             error_analysis=data.get("error_analysis"),
+            metric_statistics=data.get("metric_statistics"),
             extractor_config=data.get("extractor_config"),
             metric_config=data.get("metric_config"),
         )
@@ -78,22 +102,52 @@ class EvaluationResult:
 class Evaluator:
     """Main evaluator for web content extraction benchmarks."""
     
-    def __init__(self, metric_config: Dict[str, Any] = None):
+    def __init__(self, metric_config: Dict[str, Any] = None,
+                 extraction_cache: Union[ExtractionCache, str, Path, None] = None):
         """
         Initialize the evaluator.
         
         Args:
             metric_config: Configuration for metrics
+            extraction_cache: ExtractionCache instance or cache file path; attached to
+                extractors that have no cache during an evaluation so unchanged pages
+                are not re-extracted
         """
         self.metric_calculator = MetricCalculator(metric_config)
         self.metric_config = metric_config or {}
+        if isinstance(extraction_cache, (str, Path)):
+            extraction_cache = ExtractionCache(extraction_cache)
+        self.extraction_cache = extraction_cache
+    
+    def _prepare_extractor(self, extractor: Union[BaseExtractor, str],
+                           extractor_config: Dict[str, Any] = None) -> BaseExtractor:
+        """Create the extractor if a name is given."""
+        if isinstance(extractor, str):
+            extractor = ExtractorFactory.create(extractor, extractor_config)
+        return extractor
+
+    @contextmanager
+    def _attached_cache(self, extractor: BaseExtractor) -> Iterator[BaseExtractor]:
+        """Attach the extraction cache to an extractor without one for the duration of an evaluation."""
+        if self.extraction_cache is None or extractor.cache is not None:
+            yield extractor
+            return
+        # 只在本次评测期间挂载，避免调用方的抽取器之后继续使用本评测器的缓存文件
+        extractor.cache = self.extraction_cache
+        try:
+            yield extractor
+        finally:
+            extractor.cache = None
     
     def evaluate(self, 
                 dataset: BenchmarkDataset,
                 extractor: Union[BaseExtractor, str],
                 extractor_config: Dict[str, Any] = None,
                 max_samples: Optional[int] = None,
-                categories: Optional[List[str]] = None) -> EvaluationResult:
+                categories: Optional[List[str]] = None,
+                num_workers: int = 1,
+                chunk_size: Optional[int] = None,
+                compact_results: bool = False) -> EvaluationResult:
         """
         Evaluate an extractor on a dataset.
         
@@ -103,13 +157,17 @@ class Evaluator:
             extractor_config: Configuration for the extractor
             max_samples: Maximum number of samples to evaluate (for testing)
             categories: Specific categories to evaluate
+            num_workers: Number of worker processes (1 = serial evaluation)
+            chunk_size: Samples sent to a worker per task (default: automatic)
+            compact_results: Keep sample results in a CompactResultStore (float32 score
+                table, details and extracted content spilled to a temporary file)
+                instead of one nested dict per sample
             
         Returns:
             EvaluationResult instance
         """
         # Create extractor if string name provided
-        if isinstance(extractor, str):
-            extractor = ExtractorFactory.create(extractor, extractor_config)
+        extractor = self._prepare_extractor(extractor, extractor_config)
         
         # Filter samples if needed (避免不必要的副本)
         samples_iter = dataset.samples
@@ -130,45 +188,67 @@ class Evaluator:
             samples_to_evaluate = samples_iter if not categories else samples_iter
         
         # Run evaluation
-        sample_results = []
+        sample_results = CompactResultStore() if compact_results else []
         extraction_errors = []
+        aggregator = MetricAggregator()
+        group_aggregator = GroupedMetricAggregator()
+        # 紧凑模式下每 COMPACT_FLUSH_SIZE 个结果先用精确分数聚合，再写入紧凑存储
+        pending_results = []
+        pending_samples = []
         
         print(f"Evaluating {len(samples_to_evaluate)} samples...")
         
-        for i, sample in enumerate(samples_to_evaluate):
-            if i % 10 == 0:
-                print(f"Progress: {i}/{len(samples_to_evaluate)}")
+        with self._attached_cache(extractor):
+            executor = None
+            if num_workers > 1:
+                executor = create_process_pool(self, extractor, num_workers)
+                chunk_size = chunk_size or default_chunk_size(len(samples_to_evaluate), num_workers)
             
             try:
-                sample_result = self._evaluate_sample(sample, extractor)
-                sample_results.append(sample_result)
-                
-                # Track extraction errors
-                if not sample_result.get('extraction_success', True):
-                    extraction_errors.append({
-                        'sample_id': sample.id,
-                        'error': sample_result.get('extraction_error', 'Unknown error')
-                    })
+                results_iter = self._iter_sample_results(
+                    samples_to_evaluate, extractor, executor, chunk_size or 1
+                )
+                for i, (sample, sample_result, error) in enumerate(results_iter):
+                    if i % 10 == 0:
+                        print(f"Progress: {i}/{len(samples_to_evaluate)}")
                     
-            except Exception as e:
-                print(f"Error evaluating sample {sample.id}: {e}")
-                # Create error result
-                error_result = {
-                    'sample_id': sample.id,
-                    'extraction_success': False,
-                    'extraction_error': str(e),
-                    'metrics': {},
-                }
-                sample_results.append(error_result)
-                extraction_errors.append({
-                    'sample_id': sample.id,
-                    'error': str(e)
-                })
+                    if error is None:
+                        pending_results.append(sample_result)
+                        
+                        # Track extraction errors
+                        if not sample_result.get('extraction_success', True):
+                            extraction_errors.append({
+                                'sample_id': sample.id,
+                                'error': sample_result.get('extraction_error', 'Unknown error')
+                            })
+                    else:
+                        print(f"Error evaluating sample {sample.id}: {error}")
+                        # Create error result
+                        error_result = {
+                            'sample_id': sample.id,
+                            'extraction_success': False,
+                            'extraction_error': error,
+                            'metrics': {},
+                        }
+                        pending_results.append(error_result)
+                        extraction_errors.append({
+                            'sample_id': sample.id,
+                            'error': error
+                        })
+                    pending_samples.append(sample)
+                    
+                    if compact_results and len(pending_results) >= COMPACT_FLUSH_SIZE:
+                        self._flush_results(pending_results, pending_samples, sample_results,
+                                            aggregator, group_aggregator)
+            finally:
+                if executor is not None:
+                    executor.shutdown()
         
         # Aggregate results
-        overall_metrics = self._aggregate_metrics(sample_results)
-        category_metrics = self._calculate_category_metrics(sample_results, samples_to_evaluate)
-        error_analysis = self._analyze_errors(extraction_errors, sample_results)
+        self._flush_results(pending_results, pending_samples, sample_results, aggregator, group_aggregator)
+        overall_metrics = aggregator.mean_scores()
+        category_metrics = group_aggregator.group_scores('content_type')
+        error_analysis = self._analyze_errors(extraction_errors, len(sample_results))
         
         # Create evaluation result
         evaluation_result = EvaluationResult(
@@ -179,7 +259,9 @@ class Evaluator:
             overall_metrics=overall_metrics,
             sample_results=sample_results,
             category_metrics=category_metrics,
+            group_metrics=group_aggregator.all_group_scores(),
             error_analysis=error_analysis,
+            metric_statistics=aggregator.statistics(),
             extractor_config=extractor.get_config(),
             metric_config=self.metric_config,
         )
@@ -193,7 +275,21 @@ class Evaluator:
                         extractor_config: Dict[str, Any] = None,
                         max_samples: Optional[int] = None,
                         categories: Optional[List[str]] = None,
-                        output_file: Optional[Union[str, Path]] = None) -> EvaluationResult:
+                        output_file: Optional[Union[str, Path]] = None,
+                        num_workers: int = 1,
+                        chunk_size: Optional[int] = None,
+                        pipeline: bool = False,
+                        queue_size: int = 2,
+                        extract_workers: int = 1,
+                        metric_workers: int = 1,
+                        run_dir: Optional[Union[str, Path]] = None,
+                        resume: bool = False,
+                        checkpoint_every: int = 10,
+                        shard_index: Optional[int] = None,
+                        num_shards: Optional[int] = None,
+                        shard_by: str = "hash",
+                        use_index: bool = False,
+                        compact_results: bool = False) -> EvaluationResult:
         """
         分批处理评测，减少内存使用。
         
@@ -204,86 +300,548 @@ class Evaluator:
             extractor_config: 抽取器配置
             max_samples: 最大样本数限制
             categories: 特定类别过滤
-            output_file: 可选的结果输出文件（用于大数据集）
+            output_file: 可选的结果输出文件（用于大数据集）；指定时样本结果追加写入该文件，
+                不再保存在返回结果的 sample_results 中
+            num_workers: 工作进程数（1表示串行评测）
+            chunk_size: 每次分发给工作进程的样本数（默认自动计算）
+            pipeline: 是否使用流水线模式（读取、抽取、指标计算三个阶段并发执行）
+            queue_size: 流水线各阶段之间队列可缓存的批次数（满时上游阻塞）
+            extract_workers: 流水线抽取阶段的线程数（抽取器需线程安全）
+            metric_workers: 流水线指标阶段的进程数（1表示在当前进程内计算）
+            run_dir: 可选的运行目录；指定时写入 manifest、逐批追加样本结果并定期保存检查点，
+                样本结果同样不保存在返回结果的 sample_results 中
+            resume: 是否从 run_dir 中已有的检查点继续评测，跳过已完成的样本
+            checkpoint_every: 每处理多少个批次保存一次检查点
+            shard_index: 多机分片评测时本机负责的分片（从0开始），需同时指定 num_shards 和 run_dir；
+                分片结果写入 run_dir 下的分片子目录，全部完成后用 merge_shards 合并
+            num_shards: 分片总数
+            shard_by: 分片方式，"hash"（样本id的稳定哈希）或 "range"（连续的行区间）
+            use_index: 使用数据集的字节偏移索引（<数据集>.idx，不存在或过期时自动构建），
+                类别过滤、分片和恢复时跳过的样本不再解码
+            compact_results: 返回结果的 sample_results 使用 CompactResultStore（float32 分数表，
+                details 和抽取内容写入临时文件）；有 output_file 或 run_dir 时结果不保存在内存中，此参数无效
             
         Returns:
             EvaluationResult实例
         """
+        if pipeline and num_workers > 1:
+            raise ValueError("pipeline mode uses extract_workers/metric_workers instead of num_workers")
+        if run_dir is not None and output_file is not None:
+            raise ValueError("run_dir writes results to <run_dir>/results.jsonl, output_file cannot be used with it")
+        if checkpoint_every < 1:
+            raise ValueError("checkpoint_every must be at least 1")
+        if (shard_index is None) != (num_shards is None):
+            raise ValueError("shard_index and num_shards must be given together")
+        if num_shards is not None:
+            if run_dir is None:
+                raise ValueError("sharded evaluation needs a run_dir shared by all shards")
+            DataLoader._check_shard(shard_index, num_shards, shard_by)
+            run_dir = shard_run_dir(run_dir, shard_index, num_shards)
+        
         # Create extractor if string name provided
-        if isinstance(extractor, str):
-            extractor = ExtractorFactory.create(extractor, extractor_config)
+        extractor = self._prepare_extractor(extractor, extractor_config)
         
         jsonl_file_path = Path(jsonl_file_path)
         
         # 统计信息
         total_samples = 0
         processed_samples = 0
-        all_sample_results = []
+        # 有 output_file 时为尚未写入文件的结果
+        keep_compact = compact_results and output_file is None and run_dir is None
+        all_sample_results = CompactResultStore() if keep_compact else []
         all_extraction_errors = []
+        # 指标和分组指标按批次增量聚合，不依赖保留全部样本结果
+        aggregator = MetricAggregator()
+        group_aggregator = GroupedMetricAggregator()
         
         print(f"🔄 开始批处理评测")
         print(f"   数据集: {jsonl_file_path}")
         print(f"   批大小: {batch_size}")
         print(f"   最大样本数: {max_samples or '无限制'}")
         
+        run = None
+        completed_ids = None
+        if run_dir is not None:
+            run = RunDirectory(run_dir)
+            manifest = self._run_manifest(jsonl_file_path, extractor, batch_size, max_samples, categories,
+                                          shard_index, num_shards, shard_by)
+            if run.exists():
+                if not resume:
+                    raise ValueError(f"Run directory {run_dir} already contains a run, pass resume=True to continue it")
+                run.check_manifest(manifest)
+                checkpoint = run.load_checkpoint()
+                completed_ids = run.restore(checkpoint)
+                run.update_manifest(status="running")
+                if checkpoint:
+                    aggregator = MetricAggregator.from_state_dict(checkpoint["aggregator"])
+                    group_aggregator = GroupedMetricAggregator.from_state_dict(checkpoint["group_aggregator"])
+                    all_extraction_errors = checkpoint["extraction_errors"]
+                    processed_samples = checkpoint["processed_samples"]
+                print(f"   从检查点恢复: 已完成 {processed_samples} 样本")
+            else:
+                run.create(manifest)
+            print(f"   运行目录: {run.path}")
+        
         start_time = time.time()
         
         # 使用DataLoader的流式批处理方法
-        for batch_samples in DataLoader.stream_jsonl_batched(
+        batch_source = DataLoader.stream_jsonl_batched(
             file_path=jsonl_file_path,
             batch_size=batch_size,
             categories=categories,
-            max_samples=max_samples
-        ):
-            # 处理当前批次
-            batch_results, batch_errors = self._process_batch(batch_samples, extractor)
-            all_sample_results.extend(batch_results)
-            all_extraction_errors.extend(batch_errors)
-            
-            processed_samples += len(batch_samples)
-            total_samples += len(batch_samples)
-            
-            print(f"   已处理: {processed_samples} 样本")
+            max_samples=max_samples,
+            skip_ids=completed_ids,
+            shard_index=shard_index,
+            num_shards=num_shards,
+            shard_by=shard_by,
+            use_index=use_index
+        )
+        
+        with self._attached_cache(extractor):
+            # 多进程模式下整个评测过程复用同一个进程池
+            executor = None
+            if pipeline:
+                if metric_workers > 1:
+                    executor = create_process_pool(self, None, metric_workers)
+                    chunk_size = chunk_size or default_chunk_size(batch_size, metric_workers)
+                batch_outputs = self._run_batch_pipeline(
+                    batch_source, extractor, executor, chunk_size or 1,
+                    queue_size, extract_workers, metric_workers
+                )
+            else:
+                if num_workers > 1:
+                    executor = create_process_pool(self, extractor, num_workers)
+                    chunk_size = chunk_size or default_chunk_size(batch_size, num_workers)
+                batch_outputs = (
+                    (batch_samples,) + self._process_batch(batch_samples, extractor, executor, chunk_size or 1)
+                    for batch_samples in batch_source
+                )
             
-            # 如果有输出文件，可以立即写入避免内存累积
-            if output_file and len(all_sample_results) > 1000:
-                DataSaver.append_intermediate_results(all_sample_results, output_file)
-                all_sample_results = []  # 清空已保存的结果
+            try:
+                for batch_index, (batch_samples, batch_results, batch_errors) in enumerate(batch_outputs, 1):
+                    aggregator.add_batch(batch_results)
+                    group_aggregator.add_batch(batch_results, self._batch_group_metadata(batch_samples, batch_results))
+                    all_extraction_errors.extend(batch_errors)
+                    
+                    processed_samples += len(batch_samples)
+                    total_samples += len(batch_samples)
+                    
+                    print(f"   已处理: {processed_samples} 样本")
+                    
+                    if run is not None:
+                        # 先追加结果再保存检查点，检查点记录的结果文件大小总是覆盖已聚合的样本
+                        run.append_results(batch_results)
+                        if batch_index % checkpoint_every == 0:
+                            self._save_run_checkpoint(run, aggregator, group_aggregator,
+                                                      all_extraction_errors, processed_samples)
+                        continue
+                    
+                    all_sample_results.extend(batch_results)
+                    # 如果有输出文件，可以立即写入避免内存累积
+                    if output_file and len(all_sample_results) > 1000:
+                        DataSaver.append_intermediate_results(all_sample_results, output_file)
+                        all_sample_results = []  # 清空已保存的结果
+                
+                # 写入最后不足一批的结果
+                if output_file and all_sample_results:
+                    DataSaver.append_intermediate_results(all_sample_results, output_file)
+                    all_sample_results = []
+                
+                if run is not None:
+                    self._save_run_checkpoint(run, aggregator, group_aggregator,
+                                              all_extraction_errors, processed_samples)
+                    run.update_manifest(status="completed")
+            finally:
+                if executor is not None:
+                    executor.shutdown()
         
         end_time = time.time()
         print(f"✅ 批处理评测完成")
         print(f"   总耗时: {end_time - start_time:.2f}秒")
         print(f"   处理样本: {processed_samples}")
         
-        # 聚合结果
-        overall_metrics = self._aggregate_metrics(all_sample_results)
-        # 批处理模式下跳过分类指标（为了节约内存，不保存样本列表）
-        category_metrics = None
-        error_analysis = self._analyze_errors(all_extraction_errors, all_sample_results)
+        return self._aggregated_result(
+            strip_compression(jsonl_file_path).stem, extractor.name, processed_samples, all_sample_results,
+            aggregator, group_aggregator, all_extraction_errors,
+            extractor.get_config(), self.metric_config
+        )
+    
+    def merge_shards(self,
+                     run_dir: Union[str, Path],
+                     output_file: Optional[Union[str, Path]] = None) -> EvaluationResult:
+        """
+        合并分片评测（evaluate_batched 的 shard_index/num_shards）的结果。
         
-        evaluation_result = EvaluationResult(
-            dataset_name=jsonl_file_path.stem,
-            extractor_name=extractor.name,
+        按数据集顺序和单机评测的批次边界重新聚合各分片的样本结果，
+        得到的指标与相同 batch_size 的单机 evaluate_batched 完全一致。
+        数据集路径、批大小、过滤条件取自分片的 manifest。
+        
+        Args:
+            run_dir: 各分片共用的运行目录
+            output_file: 可选的合并结果文件，按数据集顺序写入全部样本结果
+            
+        Returns:
+            EvaluationResult实例（sample_results 为空）
+        """
+        shard_runs = load_shard_runs(run_dir)
+        manifest = shard_runs[0].load_manifest()
+        print(f"🔄 合并 {len(shard_runs)} 个分片: {run_dir}")
+        
+        errors_by_id = {}
+        for run in shard_runs:
+            for error in run.load_checkpoint()["extraction_errors"]:
+                errors_by_id[error['sample_id']] = error
+        # 每个分片的结果文件都按数据集顺序写入，逐个样本取各分片的下一条结果即可
+        readers = [DataLoader.stream_sample_results(run.results_path) for run in shard_runs]
+        heads = [next(reader, None) for reader in readers]
+        
+        aggregator = MetricAggregator()
+        group_aggregator = GroupedMetricAggregator()
+        all_extraction_errors = []
+        pending_results = []
+        processed_samples = 0
+        
+        batch_source = DataLoader.stream_jsonl_batched(
+            file_path=manifest["dataset_path"],
+            batch_size=manifest["batch_size"],
+            categories=manifest["categories"],
+            max_samples=manifest["max_samples"]
+        )
+        for batch_samples in batch_source:
+            batch_results = []
+            for sample in batch_samples:
+                for i, head in enumerate(heads):
+                    if head is not None and head['sample_id'] == sample.id:
+                        batch_results.append(head)
+                        heads[i] = next(readers[i], None)
+                        break
+                if sample.id in errors_by_id:
+                    all_extraction_errors.append(errors_by_id[sample.id])
+            
+            aggregator.add_batch(batch_results)
+            group_aggregator.add_batch(batch_results, self._batch_group_metadata(batch_samples, batch_results))
+            processed_samples += len(batch_samples)
+            
+            if output_file:
+                pending_results.extend(batch_results)
+                if len(pending_results) > 1000:
+                    DataSaver.append_intermediate_results(pending_results, output_file)
+                    pending_results = []
+        
+        if any(head is not None for head in heads):
+            raise ValueError(f"Shard results in {run_dir} contain samples that are not in the dataset")
+        if output_file and pending_results:
+            DataSaver.append_intermediate_results(pending_results, output_file)
+        print(f"✅ 合并完成，样本数: {processed_samples}")
+        
+        return self._aggregated_result(
+            strip_compression(manifest["dataset_path"]).stem, manifest["extractor_name"], processed_samples, [],
+            aggregator, group_aggregator, all_extraction_errors,
+            manifest["extractor_config"], manifest["metric_config"]
+        )
+    
+    def _aggregated_result(self,
+                           dataset_name: str,
+                           extractor_name: str,
+                           total_samples: int,
+                           sample_results: Sequence[Dict[str, Any]],
+                           aggregator: MetricAggregator,
+                           group_aggregator: GroupedMetricAggregator,
+                           extraction_errors: List[Dict[str, Any]],
+                           extractor_config: Dict[str, Any],
+                           metric_config: Dict[str, Any]) -> EvaluationResult:
+        """由增量聚合器构造分批评测的结果"""
+        return EvaluationResult(
+            dataset_name=dataset_name,
+            extractor_name=extractor_name,
             timestamp=datetime.now().isoformat(),
-            total_samples=processed_samples,
-            overall_metrics=overall_metrics,
+            total_samples=total_samples,
+            overall_metrics=aggregator.mean_scores(),
+            sample_results=sample_results,
+            category_metrics=group_aggregator.group_scores('content_type'),
+            group_metrics=group_aggregator.all_group_scores(),
+            error_analysis=self._analyze_errors(extraction_errors, aggregator.num_samples),
+            metric_statistics=aggregator.statistics(),
+            extractor_config=extractor_config,
+            metric_config=metric_config,
+        )
+    
+    def _run_manifest(self,
+                      jsonl_file_path: Path,
+                      extractor: BaseExtractor,
+                      batch_size: int,
+                      max_samples: Optional[int],
+                      categories: Optional[List[str]],
+                      shard_index: Optional[int],
+                      num_shards: Optional[int],
+                      shard_by: str) -> Dict[str, Any]:
+        """构造运行目录的 manifest，恢复评测时逐项比对，保证续跑的是同一个评测"""
+        manifest = {
+            "dataset_path": str(jsonl_file_path.resolve()),
+            "extractor_name": extractor.name,
+            "extractor_config": extractor.get_config(),
+            "metric_config": self.metric_config,
+            # 合并分片时按相同的批次边界重新聚合，与单机评测结果一致
+            "batch_size": batch_size,
+            "max_samples": max_samples,
+            "categories": categories,
+            "shard_index": shard_index,
+            "num_shards": num_shards,
+            "shard_by": shard_by if num_shards is not None else None,
+        }
+        # 经过一次JSON序列化，与从文件读回的 manifest 比较时类型一致
+        return json.loads(json.dumps(manifest, ensure_ascii=False, default=str))
+    
+    @staticmethod
+    def _save_run_checkpoint(run: RunDirectory,
+                             aggregator: MetricAggregator,
+                             group_aggregator: GroupedMetricAggregator,
+                             extraction_errors: List[Dict[str, Any]],
+                             processed_samples: int) -> None:
+        """保存聚合器状态、错误列表和已处理样本数"""
+        run.save_checkpoint({
+            "processed_samples": processed_samples,
+            "aggregator": aggregator.state_dict(),
+            "group_aggregator": group_aggregator.state_dict(),
+            "extraction_errors": extraction_errors,
+        })
+    
+    def rescore(self,
+                results_file: Union[str, Path],
+                dataset: Union[BenchmarkDataset, str, Path],
+                extractor_name: Optional[str] = None,
+                batch_size: int = 1000,
+                num_workers: int = 1,
+                chunk_size: Optional[int] = None) -> EvaluationResult:
+        """
+        只重新计算指标：读取已保存的样本结果中的抽取内容，按sample_id关联groundtruth后重新打分，不运行抽取器。
+        
+        结果文件需包含extracted_content，可以是分批评测的output_file（JSONL），
+        或以include_content=True保存的评测结果JSON。
+        
+        Args:
+            results_file: 保存的样本结果文件
+            dataset: groundtruth数据集（BenchmarkDataset、JSONL或Parquet路径）
+            extractor_name: 结果中的抽取器名称（默认使用结果文件名）
+            batch_size: 每批重新打分的样本数
+            num_workers: 指标计算的进程数（1表示串行）
+            chunk_size: 每次分发给工作进程的样本数（默认自动计算）
+            
+        Returns:
+            EvaluationResult实例
+        """
+        results_file = Path(results_file)
+        if not isinstance(dataset, BenchmarkDataset):
+            if Path(dataset).suffix.lower() == '.parquet':
+                # 只读取打分需要的列，不解码HTML
+                dataset = DataLoader.load_parquet(dataset, columns=list(RESCORE_COLUMNS))
+            else:
+                dataset = DataLoader.load_jsonl(dataset)
+        samples_by_id = {sample.id: sample for sample in dataset.samples}
+        
+        print(f"🔄 重新计算指标: {results_file}")
+        
+        all_sample_results = []
+        all_errors = []
+        aggregator = MetricAggregator()
+        group_aggregator = GroupedMetricAggregator()
+        
+        executor = None
+        if num_workers > 1:
+            executor = create_process_pool(self, None, num_workers)
+            chunk_size = chunk_size or default_chunk_size(batch_size, num_workers)
+        
+        def flush(batch_samples, extractions):
+            batch_results, batch_errors = self._score_batch(
+                batch_samples, extractions, executor, chunk_size or 1
+            )
+            aggregator.add_batch(batch_results)
+            group_aggregator.add_batch(batch_results, self._batch_group_metadata(batch_samples, batch_results))
+            all_sample_results.extend(batch_results)
+            all_errors.extend(batch_errors)
+        
+        batch_samples = []
+        extractions = []
+        try:
+            for saved in DataLoader.stream_sample_results(results_file):
+                sample_id = saved.get('sample_id')
+                sample = samples_by_id.get(sample_id)
+                if sample is None:
+                    print(f"⚠️  样本 {sample_id} 不在数据集中，跳过")
+                    continue
+                
+                batch_samples.append(sample)
+                extractions.append(self._saved_extraction(saved))
+                if len(batch_samples) >= batch_size:
+                    flush(batch_samples, extractions)
+                    batch_samples, extractions = [], []
+                    print(f"📊 已重新打分 {len(all_sample_results)} 个样本")
+            
+            if batch_samples:
+                flush(batch_samples, extractions)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        return EvaluationResult(
+            dataset_name=dataset.name,
+            extractor_name=extractor_name or strip_compression(results_file).stem,
+            timestamp=datetime.now().isoformat(),
+            total_samples=len(all_sample_results),
+            overall_metrics=aggregator.mean_scores(),
             sample_results=all_sample_results,
-            category_metrics=category_metrics,
-            error_analysis=error_analysis,
-            extractor_config=extractor.get_config(),
+            category_metrics=group_aggregator.group_scores('content_type'),
+            group_metrics=group_aggregator.all_group_scores(),
+            error_analysis=self._analyze_errors(all_errors, len(all_sample_results)),
+            metric_statistics=aggregator.statistics(),
+            extractor_config=None,
             metric_config=self.metric_config,
         )
+    
+    @staticmethod
+    def _saved_extraction(saved: Dict[str, Any]) -> tuple:
+        """将保存的样本结果还原为 (extraction_result, error)"""
+        if not saved.get('extraction_success', False):
+            return ExtractionResult.create_error_result(
+                saved.get('extraction_error') or 'Unknown error',
+                extraction_time=saved.get('extraction_time', 0.0)
+            ), None
         
-        return evaluation_result
+        if saved.get('extracted_content') is None:
+            return None, "保存的结果中没有extracted_content，无法重新打分"
+        
+        return ExtractionResult(
+            content=saved['extracted_content'],
+            content_list=saved.get('extracted_content_list') or [],
+            extraction_time=saved.get('extraction_time', 0.0),
+            success=True
+        ), None
     
-    def _process_batch(self, batch_samples: List[DataSample], extractor: BaseExtractor) -> tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+    def _run_batch_pipeline(self, batch_source: Iterator[List[DataSample]],
+                            extractor: BaseExtractor,
+                            executor: Optional[Executor],
+                            chunk_size: int,
+                            queue_size: int,
+                            extract_workers: int,
+                            metric_workers: int) -> Iterator[tuple]:
+        """
+        流水线方式处理批次：读取、抽取和指标计算三个阶段通过有界队列并发执行。
+        
+        Yields:
+            (batch_samples, batch_results, batch_errors)，顺序与读取顺序一致
+        """
+        def extract_stage(batch_samples):
+            return batch_samples, self._extract_batch(batch_samples, extractor)
+        
+        def score_stage(item):
+            batch_samples, extractions = item
+            return (batch_samples,) + self._score_batch(batch_samples, extractions, executor, chunk_size)
+        
+        stages = [
+            Stage("extract", extract_stage, extract_workers),
+            Stage("score", score_stage, metric_workers),
+        ]
+        return StagedPipeline(stages, queue_size=queue_size).run(batch_source)
+    
+    def _process_batch(self, batch_samples: List[DataSample], extractor: BaseExtractor,
+                       executor: Optional[Executor] = None,
+                       chunk_size: int = 1) -> tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
         """处理一批样本"""
-        batch_results = []
-        batch_errors = []
+        if executor is not None:
+            outcomes = [
+                (sample_result, error)
+                for _, sample_result, error in self._iter_sample_results(
+                    batch_samples, extractor, executor, chunk_size
+                )
+            ]
+            return self._collect_batch_outcomes(batch_samples, outcomes)
+        
+        extractions = self._extract_batch(batch_samples, extractor)
+        return self._score_batch(batch_samples, extractions)
+    
+    def _extract_batch(self, batch_samples: List[DataSample],
+                       extractor: BaseExtractor) -> List[tuple]:
+        """
+        抽取一批样本。
+        
+        Returns:
+            与样本一一对应的 (extraction_result, error) 列表
+        """
+        if extractor.supports_batch_extract:
+            return self._batch_extract_samples(batch_samples, extractor)
         
+        extractions = []
         for sample in batch_samples:
             try:
-                sample_result = self._evaluate_sample(sample, extractor)
+                extractions.append((self._extract_sample(sample, extractor), None))
+            except Exception as e:
+                extractions.append((None, str(e)))
+        return extractions
+    
+    def _batch_extract_samples(self, batch_samples: List[DataSample],
+                               extractor: BaseExtractor) -> List[tuple]:
+        """通过抽取器的batch_extract一次性抽取整批样本"""
+        if extractor.__class__.__name__ == 'LlmWebkitExtractor':
+            # LlmWebkitExtractor可以接受DataSample对象来支持预处理HTML
+            inputs = list(batch_samples)
+        else:
+            inputs = [sample.html for sample in batch_samples]
+        
+        try:
+            results = extractor.batch_extract(inputs, [sample.url for sample in batch_samples])
+        except Exception as e:
+            return [(None, str(e))] * len(batch_samples)
+        return [(result, None) for result in results]
+    
+    def _score_batch(self, batch_samples: List[DataSample],
+                     extractions: List[tuple],
+                     executor: Optional[Executor] = None,
+                     chunk_size: int = 1) -> tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+        """对已抽取的一批样本计算指标"""
+        outcomes = [None] * len(batch_samples)
+        to_score = []
+        for i, (extraction_result, error) in enumerate(extractions):
+            if error is None:
+                to_score.append(i)
+            else:
+                outcomes[i] = (None, error)
+        
+        if executor is not None:
+            scored = map_scores(
+                executor,
+                [batch_samples[i] for i in to_score],
+                [extractions[i][0] for i in to_score],
+                chunk_size,
+            )
+            for i, outcome in zip(to_score, scored):
+                outcomes[i] = outcome
+        else:
+            try:
+                # 整批样本一起计算指标，每个指标只调用一次 batch_calculate
+                scored = self._score_samples(
+                    [batch_samples[i] for i in to_score],
+                    [extractions[i][0] for i in to_score],
+                )
+                for i, sample_result in zip(to_score, scored):
+                    outcomes[i] = (sample_result, None)
+            except Exception:
+                # 批量计算失败时逐个样本计算，将错误定位到具体样本
+                for i in to_score:
+                    try:
+                        outcomes[i] = (self._score_sample(batch_samples[i], extractions[i][0]), None)
+                    except Exception as e:
+                        outcomes[i] = (None, str(e))
+        
+        return self._collect_batch_outcomes(batch_samples, outcomes)
+    
+    def _collect_batch_outcomes(self, batch_samples: List[DataSample],
+                                outcomes: List[tuple]) -> tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+        """将 (sample_result, error) 结果整理为批次结果和错误列表"""
+        batch_results = []
+        batch_errors = []
+        
+        for sample, (sample_result, error) in zip(batch_samples, outcomes):
+            if error is None:
                 batch_results.append(sample_result)
                 
                 # 收集错误信息
@@ -293,29 +851,93 @@ class Evaluator:
                         'error': sample_result.get('extraction_error', 'Unknown error'),
                         'url': sample.url,
                     })
-                    
-            except Exception as e:
-                print(f"⚠️  样本 {sample.id} 评测失败: {e}")
+            else:
+                print(f"⚠️  样本 {sample.id} 评测失败: {error}")
                 batch_errors.append({
                     'sample_id': sample.id,
-                    'error': str(e),
+                    'error': error,
                     'url': sample.url,
                 })
         
         return batch_results, batch_errors
     
+    def _iter_sample_results(self, samples: List[DataSample], extractor: BaseExtractor,
+                             executor: Optional[Executor] = None,
+                             chunk_size: int = 1) -> Iterator[tuple]:
+        """
+        Evaluate samples serially or in a process pool.
+        
+        Yields:
+            (sample, sample_result, error) tuples in input order; ``error`` is
+            set (and ``sample_result`` is None) when evaluation raised.
+        """
+        if executor is not None:
+            for sample, (sample_result, error) in zip(samples, map_samples(executor, samples, chunk_size)):
+                yield sample, sample_result, error
+            return
+        
+        for sample in samples:
+            try:
+                yield sample, self._evaluate_sample(sample, extractor), None
+            except Exception as e:
+                yield sample, None, str(e)
+    
 
     def _evaluate_sample(self, sample: DataSample, extractor: BaseExtractor) -> Dict[str, Any]:
         """Evaluate a single sample."""
+        extraction_result = self._extract_sample(sample, extractor)
+        return self._score_sample(sample, extraction_result)
+    
+    def _extract_sample(self, sample: DataSample, extractor: BaseExtractor) -> ExtractionResult:
+        """Run the extractor on a single sample."""
         if extractor.__class__.__name__ == 'TestModelExtractor':
-            extraction_result = extractor.extract_from_sample(sample)
+            return extractor.extract_from_sample(sample)
         elif extractor.__class__.__name__ == 'LlmWebkitExtractor':
             # LlmWebkitExtractor可以接受DataSample对象来支持预处理HTML
-            extraction_result = extractor.extract(sample, sample.url)
+            return extractor.extract(sample, sample.url)
         else:
             # Extract content
-            extraction_result = extractor.extract(sample.html, sample.url)
+            return extractor.extract(sample.html, sample.url)
+    
+    def _score_sample(self, sample: DataSample, extraction_result: ExtractionResult) -> Dict[str, Any]:
+        """Build the sample result and calculate metrics for an extraction result."""
+        sample_result = self._new_sample_result(sample, extraction_result)
+        if not extraction_result.success:
+            return sample_result
         
+        # Calculate metrics
+        metrics = self.metric_calculator.calculate_all(
+            predicted_content=extraction_result.content,
+            groundtruth_content=sample.groundtruth_content,
+            predicted_content_list=extraction_result.content_list,
+            groundtruth_content_list=sample.groundtruth_content_list,
+        )
+        self._attach_metrics(sample_result, sample, metrics)
+        return sample_result
+    
+    def _score_samples(self, samples: List[DataSample],
+                       extraction_results: List[ExtractionResult]) -> List[Dict[str, Any]]:
+        """Same as ``_score_sample`` for several samples, with one metric call per batch."""
+        sample_results = [
+            self._new_sample_result(sample, extraction_result)
+            for sample, extraction_result in zip(samples, extraction_results)
+        ]
+        to_score = [i for i, extraction_result in enumerate(extraction_results) if extraction_result.success]
+        batch_metrics = self.metric_calculator.calculate_batch([
+            {
+                'predicted_content': extraction_results[i].content,
+                'groundtruth_content': samples[i].groundtruth_content,
+                'predicted_content_list': extraction_results[i].content_list,
+                'groundtruth_content_list': samples[i].groundtruth_content_list,
+            }
+            for i in to_score
+        ])
+        for i, metrics in zip(to_score, batch_metrics):
+            self._attach_metrics(sample_results[i], samples[i], metrics)
+        return sample_results
+    
+    def _new_sample_result(self, sample: DataSample, extraction_result: ExtractionResult) -> Dict[str, Any]:
+        """Sample result without metrics (final for failed extractions)."""
         # Prepare result
         sample_result = {
             'sample_id': sample.id,
@@ -328,16 +950,11 @@ class Evaluator:
         if not extraction_result.success:
             sample_result['extraction_error'] = extraction_result.error_message
             sample_result['metrics'] = {}
-            return sample_result
-        
-        # Calculate metrics
-        metrics = self.metric_calculator.calculate_all(
-            predicted_content=extraction_result.content,
-            groundtruth_content=sample.groundtruth_content,
-            predicted_content_list=extraction_result.content_list,
-            groundtruth_content_list=sample.groundtruth_content_list,
-        )
-        
+        return sample_result
+    
+    def _attach_metrics(self, sample_result: Dict[str, Any], sample: DataSample,
+                        metrics: Dict[str, MetricResult]) -> None:
+        """Add calculated metrics and sample metadata to a sample result."""
         # Convert metrics to dict
         metrics_dict = {}
         for metric_name, metric_result in metrics.items():
@@ -359,104 +976,31 @@ class Evaluator:
             'content_type': sample.content_type,
             'difficulty': sample.difficulty,
         }
-        
-        return sample_result
     
-    def _aggregate_metrics(self, sample_results: List[Dict[str, Any]]) -> Dict[str, float]:
-        """Aggregate metrics across all samples."""
-        # # Collect metric results by metric name
-        # metric_groups = {}
-        #
-        # for sample_result in sample_results:
-        #     if not sample_result.get('extraction_success', True):
-        #         continue
-        #
-        #     metrics = sample_result.get('metrics', {})
-        #     for metric_name, metric_data in metrics.items():
-        #         if metric_data.get('success', False):
-        #             if metric_name not in metric_groups:
-        #                 metric_groups[metric_name] = []
-        #             metric_groups[metric_name].append(metric_data['score'])
-        #
-        # # Calculate aggregated scores
-        # aggregated_metrics = {}
-        # for metric_name, scores in metric_groups.items():
-        #     if scores:
-        #         aggregated_metrics[metric_name] = sum(scores) / len(scores)
-        #     else:
-        #         aggregated_metrics[metric_name] = 0.0
-        #
-        # # overall score is already calculated by MetricCalculator
-        # # No need to override it here
-        #
-        # return aggregated_metrics
-        """
-            聚合所有样本的指标，计算全局平均值（每个指标单独聚合）
-            """
-        if not sample_results:
-            return {}
-
-        # 初始化每个指标的总分和样本数
-        metric_totals = {
-            "text_edit": 0.0,
-            "code_edit": 0.0,
-            "table_edit": 0.0,
-            "table_TEDS": 0.0,
-            "formula_edit": 0.0,
-            "overall": 0.0  # 全局overall单独计算
-        }
-        metric_counts = {k: 0 for k in metric_totals.keys()}  # 记录每个指标有效样本数
-
-        # 累加所有样本的指标分数
-        for sample in sample_results:
-            metrics = sample.get("metrics", {})
-            for metric_name in metric_totals.keys():
-                if metric_name in metrics and metrics[metric_name].get("success", False):
-                    metric_totals[metric_name] += metrics[metric_name]["score"]
-                    metric_counts[metric_name] += 1
-
-        # 计算每个指标的平均值（全局overall为5个单项指标的平均值）
-        overall_metrics = {}
-        for metric_name in metric_totals.keys():
-            if metric_counts[metric_name] > 0:
-                overall_metrics[metric_name] = metric_totals[metric_name] / metric_counts[metric_name]
-            else:
-                overall_metrics[metric_name] = 0.0  # 无有效样本时默认为0
-
-        # 特别处理全局overall：固定为5个单项指标的平均值（无论单项是否有有效样本）
-        # 排除样本级overall，仅用5个核心指标计算全局overall
-        core_metrics = ["text_edit", "code_edit", "table_edit", "table_TEDS", "formula_edit"]
-        core_scores = [overall_metrics[metric] for metric in core_metrics]
-        overall_metrics["overall"] = sum(core_scores) / len(core_metrics)
-
-        return overall_metrics
-    
-    def _calculate_category_metrics(self, sample_results: List[Dict[str, Any]], 
-                                  samples: List[DataSample]) -> Optional[Dict[str, Dict[str, float]]]:
-        """Calculate metrics by category."""
-        # Group samples by content type
-        category_samples = {}
-        for i, sample in enumerate(samples):
-            if i >= len(sample_results):
-                break
-                
-            content_type = sample.content_type or 'unknown'
-            if content_type not in category_samples:
-                category_samples[content_type] = []
-            category_samples[content_type].append(sample_results[i])
-        
-        # Calculate metrics for each category
-        category_metrics = {}
-        for category, category_sample_results in category_samples.items():
-            if len(category_sample_results) >= 3:  # Only calculate if enough samples
-                category_metrics[category] = self._aggregate_metrics(category_sample_results)
-        
-        return category_metrics if category_metrics else None
+    def _flush_results(self, pending_results: List[Dict[str, Any]], pending_samples: List[DataSample],
+                       sample_results: Union[List[Dict[str, Any]], CompactResultStore],
+                       aggregator: MetricAggregator, group_aggregator: GroupedMetricAggregator) -> None:
+        """Aggregate the pending results with their exact scores, then move them to ``sample_results``."""
+        aggregator.add_batch(pending_results)
+        group_aggregator.add_batch(pending_results, [self._group_metadata(s) for s in pending_samples])
+        sample_results.extend(pending_results)
+        pending_results.clear()
+        pending_samples.clear()
+    
+    @staticmethod
+    def _group_metadata(sample: DataSample) -> Dict[str, Any]:
+        """Metadata fields used for grouped metrics."""
+        return {field: getattr(sample, field, None) for field in GROUP_FIELDS}
+    
+    def _batch_group_metadata(self, batch_samples: List[DataSample],
+                              batch_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Group metadata of each batch result (results of failed samples are missing, so match by sample_id)."""
+        samples_by_id = {sample.id: sample for sample in batch_samples}
+        return [self._group_metadata(samples_by_id[result['sample_id']]) for result in batch_results]
     
     def _analyze_errors(self, extraction_errors: List[Dict[str, str]], 
-                       sample_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+                       total_samples: int) -> Dict[str, Any]:
         """Analyze extraction errors."""
-        total_samples = len(sample_results)
         failed_samples = len(extraction_errors)
         success_rate = (total_samples - failed_samples) / total_samples if total_samples > 0 else 0.0
         
@@ -0,0 +1,91 @@
+"""
+Process-pool helpers for parallel evaluation in WebMainBench.
+
+Each worker process receives the evaluator and the extractor once (through
+the pool initializer) and reuses them for every sample it is given, so
+extractors with expensive setup are only initialized once per worker.
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ..data import DataSample
+    from ..extractors import BaseExtractor, ExtractionResult
+    from .evaluator import Evaluator
+
+
+# 每个worker进程内复用的评测器和抽取器
+_worker_evaluator: Optional["Evaluator"] = None
+_worker_extractor: Optional["BaseExtractor"] = None
+
+
+def _init_worker(evaluator: "Evaluator", extractor: "BaseExtractor") -> None:
+    """Pool initializer: keep one evaluator/extractor per worker process."""
+    global _worker_evaluator, _worker_extractor
+    _worker_evaluator = evaluator
+    _worker_extractor = extractor
+
+
+def _evaluate_in_worker(sample: "DataSample") -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Evaluate one sample inside a worker, returning (sample_result, error)."""
+    try:
+        return _worker_evaluator._evaluate_sample(sample, _worker_extractor), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _score_in_worker(item: Tuple["DataSample", "ExtractionResult"]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Score one already-extracted sample inside a worker, returning (sample_result, error)."""
+    sample, extraction_result = item
+    try:
+        return _worker_evaluator._score_sample(sample, extraction_result), None
+    except Exception as e:
+        return None, str(e)
+
+
+def create_process_pool(evaluator: "Evaluator",
+                        extractor: Optional["BaseExtractor"],
+                        num_workers: int) -> ProcessPoolExecutor:
+    """
+    Create a process pool whose workers evaluate samples.
+
+    Args:
+        evaluator: Evaluator whose metric calculator is used in the workers
+        extractor: Extractor instance shared (by copy) with every worker;
+            None for pools that only score already-extracted samples
+        num_workers: Number of worker processes
+
+    Returns:
+        ProcessPoolExecutor instance
+    """
+    return ProcessPoolExecutor(
+        max_workers=num_workers,
+        initializer=_init_worker,
+        initargs=(evaluator, extractor),
+    )
+
+
+def default_chunk_size(num_samples: int, num_workers: int) -> int:
+    """Pick a chunk size that gives each worker a few chunks to balance load."""
+    return max(1, min(64, num_samples // (num_workers * 4)))
+
+
+def map_samples(executor: Executor,
+                samples: Iterable["DataSample"],
+                chunk_size: int = 1) -> Iterator[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Evaluate samples in the pool.
+
+    Results are yielded in input order, so merging them gives the same
+    ordering as a serial run.
+    """
+    return executor.map(_evaluate_in_worker, samples, chunksize=chunk_size)
+
+
+def map_scores(executor: Executor,
+               samples: List["DataSample"],
+               extraction_results: List["ExtractionResult"],
+               chunk_size: int = 1) -> Iterator[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """Score already-extracted samples in the pool, yielding results in input order."""
+    return executor.map(_score_in_worker, zip(samples, extraction_results), chunksize=chunk_size)
@@ -0,0 +1,176 @@
+"""
+Staged pipeline execution for WebMainBench.
+
+A pipeline runs items from a source iterator through a chain of stages.
+Every stage has its own pool of worker threads and is connected to the next
+one by a bounded queue, so a slow stage applies backpressure to the stages
+before it while the others keep working on the items already queued.
+The number of items between the reader and the in-order output is bounded
+as well, so one slow item cannot make the reorder buffer grow without limit.
+"""
+
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, List
+
+
+@dataclass
+class Stage:
+    """A pipeline stage."""
+
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+
+
+# 队列结束标记
+_STOP = object()
+
+# 阻塞操作的轮询间隔（秒），用于及时响应停止信号
+_POLL_INTERVAL = 0.1
+
+
+class StagedPipeline:
+    """Run items through stages connected by bounded queues."""
+
+    def __init__(self, stages: List[Stage], queue_size: int = 2):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stages: Stages to run, in order
+            queue_size: Capacity of each inter-stage queue
+        """
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        if any(stage.workers < 1 for stage in stages):
+            raise ValueError("Every stage needs at least one worker")
+
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+
+    def run(self, source: Iterable[Any]) -> Iterator[Any]:
+        """
+        Run the pipeline.
+
+        Args:
+            source: Items fed into the first stage (consumed by a reader thread)
+
+        Yields:
+            Outputs of the last stage, in source order
+
+        Raises:
+            Exception: The first exception raised by the reader or any stage
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        # 读取时占用、按顺序产出时释放，限制在途（含等待重排）的条目数
+        in_flight = threading.Semaphore(self.queue_size + sum(stage.workers for stage in self.stages))
+        stop_event = threading.Event()
+        errors: List[BaseException] = []
+        threads: List[threading.Thread] = []
+
+        def put(q: queue.Queue, item: Any) -> bool:
+            while not stop_event.is_set():
+                try:
+                    q.put(item, timeout=_POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(q: queue.Queue) -> Any:
+            while not stop_event.is_set():
+                try:
+                    return q.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+            return _STOP
+
+        def acquire() -> bool:
+            while not stop_event.is_set():
+                if in_flight.acquire(timeout=_POLL_INTERVAL):
+                    return True
+            return False
+
+        def fail(error: BaseException) -> None:
+            errors.append(error)
+            stop_event.set()
+
+        def read_source() -> None:
+            try:
+                items = enumerate(source)
+                while acquire():
+                    try:
+                        index, item = next(items)
+                    except StopIteration:
+                        return
+                    if not put(queues[0], (index, item)):
+                        return
+            except BaseException as e:
+                fail(e)
+            finally:
+                for _ in range(self.stages[0].workers):
+                    put(queues[0], _STOP)
+
+        def run_stage(stage_index: int, remaining: List[int], lock: threading.Lock) -> None:
+            stage = self.stages[stage_index]
+            in_queue = queues[stage_index]
+            out_queue = queues[stage_index + 1]
+            try:
+                while True:
+                    item = get(in_queue)
+                    if item is _STOP:
+                        break
+                    index, value = item
+                    if not put(out_queue, (index, stage.func(value))):
+                        break
+            except BaseException as e:
+                fail(e)
+            finally:
+                # 本阶段最后一个退出的worker负责通知下游结束
+                with lock:
+                    remaining[0] -= 1
+                    last_worker = remaining[0] == 0
+                if last_worker:
+                    next_workers = (self.stages[stage_index + 1].workers
+                                    if stage_index + 1 < len(self.stages) else 1)
+                    for _ in range(next_workers):
+                        put(out_queue, _STOP)
+
+        threads.append(threading.Thread(target=read_source, name="pipeline-reader", daemon=True))
+        for stage_index, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            for worker_index in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=run_stage,
+                    args=(stage_index, remaining, lock),
+                    name=f"pipeline-{stage.name}-{worker_index}",
+                    daemon=True,
+                ))
+
+        for thread in threads:
+            thread.start()
+
+        # 多worker阶段的输出可能乱序，这里按源顺序重新排列
+        pending = {}
+        next_index = 0
+        try:
+            while True:
+                item = get(queues[-1])
+                if item is _STOP:
+                    break
+                index, value = item
+                pending[index] = value
+                while next_index in pending:
+                    in_flight.release()
+                    yield pending.pop(next_index)
+                    next_index += 1
+
+            if errors:
+                raise errors[0]
+        finally:
+            stop_event.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,192 @@
+"""
+Compact in-memory storage for per-sample evaluation results.
+
+The Evaluator describes every sample with a nested dict (one dict per
+metric plus ``details``, and a copy of the extracted content). For large
+runs ``CompactResultStore`` keeps only a columnar score table (samples x
+metrics, float32), the success masks and extraction times in NumPy arrays;
+metric details, errors, extracted content and sample metadata are pickled
+to a spill file and read back when a sample result is accessed.
+
+The store is a read-only sequence of the same dicts, so
+``EvaluationResult.sample_results`` can be backed by it. Scores read back
+are rounded to float32; aggregated metrics are computed from the exact
+scores before the results are stored.
+"""
+
+import math
+import pickle
+import tempfile
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+# 单独成列保存的字段，其余字段写入溢出文件
+TABLE_FIELDS = ("sample_id", "extraction_success", "extraction_time", "metrics")
+INITIAL_CAPACITY = 1024
+
+
+class CompactResultStore(Sequence):
+    """Sample results as a float32 score table plus spilled details (see module docstring)."""
+
+    def __init__(self, spill_path: Optional[Union[str, Path]] = None,
+                 score_dtype: Any = np.float32):
+        """
+        Args:
+            spill_path: File for metric details and extracted content (default: an
+                anonymous temporary file removed when the store is closed)
+            score_dtype: dtype of the score table
+        """
+        self.spill_path = Path(spill_path) if spill_path is not None else None
+        self._spill = open(spill_path, 'w+b') if spill_path is not None else tempfile.TemporaryFile()
+        self.sample_ids: List[str] = []
+        self.metric_names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._size = 0
+        self._scores = np.zeros((INITIAL_CAPACITY, 0), dtype=score_dtype)
+        # 指标是否出现在样本结果中 / 是否计算成功
+        self._metric_present = np.zeros((INITIAL_CAPACITY, 0), dtype=bool)
+        self._metric_success = np.zeros((INITIAL_CAPACITY, 0), dtype=bool)
+        self._extraction_success = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        # NaN 表示样本结果中没有 extraction_time（评测异常的样本）
+        self._extraction_time = np.zeros(INITIAL_CAPACITY, dtype=np.float64)
+        self._offsets = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self._lengths = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self._spill_size = 0
+
+    def _grow(self, rows: int) -> None:
+        capacity = len(self._extraction_success)
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        extra = capacity - len(self._extraction_success)
+        self._scores = np.vstack([self._scores, np.zeros((extra, len(self.metric_names)), dtype=self._scores.dtype)])
+        self._metric_present = np.vstack([self._metric_present, np.zeros((extra, len(self.metric_names)), dtype=bool)])
+        self._metric_success = np.vstack([self._metric_success, np.zeros((extra, len(self.metric_names)), dtype=bool)])
+        self._extraction_success = np.concatenate([self._extraction_success, np.zeros(extra, dtype=bool)])
+        self._extraction_time = np.concatenate([self._extraction_time, np.zeros(extra)])
+        self._offsets = np.concatenate([self._offsets, np.zeros(extra, dtype=np.int64)])
+        self._lengths = np.concatenate([self._lengths, np.zeros(extra, dtype=np.int64)])
+
+    def _add_metrics(self, metric_names: Iterable[str]) -> None:
+        new_names = [name for name in dict.fromkeys(metric_names) if name not in self._index]
+        if not new_names:
+            return
+        for name in new_names:
+            self._index[name] = len(self.metric_names)
+            self.metric_names.append(name)
+        rows, extra = len(self._extraction_success), len(new_names)
+        self._scores = np.hstack([self._scores, np.zeros((rows, extra), dtype=self._scores.dtype)])
+        self._metric_present = np.hstack([self._metric_present, np.zeros((rows, extra), dtype=bool)])
+        self._metric_success = np.hstack([self._metric_success, np.zeros((rows, extra), dtype=bool)])
+
+    def append(self, sample_result: Dict[str, Any]) -> None:
+        """Store one sample result."""
+        self.extend([sample_result])
+
+    def extend(self, sample_results: Iterable[Dict[str, Any]]) -> None:
+        """Store sample results (dicts as produced by the Evaluator)."""
+        sample_results = list(sample_results)
+        if not sample_results:
+            return
+        self._add_metrics(name for result in sample_results for name in result.get("metrics", {}))
+        self._grow(self._size + len(sample_results))
+
+        chunks = []
+        for row, result in enumerate(sample_results, self._size):
+            self.sample_ids.append(result["sample_id"])
+            self._extraction_success[row] = result["extraction_success"]
+            self._extraction_time[row] = result.get("extraction_time", math.nan)
+            metric_rest = None
+            if "metrics" in result:
+                # 只溢出分数和成功标记以外的部分（details、error）
+                metric_rest = {}
+                for name, metric_data in result["metrics"].items():
+                    column = self._index[name]
+                    self._metric_present[row, column] = True
+                    self._metric_success[row, column] = metric_data["success"]
+                    self._scores[row, column] = metric_data["score"]
+                    metric_rest[name] = {key: value for key, value in metric_data.items()
+                                         if key not in ("score", "success")}
+            # 保存原有的键顺序，读取时按相同顺序重建
+            spilled = (list(result), metric_rest,
+                       {key: value for key, value in result.items() if key not in TABLE_FIELDS})
+            chunk = pickle.dumps(spilled, protocol=pickle.HIGHEST_PROTOCOL)
+            self._offsets[row] = self._spill_size
+            self._lengths[row] = len(chunk)
+            self._spill_size += len(chunk)
+            chunks.append(chunk)
+
+        self._spill.seek(0, 2)
+        self._spill.write(b"".join(chunks))
+        self._size += len(sample_results)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._load(row) for row in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("sample result index out of range")
+        return self._load(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(self._size):
+            yield self._load(row)
+
+    def _load(self, row: int) -> Dict[str, Any]:
+        """Rebuild the sample result dict of ``row``."""
+        self._spill.seek(int(self._offsets[row]))
+        keys, metric_rest, fields = pickle.loads(self._spill.read(int(self._lengths[row])))
+        fields["sample_id"] = self.sample_ids[row]
+        fields["extraction_success"] = bool(self._extraction_success[row])
+        fields["extraction_time"] = float(self._extraction_time[row])
+        if metric_rest is not None:
+            fields["metrics"] = {
+                name: {
+                    "score": float(self._scores[row, self._index[name]]),
+                    "success": bool(self._metric_success[row, self._index[name]]),
+                    **rest,
+                }
+                for name, rest in metric_rest.items()
+            }
+        return {key: fields[key] for key in keys}
+
+    @property
+    def score_table(self) -> np.ndarray:
+        """Scores of all samples (rows) and metrics (columns of ``metric_names``); NaN where a metric is missing."""
+        return np.where(self._metric_present[:self._size], self._scores[:self._size], np.nan)
+
+    @property
+    def metric_success(self) -> np.ndarray:
+        """Boolean mask of successful metric scores, shaped like ``score_table``."""
+        return self._metric_success[:self._size].copy()
+
+    @property
+    def extraction_success(self) -> np.ndarray:
+        """Boolean mask of successful extractions, one entry per sample."""
+        return self._extraction_success[:self._size].copy()
+
+    def scores(self, metric_name: str, successful_only: bool = True) -> np.ndarray:
+        """Scores of ``metric_name`` for all samples (NaN where missing, or failed if ``successful_only``)."""
+        column = self._index.get(metric_name)
+        if column is None:
+            return np.full(self._size, np.nan)
+        mask = self._metric_success if successful_only else self._metric_present
+        return np.where(mask[:self._size, column], self._scores[:self._size, column], np.nan)
+
+    def close(self) -> None:
+        """Close (and, for the default temporary file, delete) the spill file."""
+        self._spill.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -8,10 +8,13 @@ from typing import Dict, List, Any, Optional, Union
 import time
 import traceback
 
+from ..utils.helpers import with_slots
 
+
+@with_slots
 @dataclass
 class ExtractionResult:
-    """Result of content extraction."""
+    """Result of content extraction (fields stored in ``__slots__``)."""
     
     # Core extraction results
     content: str = ""  # Extracted markdown content
@@ -74,6 +77,9 @@ class ExtractionResult:
 class BaseExtractor(ABC):
     """Base class for all content extractors."""
     
+    # batch_extract 是否比逐条调用 extract 更高效（如LLM批量推理），评测器据此选择批量抽取路径
+    supports_batch_extract: bool = False
+    
     def __init__(self, name: str, config: Dict[str, Any] = None):
         """
         Initialize the extractor.
@@ -84,6 +90,8 @@ class BaseExtractor(ABC):
         """
         self.name = name
         self.config = config or {}
+        # 可选的持久化抽取结果缓存（ExtractionCache），由extract透明使用
+        self.cache = None
         self._setup()
     
     @abstractmethod
@@ -152,10 +160,20 @@ class BaseExtractor(ABC):
                     extraction_time=time.time() - start_time
                 )
             
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.make_key(self, html, url)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
             # Perform extraction
             result = self._extract_content(html, url)
             result.extraction_time = time.time() - start_time
             
+            if cache_key is not None:
+                self.cache.put(cache_key, result)
+            
             return result
             
         except Exception as e:
@@ -0,0 +1,226 @@
+"""
+Persistent extraction-result cache for WebMainBench.
+
+Extraction results are stored in a SQLite file keyed by a hash of the HTML,
+the URL and the extractor's name, version and configuration, so re-running a
+benchmark with a different metric configuration does not re-extract pages.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union, TYPE_CHECKING
+
+from .base import ExtractionResult
+
+if TYPE_CHECKING:
+    from .base import BaseExtractor
+
+# 命中时的 last_access 先记在内存中，累计到该数量或超过该间隔（秒）时批量写入
+ACCESS_FLUSH_SIZE = 256
+ACCESS_FLUSH_INTERVAL = 5.0
+
+
+class ExtractionCache:
+    """On-disk cache of successful ExtractionResult objects with size-based LRU eviction."""
+
+    def __init__(self, path: Union[str, Path], max_size_mb: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite database file (created if missing)
+            max_size_mb: Maximum total size of cached results in MB (None = unlimited);
+                least recently used entries are evicted beyond it
+        """
+        self.path = Path(path)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        # key -> 尚未写入的最近访问时间
+        self._pending_access: Dict[str, float] = {}
+        self._last_access_flush = time.monotonic()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # 连接和锁不能跨进程传递，在子进程中重新打开
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_conn_pid"] = None
+        state["_lock"] = None
+        state["_pending_access"] = {}
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open (or reopen after fork) the SQLite connection."""
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS extraction_cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_extraction_cache_access "
+                "ON extraction_cache (last_access)"
+            )
+            # 总大小保存在单行表中，由触发器在同一事务内维护，避免每次写入都 SUM 全表
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS extraction_cache_size ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO extraction_cache_size (id, total) "
+                "SELECT 0, COALESCE(SUM(size), 0) FROM extraction_cache"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS extraction_cache_insert AFTER INSERT ON extraction_cache "
+                "BEGIN UPDATE extraction_cache_size SET total = total + NEW.size; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS extraction_cache_delete AFTER DELETE ON extraction_cache "
+                "BEGIN UPDATE extraction_cache_size SET total = total - OLD.size; END"
+            )
+            conn.commit()
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def make_key(extractor: "BaseExtractor", html: str, url: Optional[str] = None) -> str:
+        """Build the cache key for extracting ``html`` with ``extractor``."""
+        fingerprint = json.dumps({
+            "html_sha256": hashlib.sha256(html.encode("utf-8", "surrogatepass")).hexdigest(),
+            "url": url,
+            "extractor": extractor.name,
+            "version": getattr(extractor, "version", None),
+            "config": extractor.get_config(),
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[ExtractionResult]:
+        """Return the cached result for ``key``, or None on a miss."""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            # 命中只读数据库，访问时间批量写入，避免每次命中都开启写事务
+            self._pending_access[key] = time.time()
+            self.hits += 1
+            if (len(self._pending_access) >= ACCESS_FLUSH_SIZE
+                    or time.monotonic() - self._last_access_flush >= ACCESS_FLUSH_INTERVAL):
+                self._flush_access(conn)
+                conn.commit()
+
+        return ExtractionResult.from_dict(json.loads(row[0]))
+
+    def put(self, key: str, result: ExtractionResult) -> None:
+        """Store a result; failed extractions are not cached."""
+        if not result.success:
+            return
+
+        value = json.dumps(result.to_dict(), ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            conn = self._connect()
+            # 淘汰前写入待更新的访问时间，保证按最近使用顺序淘汰
+            self._flush_access(conn)
+            # 先删除再插入：INSERT OR REPLACE 删除旧行时不触发 DELETE 触发器
+            conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT INTO extraction_cache (key, value, size, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time())
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _flush_access(self, conn: sqlite3.Connection) -> None:
+        """Write the buffered last_access times (the caller commits)."""
+        if self._pending_access:
+            conn.executemany(
+                "UPDATE extraction_cache SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+        self._last_access_flush = time.monotonic()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop least recently used entries until the cache fits ``max_size_bytes``."""
+        if self.max_size_bytes is None:
+            return
+
+        total_size = self._total_size(conn)
+        if total_size <= self.max_size_bytes:
+            return
+
+        to_delete = []
+        for key, size in conn.execute("SELECT key, size FROM extraction_cache ORDER BY last_access"):
+            if total_size <= self.max_size_bytes:
+                break
+            to_delete.append((key,))
+            total_size -= size
+
+        conn.executemany("DELETE FROM extraction_cache WHERE key = ?", to_delete)
+        self.evictions += len(to_delete)
+
+    @staticmethod
+    def _total_size(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT total FROM extraction_cache_size").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove every cached result."""
+        with self._lock:
+            conn = self._connect()
+            self._pending_access.clear()
+            conn.execute("DELETE FROM extraction_cache")
+            conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics of this cache instance and the current cache size."""
+        with self._lock:
+            conn = self._connect()
+            entries = conn.execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+            size = self._total_size(conn)
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._conn is not None and self._conn_pid == os.getpid():
+                self._flush_access(self._conn)
+                self._conn.commit()
+                self._conn.close()
+            self._conn = None
+            self._conn_pid = None
@@ -44,7 +44,12 @@ class TokenState(Enum):
 
 
 class TokenStateManager:
-    """Manages token states to ensure valid JSON output."""
+    """
+    Manages token states to ensure valid JSON output.
+    
+    Reference implementation; inference uses JsonConstraintLogitsProcessor,
+    which applies the same constraint with precomputed masks.
+    """
     
     def __init__(self, tokenizer):
         self.tokenizer = tokenizer
@@ -151,12 +156,169 @@ class TokenStateManager:
         return logits
 
 
+class JsonConstraintTable:
+    """
+    Precomputed token tables shared by all JSON-constraint logits processors.
+    
+    Every allowed-token set used by the constraint is turned into an index
+    tensor once per device, so constraining a decoding step is a gather of
+    the allowed logits, one in-place ``fill_`` of the row and a scatter back,
+    with no per-token Python work and no new vocabulary-sized allocation.
+    """
+    
+    # 生成结束token（与TokenStateManager保持一致）
+    EOS_TOKEN_ID = 151645
+    # 提示中item数量前面的token序列（与TokenStateManager.calc_max_count保持一致）
+    MAX_COUNT_PATTERN = (716, 1203, 842, 428)
+    
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        first_id = lambda text: tokenizer.encode(text)[0]
+        
+        self.left_bracket_id = first_id("{")
+        self.right_bracket_id = first_id("}")
+        self.space_quote_id = first_id(' "')
+        self.quote_colon_quote_id = first_id('":"')
+        self.quote_comma_id = first_id('",')
+        self.main_other_ids = frozenset(first_id(v) for v in ("main", "other"))
+        # 数字token id -> 对应的数字字符
+        self.digit_chars = {first_id(str(d)): str(d) for d in range(10)}
+        
+        # 各状态允许的token集合
+        self.allowed = {
+            "left_bracket": [self.left_bracket_id],
+            "right_bracket": [self.right_bracket_id],
+            "space_quote": [self.space_quote_id],
+            "quote_colon_quote": [self.quote_colon_quote_id],
+            "quote_comma": [self.quote_comma_id],
+            "main_other": [first_id(v) for v in ("main", "other")],
+            "eos": [self.EOS_TOKEN_ID],
+        }
+        for d in range(10):
+            self.allowed[f"digit_{d}"] = list(tokenizer.encode(str(d)))
+        
+        # device -> {state: allowed id tensor}
+        self._index_tensors: Dict[torch.device, Dict[str, torch.Tensor]] = {}
+    
+    def allowed_ids(self, state: str, device: torch.device) -> torch.Tensor:
+        """Return the index tensor of tokens allowed in ``state`` on ``device``."""
+        tensors = self._index_tensors.get(device)
+        if tensors is None:
+            tensors = {
+                name: torch.tensor(ids, dtype=torch.long, device=device)
+                for name, ids in self.allowed.items()
+            }
+            self._index_tensors[device] = tensors
+        return tensors[state]
+    
+    def restrict(self, logits: torch.Tensor, state: str) -> torch.Tensor:
+        """Keep only the logits allowed in ``state`` (in place); the rest become -inf."""
+        ids = self.allowed_ids(state, logits.device)
+        kept = logits.index_select(-1, ids)
+        logits.fill_(-float('inf'))
+        return logits.index_copy_(-1, ids, kept)
+    
+    def parse_max_count(self, prompt_token_ids: List[int]) -> int:
+        """Parse the item count announced in the prompt (scanned once per request)."""
+        pattern = self.MAX_COUNT_PATTERN
+        for idx in range(len(prompt_token_ids) - len(pattern), -1, -1):
+            if all(prompt_token_ids[idx + i] == pattern[i] for i in range(len(pattern))):
+                num_idx = idx + len(pattern)
+                num_ids = []
+                while num_idx < len(prompt_token_ids) and prompt_token_ids[num_idx] in self.digit_chars:
+                    num_ids.append(prompt_token_ids[num_idx])
+                    num_idx += 1
+                return int(self.tokenizer.decode(num_ids))
+        return 1
+
+
+class JsonConstraintLogitsProcessor:
+    """
+    Per-request logits processor that forces ``{"1":"main","2":"other",...}`` output.
+    
+    Produces the same constraint as ``TokenStateManager.process_logit`` but
+    keeps per-request state: the prompt's item count is parsed once and the
+    last emitted numbers are tracked incrementally as tokens are generated,
+    instead of re-decoding the output tail on every step. Create one instance
+    per request.
+    """
+    
+    def __init__(self, table: JsonConstraintTable):
+        self.table = table
+        self._max_count: Optional[int] = None
+        self._consumed = 0
+        self._current_digits = ""  # 末尾正在生成的数字
+        self._last_number: Optional[int] = None  # 末尾数字之前最近一个完整数字
+    
+    def _advance(self, input_ids: List[int]) -> None:
+        """Consume newly generated tokens into the number-tracking state."""
+        if len(input_ids) < self._consumed:
+            # 输出被回退（如抢占后重新计算），从头重建状态
+            self._consumed = 0
+            self._current_digits = ""
+            self._last_number = None
+        
+        digit_chars = self.table.digit_chars
+        for token in input_ids[self._consumed:]:
+            char = digit_chars.get(token)
+            if char is not None:
+                self._current_digits += char
+            elif self._current_digits:
+                self._last_number = int(self._current_digits)
+                self._current_digits = ""
+        self._consumed = len(input_ids)
+    
+    def _last_complete_number(self) -> tuple:
+        """Equivalent of ``TokenStateManager.find_last_complete_number`` on the tracked state."""
+        tail_number = int(self._current_digits) if self._current_digits else -1
+        if self._last_number is None or tail_number == self._last_number + 1:
+            return tail_number, "tail", tail_number
+        return self._last_number, "non_tail", tail_number
+    
+    def __call__(self, prompt_token_ids: List[int], input_ids: List[int], logits: torch.Tensor) -> torch.Tensor:
+        table = self.table
+        if not input_ids:
+            return table.restrict(logits, "left_bracket")
+        
+        self._advance(input_ids)
+        last_token = input_ids[-1]
+        
+        if last_token == table.right_bracket_id:
+            return table.restrict(logits, "eos")
+        elif last_token == table.left_bracket_id:
+            return table.restrict(logits, "space_quote")
+        elif last_token == table.space_quote_id:
+            last_number, _, _ = self._last_complete_number()
+            next_char = '1' if last_number == -1 else str(last_number + 1)[0]
+            return table.restrict(logits, f"digit_{next_char}")
+        elif last_token in table.digit_chars:
+            last_number, state, tail_number = self._last_complete_number()
+            if state == "tail":
+                return table.restrict(logits, "quote_colon_quote")
+            next_char = str(last_number + 1)[len(str(tail_number))]
+            return table.restrict(logits, f"digit_{next_char}")
+        elif last_token == table.quote_colon_quote_id:
+            return table.restrict(logits, "main_other")
+        elif last_token in table.main_other_ids:
+            return table.restrict(logits, "quote_comma")
+        elif last_token == table.quote_comma_id:
+            last_number, _, _ = self._last_complete_number()
+            if self._max_count is None:
+                self._max_count = table.parse_max_count(prompt_token_ids)
+            if last_number >= self._max_count:
+                return table.restrict(logits, "right_bracket")
+            return table.restrict(logits, "space_quote")
+        
+        return logits
+
+
 @extractor("llm-webkit")
 class LlmWebkitExtractor(BaseExtractor):
     """Advanced LLM-WebKit extractor with intelligent content classification."""
     
     version = "2.0.0"
     description = "Advanced LLM-WebKit extractor with intelligent content classification"
+    supports_batch_extract = True
     
     # 分类提示模板
     CLASSIFICATION_PROMPT = """As a front-end engineering expert in HTML, your task is to analyze the given HTML structure and accurately classify elements with the _item_id attribute as either "main" (primary content) or "other" (supplementary content). Your goal is to precisely extract the primary content of the page, ensuring that only the most relevant information is labeled as "main" while excluding navigation, metadata, and other non-essential elements. 
@@ -214,7 +376,7 @@ Output format should be a JSON-formatted string representing a dictionary where
         self.inference_config = LLMInferenceConfig()
         self.model = None
         self.tokenizer = None
-        self.token_state_manager = None
+        self.constraint_table = None
         
         # Override config if provided
         if config:
@@ -407,9 +569,9 @@ Output format should be a JSON-formatted string representing a dictionary where
             
             self.model = LLM(**model_kwargs)
             
-            # 初始化token状态管理器
+            # 初始化JSON约束的token表（各请求的logits processor共享）
             if self.inference_config.use_logits_processor:
-                self.token_state_manager = TokenStateManager(self.tokenizer)
+                self.constraint_table = JsonConstraintTable(self.tokenizer)
             
             # 标记为vLLM模式
             self._use_transformers = False
@@ -533,12 +695,13 @@ Output format should be a JSON-formatted string representing a dictionary where
         except json.JSONDecodeError:
             return {}
     
-    def _reconstruct_content(self, original_html: str, classification_result: Dict[str, int], url: str = None) -> tuple:
+    def _reconstruct_content(self, original_html: str, classification_result: Dict[str, int], url: str = None,
+                             typical_raw_tag_html: str = None) -> tuple:
         """根据分类结果重建主要内容."""
         try:
             # 按照ray_test_qa.py的正确流程
             # 第一步：使用MapItemToHtmlTagsParser生成main_html
-            main_html = self._generate_main_html_with_parser(original_html, classification_result)
+            main_html = self._generate_main_html_with_parser(original_html, classification_result, typical_raw_tag_html)
             print(f"🔧 MapItemToHtmlTagsParser生成的main_html长度: {len(main_html)}")
             
             if not main_html.strip():
@@ -555,12 +718,14 @@ Output format should be a JSON-formatted string representing a dictionary where
             print(f"❌ Content reconstruction failed: {e}")
             return "", []
     
-    def _generate_main_html_with_parser(self, original_html: str, classification_result: Dict[str, int]) -> str:
+    def _generate_main_html_with_parser(self, original_html: str, classification_result: Dict[str, int],
+                                        typical_raw_tag_html: str = None) -> str:
         """使用MapItemToHtmlTagsParser生成main_html（按照ray_test_qa.py的流程）"""
         try:
-            # 获取typical_raw_tag_html (简化的HTML)
-            simplified_html, typical_raw_tag_html, _ = self._simplify_html(original_html)
-            print(f"🔧 simplified HTML长度: {len(simplified_html)}")
+            # 获取typical_raw_tag_html (简化的HTML)，抽取阶段已简化过时直接复用
+            if typical_raw_tag_html is None:
+                simplified_html, typical_raw_tag_html, _ = self._simplify_html(original_html)
+                print(f"🔧 simplified HTML长度: {len(simplified_html)}")
             print(f"🔧 typical_raw_tag_html长度: {len(typical_raw_tag_html)}")
             
             # 按照ray_test_qa.py的流程
@@ -623,23 +788,208 @@ Output format should be a JSON-formatted string representing a dictionary where
             sample = html_or_sample
             
             # 检查是否使用预处理的HTML
-            try:
-                if self.inference_config.use_preprocessed_html:
-                    preprocessed_field = self.inference_config.preprocessed_html_field
-                    
+            if self.inference_config.use_preprocessed_html:
+                preprocessed_field = self.inference_config.preprocessed_html_field
+                try:
                     # 从sample中获取预处理的HTML内容
-                    if hasattr(sample, preprocessed_field):
-                        preprocessed_html = getattr(sample, preprocessed_field)
-                        print(f"📥 使用预处理HTML字段: {preprocessed_field}")
-                        return super().extract(preprocessed_html, sample.url)
-            except Exception as e:
-                return ExtractionResult.create_error_result(
-                    f"访问预处理HTML字段 {preprocessed_field} 时发生异常: {str(e)}"
-                )
+                    if not hasattr(sample, preprocessed_field):
+                        return ExtractionResult.create_error_result(
+                            f"样本缺少预处理HTML字段: {preprocessed_field}"
+                        )
+                    preprocessed_html = getattr(sample, preprocessed_field)
+                    print(f"📥 使用预处理HTML字段: {preprocessed_field}")
+                    return super().extract(preprocessed_html, sample.url)
+                except Exception as e:
+                    return ExtractionResult.create_error_result(
+                        f"访问预处理HTML字段 {preprocessed_field} 时发生异常: {str(e)}"
+                    )
+            
+            # 标准模式：使用样本的原始HTML
+            return super().extract(sample.html, url or sample.url)
         else:
             # 这是普通的HTML字符串，使用标准处理
             return super().extract(html_or_sample, url)
 
+    def batch_extract(self, html_list: List[Any],
+                      url_list: List[str] = None) -> List[ExtractionResult]:
+        """
+        批量抽取：整批HTML简化后通过一次 generate 调用交给vLLM推理，充分利用其连续批处理能力。
+        
+        预处理HTML模式和transformers后端不涉及批量推理，逐条调用extract。
+        
+        Args:
+            html_list: HTML字符串或DataSample对象列表
+            url_list: 可选的URL列表
+            
+        Returns:
+            与输入顺序一致的ExtractionResult列表
+        """
+        if url_list is None:
+            url_list = [None] * len(html_list)
+        
+        if self.inference_config.use_preprocessed_html:
+            return super().batch_extract(html_list, url_list)
+        
+        results: List[Optional[ExtractionResult]] = [None] * len(html_list)
+        # 待推理的样本: (输入下标, html, url, typical_raw_tag_html, item_count, chat_prompt, 预处理耗时)
+        pending = []
+        
+        for i, (html_or_sample, url) in enumerate(zip(html_list, url_list)):
+            start_time = time.time()
+            if type(html_or_sample).__name__ == 'DataSample':
+                html, url = html_or_sample.html, url or html_or_sample.url
+            else:
+                html = html_or_sample
+            
+            if not html or not html.strip():
+                results[i] = ExtractionResult.create_error_result(
+                    "Empty HTML input", extraction_time=time.time() - start_time
+                )
+                continue
+            
+            try:
+                if self.cache is not None:
+                    cached = self.cache.get(self.cache.make_key(self, html, url))
+                    if cached is not None:
+                        results[i] = cached
+                        continue
+                
+                simplified_html, typical_raw_tag_html, item_count, error = self._prepare_classification(html)
+                if error is not None:
+                    error.extraction_time = time.time() - start_time
+                    results[i] = error
+                    continue
+                
+                self._load_model()
+                if getattr(self, '_use_transformers', False):
+                    # transformers后端不支持批量推理，逐条处理
+                    results[i] = super().extract(html, url)
+                    continue
+                
+                chat_prompt = self._add_template(self._create_prompt(simplified_html))
+                pending.append((i, html, url, typical_raw_tag_html, item_count, chat_prompt,
+                                time.time() - start_time))
+            except Exception as e:
+                import traceback
+                results[i] = ExtractionResult.create_error_result(
+                    f"LLM-WebKit extraction failed: {str(e)}",
+                    traceback.format_exc(),
+                    time.time() - start_time
+                )
+        
+        if pending:
+            generate_start = time.time()
+            try:
+                outputs = self.model.generate(
+                    [item[5] for item in pending],
+                    [self._build_sampling_params() for _ in pending]
+                )
+            except Exception as e:
+                import traceback
+                error_traceback = traceback.format_exc()
+                generate_time = (time.time() - generate_start) / len(pending)
+                for i, *_, prepare_time in pending:
+                    results[i] = ExtractionResult.create_error_result(
+                        f"LLM-WebKit extraction failed: {str(e)}",
+                        error_traceback,
+                        prepare_time + generate_time
+                    )
+                return results
+            
+            # 推理耗时按样本数均摊
+            generate_time = (time.time() - generate_start) / len(pending)
+            for (i, html, url, typical_raw_tag_html, item_count, _, prepare_time), output in zip(pending, outputs):
+                start_time = time.time() - prepare_time - generate_time
+                try:
+                    json_result = self._clean_output([output])
+                    results[i] = self._build_result(
+                        html, url, json_result, item_count, start_time, typical_raw_tag_html
+                    )
+                    if self.cache is not None:
+                        self.cache.put(self.cache.make_key(self, html, url), results[i])
+                except Exception as e:
+                    import traceback
+                    results[i] = ExtractionResult.create_error_result(
+                        f"LLM-WebKit extraction failed: {str(e)}",
+                        traceback.format_exc(),
+                        time.time() - start_time
+                    )
+        
+        return results
+
+    def _prepare_classification(self, html: str) -> tuple:
+        """
+        简化HTML并检查item数量限制.
+        
+        Returns:
+            (simplified_html, typical_raw_tag_html, item_count, error_result)，
+            超出限制时error_result为错误结果，否则为None
+        """
+        simplified_html, typical_raw_tag_html, _ = self._simplify_html(html)
+        
+        item_count = simplified_html.count('_item_id')
+        if item_count > self.inference_config.max_item_count:
+            return simplified_html, typical_raw_tag_html, item_count, ExtractionResult.create_error_result(
+                f"HTML too complex: {item_count} items > {self.inference_config.max_item_count} limit"
+            )
+        
+        if item_count == 0:
+            return simplified_html, typical_raw_tag_html, item_count, ExtractionResult.create_error_result(
+                "No _item_id found in simplified HTML"
+            )
+        
+        return simplified_html, typical_raw_tag_html, item_count, None
+
+    def _build_sampling_params(self):
+        """构造单个请求的vLLM采样参数（logits processor有请求级状态，每个请求单独构造）."""
+        if self.inference_config.use_logits_processor and self.constraint_table:
+            return self._SamplingParams(
+                temperature=self.inference_config.temperature,
+                top_p=self.inference_config.top_p,
+                max_tokens=self.inference_config.max_output_tokens,
+                logits_processors=[JsonConstraintLogitsProcessor(self.constraint_table)]
+            )
+        return self._SamplingParams(
+            temperature=self.inference_config.temperature,
+            top_p=self.inference_config.top_p,
+            max_tokens=self.inference_config.max_output_tokens
+        )
+
+    def _build_result(self, html: str, url: Optional[str], json_result: str, item_count: int,
+                      start_time: float, typical_raw_tag_html: str = None) -> ExtractionResult:
+        """根据LLM分类输出重建正文并构造抽取结果."""
+        # 格式转换和内容重建
+        print(f"🔄 开始格式转换...")
+        classification_result = self._reformat_classification_result(json_result)
+        print(f"🔍 格式转换结果: {len(classification_result)} 个分类项")
+        
+        print(f"🔄 开始重建内容...")
+        main_content, content_list = self._reconstruct_content(html, classification_result, url, typical_raw_tag_html)
+        print(f"🔍 重建结果: 主内容长度={len(main_content)}, 内容块数量={len(content_list) if content_list else 0}")
+        
+        # 计算置信度
+        confidence = self._calculate_confidence(main_content, content_list, item_count)
+        
+        extraction_time = time.time() - start_time
+        
+        # 创建结果对象
+        result = ExtractionResult(
+            content=main_content,
+            # content_list=content_list,
+            title=self._extract_title(html),
+            language=self._detect_language(main_content),
+            confidence_score=confidence,
+            extraction_time=extraction_time,
+            success=True
+        )
+        
+        # 添加调试信息到错误消息字段（用于开发调试）
+        debug_info = f"item_count: {item_count}, llm_output_length: {len(json_result)}"
+        if not result.success:
+            result.error_message = f"{result.error_message or ''} | {debug_info}".strip(' |')
+        
+        return result
+
     def _extract_content(self, html: str, url: str = None) -> ExtractionResult:
         """
         使用高级LLM推理提取内容.
@@ -676,18 +1026,10 @@ Output format should be a JSON-formatted string representing a dictionary where
                 return result
             
             # 标准流程：HTML简化 + LLM推理
-            # 步骤1: HTML简化处理
-            simplified_html, typical_raw_tag_html, _ = self._simplify_html(html)
-            
-            # 步骤2: 检查长度限制
-            item_count = simplified_html.count('_item_id')
-            if item_count > self.inference_config.max_item_count:
-                return ExtractionResult.create_error_result(
-                    f"HTML too complex: {item_count} items > {self.inference_config.max_item_count} limit"
-                )
-            
-            if item_count == 0:
-                return ExtractionResult.create_error_result("No _item_id found in simplified HTML")
+            # 步骤1-2: HTML简化处理并检查长度限制
+            simplified_html, typical_raw_tag_html, item_count, error = self._prepare_classification(html)
+            if error is not None:
+                return error
             
             # 步骤3: 延迟加载模型
             self._load_model()
@@ -696,61 +1038,17 @@ Output format should be a JSON-formatted string representing a dictionary where
             prompt = self._create_prompt(simplified_html)
             chat_prompt = self._add_template(prompt)
             
-            # 配置采样参数
-            if self.inference_config.use_logits_processor and self.token_state_manager:
-                sampling_params = self._SamplingParams(
-                    temperature=self.inference_config.temperature,
-                    top_p=self.inference_config.top_p,
-                    max_tokens=self.inference_config.max_output_tokens,
-                    logits_processors=[self.token_state_manager.process_logit]
-                )
-            else:
-                sampling_params = self._SamplingParams(
-                    temperature=self.inference_config.temperature,
-                    top_p=self.inference_config.top_p,
-                    max_tokens=self.inference_config.max_output_tokens
-                )
-            
             # 根据模型类型选择生成方式
             if hasattr(self, '_use_transformers') and self._use_transformers:
                 # 使用transformers生成
                 json_result = self._generate_with_transformers(chat_prompt)
             else:
                 # 使用vLLM生成
-                output = self.model.generate(chat_prompt, sampling_params)
+                output = self.model.generate(chat_prompt, self._build_sampling_params())
                 json_result = self._clean_output(output)
             
             # 步骤5: 格式转换和内容重建
-            print(f"🔄 开始格式转换...")
-            classification_result = self._reformat_classification_result(json_result)
-            print(f"🔍 格式转换结果: {len(classification_result)} 个分类项")
-            
-            print(f"🔄 开始重建内容...")
-            main_content, content_list = self._reconstruct_content(html, classification_result, url)
-            print(f"🔍 重建结果: 主内容长度={len(main_content)}, 内容块数量={len(content_list) if content_list else 0}")
-            
-            # 计算置信度
-            confidence = self._calculate_confidence(main_content, content_list, item_count)
-            
-            extraction_time = time.time() - start_time
-            
-            # 创建结果对象
-            result = ExtractionResult(
-                content=main_content,
-                # content_list=content_list,
-                title=self._extract_title(html),
-                language=self._detect_language(main_content),
-                confidence_score=confidence,
-                extraction_time=extraction_time,
-                success=True
-            )
-            
-            # 添加调试信息到错误消息字段（用于开发调试）
-            debug_info = f"item_count: {item_count}, llm_output_length: {len(json_result)}"
-            if not result.success:
-                result.error_message = f"{result.error_message or ''} | {debug_info}".strip(' |')
-            
-            return result
+            return self._build_result(html, url, json_result, item_count, start_time, typical_raw_tag_html)
             
         except Exception as e:
             extraction_time = time.time() - start_time
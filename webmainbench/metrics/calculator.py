@@ -7,6 +7,7 @@ from .base import BaseMetric, MetricResult
 from .text_metrics import EditDistanceMetric, BLEUMetric, ROUGEMetric, CodeEditMetric, TextEditMetric
 from .table_metrics import TableEditMetric, TableTEDSMetric
 from .formula_metrics import FormulaEditMetric
+from .html_tables import DEFAULT_HTML_PARSER
 
 
 class MetricCalculator:
@@ -25,12 +26,20 @@ class MetricCalculator:
     
     def _setup_default_metrics(self) -> None:
         """Setup default metrics."""
-        # 注册新的内容类型指标
-        self.add_metric("code_edit", CodeEditMetric("code_edit"))
-        self.add_metric("formula_edit", FormulaEditMetric("formula_edit"))
-        self.add_metric("table_edit", TableEditMetric("table_edit"))
-        self.add_metric("table_TEDS", TableTEDSMetric("table_TEDS"))
-        self.add_metric("text_edit", TextEditMetric("text_edit"))
+        # 注册新的内容类型指标（config中以指标名为键的配置传给对应指标）
+        self.add_metric("code_edit", CodeEditMetric("code_edit", self._metric_config("code_edit")))
+        self.add_metric("formula_edit", FormulaEditMetric("formula_edit", self._metric_config("formula_edit")))
+        self.add_metric("table_edit", TableEditMetric("table_edit", self._metric_config("table_edit")))
+        self.add_metric("table_TEDS", TableTEDSMetric("table_TEDS", self._metric_config("table_TEDS")))
+        self.add_metric("text_edit", TextEditMetric("text_edit", self._metric_config("text_edit")))
+    
+    def _metric_config(self, name: str) -> Optional[Dict[str, Any]]:
+        """Config of one default metric; the top-level ``html_parser`` applies to every metric."""
+        metric_config = self.config.get(name)
+        html_parser = self.config.get("html_parser")
+        if html_parser is not None:
+            metric_config = {"html_parser": html_parser, **(metric_config or {})}
+        return metric_config
     
     def add_metric(self, name: str, metric: BaseMetric) -> None:
         """
@@ -101,6 +110,15 @@ class MetricCalculator:
 
         results: Dict[str, MetricResult] = {}
 
+        # 0. 每个样本只分割一次内容，所有内容类型指标共享同一份分割上下文
+        metric_kwargs = {
+            **self._build_split_context(
+                predicted_content, groundtruth_content,
+                predicted_content_list, groundtruth_content_list
+            ),
+            **kwargs,
+        }
+
         # 1. 先计算非表格指标（无依赖关系）
         for metric_name in list(self.metrics.keys()):
             if metric_name in ["table_edit", "table_TEDS"]:
@@ -111,7 +129,7 @@ class MetricCalculator:
                 predicted=predicted_content,
                 groundtruth=groundtruth_content,
                 predicted_content_list=predicted_content_list,
-                groundtruth_content_list=groundtruth_content_list, **kwargs
+                groundtruth_content_list=groundtruth_content_list, **metric_kwargs
             )
             results[metric_name] = result
 
@@ -123,7 +141,7 @@ class MetricCalculator:
                 groundtruth=groundtruth_content,
                 predicted_content_list=predicted_content_list,
                 groundtruth_content_list=groundtruth_content_list,
-                **kwargs
+                **metric_kwargs
             )
             results["table_edit"] = table_edit_result
 
@@ -135,11 +153,17 @@ class MetricCalculator:
                     predicted_content_list=predicted_content_list,
                     groundtruth_content_list=groundtruth_content_list,
                     table_edit_result=table_edit_result,  # 传递依赖结果
-                    **kwargs
+                    **metric_kwargs
                 )
                 results["table_TEDS"] = teds_result
         
         # 3. 计算综合得分（所有成功指标的平均值）
+        self._add_overall(results)
+        
+        return results
+    
+    def _add_overall(self, results: Dict[str, MetricResult]) -> None:
+        """Add the ``overall`` result: the average of all successful metrics."""
         successful_scores = []
         failed_metrics = []
         
@@ -169,8 +193,34 @@ class MetricCalculator:
                 "overall", "All individual metrics failed"
             )
             results["overall"] = overall_result
+    
+    def _build_split_context(self, predicted_content: str,
+                             groundtruth_content: str,
+                             predicted_content_list: List[Dict[str, Any]] = None,
+                             groundtruth_content_list: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Split predicted and groundtruth content once per sample.
         
-        return results
+        The returned kwargs (``predicted_parts`` / ``groundtruth_parts``) are read
+        by the content-type metrics instead of calling ``split_content`` again.
+        Each content type is only joined into a string when a metric reads it.
+        
+        Returns:
+            Split context kwargs, or an empty dict if splitting failed
+        """
+        html_parser = self.config.get("html_parser", DEFAULT_HTML_PARSER)
+        try:
+            return {
+                "predicted_parts": BaseMetric.split_content_spans(
+                    predicted_content, predicted_content_list, html_parser
+                ),
+                "groundtruth_parts": BaseMetric.split_content_spans(
+                    groundtruth_content, groundtruth_content_list, html_parser
+                ),
+            }
+        except Exception:
+            # 分割失败时让各指标自行分割，错误由各指标的错误处理记录
+            return {}
     
     def calculate_batch(self, samples: List[Dict[str, Any]]) -> List[Dict[str, MetricResult]]:
         """
@@ -186,16 +236,48 @@ class MetricCalculator:
         Returns:
             List of metric results for each sample
         """
-        batch_results = []
+        predicted_list = [sample.get('predicted_content', '') for sample in samples]
+        groundtruth_list = [sample.get('groundtruth_content', '') for sample in samples]
+        
+        # 每个样本只分割一次内容，整批样本的每个指标只调用一次 batch_calculate
+        sample_kwargs = []
+        for sample, predicted, groundtruth in zip(samples, predicted_list, groundtruth_list):
+            predicted_content_list = sample.get('predicted_content_list')
+            groundtruth_content_list = sample.get('groundtruth_content_list')
+            sample_kwargs.append({
+                "predicted_content_list": predicted_content_list,
+                "groundtruth_content_list": groundtruth_content_list,
+                **self._build_split_context(
+                    predicted, groundtruth, predicted_content_list, groundtruth_content_list
+                ),
+            })
         
-        for sample in samples:
-            sample_results = self.calculate_all(
-                predicted_content=sample.get('predicted_content', ''),
-                groundtruth_content=sample.get('groundtruth_content', ''),
-                predicted_content_list=sample.get('predicted_content_list'),
-                groundtruth_content_list=sample.get('groundtruth_content_list'),
+        def run(metric_name: str, extra_kwargs: List[Dict[str, Any]] = None) -> List[MetricResult]:
+            kwargs_list = sample_kwargs
+            if extra_kwargs is not None:
+                kwargs_list = [{**kwargs, **extra} for kwargs, extra in zip(sample_kwargs, extra_kwargs)]
+            return self.metrics[metric_name].batch_calculate(
+                predicted_list, groundtruth_list, sample_kwargs=kwargs_list
             )
-            batch_results.append(sample_results)
+        
+        # 指标顺序与 calculate_all 相同：先非表格指标，再 table_edit 和依赖它的 table_TEDS
+        batch_results: List[Dict[str, MetricResult]] = [{} for _ in samples]
+        metric_names = [name for name in self.metrics if name not in ("table_edit", "table_TEDS")]
+        if "table_edit" in self.metrics:
+            metric_names.append("table_edit")
+        for metric_name in metric_names:
+            for sample_results, result in zip(batch_results, run(metric_name)):
+                sample_results[metric_name] = result
+        
+        if "table_edit" in self.metrics and "table_TEDS" in self.metrics:
+            table_edit_kwargs = [
+                {"table_edit_result": sample_results["table_edit"]} for sample_results in batch_results
+            ]
+            for sample_results, result in zip(batch_results, run("table_TEDS", table_edit_kwargs)):
+                sample_results["table_TEDS"] = result
+        
+        for sample_results in batch_results:
+            self._add_overall(sample_results)
         
         return batch_results
     
@@ -2,7 +2,7 @@
 Formula extraction metrics for WebMainBench.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import re
 from .base import BaseMetric, MetricResult
 from .text_metrics import EditDistanceMetric
@@ -17,28 +17,44 @@ class FormulaEditMetric(EditDistanceMetric):
     def _calculate_score(self, predicted: str, groundtruth: str,
                         predicted_content_list: List[Dict[str, Any]] = None,
                         groundtruth_content_list: List[Dict[str, Any]] = None,
+                        predicted_parts: Dict[str, str] = None,
+                        groundtruth_parts: Dict[str, str] = None,
                         **kwargs) -> MetricResult:
         """计算公式的编辑距离"""
         
         # 从content_list中提取公式内容
-        pred_formula = self._extract_formula_content(predicted, predicted_content_list)
-        gt_formula = self._extract_formula_content(groundtruth, groundtruth_content_list)
+        pred_formula, gt_formula = self._extract_pair(predicted, groundtruth,
+                                                      predicted_content_list, groundtruth_content_list,
+                                                      predicted_parts, groundtruth_parts)
         
         # 计算编辑距离
         result = super()._calculate_score(pred_formula, gt_formula, **kwargs)
+        return self._finalize_result(result, pred_formula, gt_formula)
+    
+    def _extract_pair(self, predicted: str, groundtruth: str,
+                      predicted_content_list: List[Dict[str, Any]] = None,
+                      groundtruth_content_list: List[Dict[str, Any]] = None,
+                      predicted_parts: Dict[str, str] = None,
+                      groundtruth_parts: Dict[str, str] = None,
+                      **kwargs) -> Tuple[str, str]:
+        """从预测和真值中提取公式内容"""
+        return (self._extract_formula_content(predicted, predicted_content_list, predicted_parts),
+                self._extract_formula_content(groundtruth, groundtruth_content_list, groundtruth_parts))
+    
+    def _finalize_result(self, result: MetricResult, predicted: str, groundtruth: str) -> MetricResult:
         result.metric_name = self.name
         result.details.update({
-            "predicted_formula_length": len(pred_formula),
-            "groundtruth_formula_length": len(gt_formula),
+            "predicted_formula_length": len(predicted),
+            "groundtruth_formula_length": len(groundtruth),
             "content_type": "formula"
         })
-        
         return result
     
-    def _extract_formula_content(self, text: str, content_list: List[Dict[str, Any]] = None) -> str:
+    def _extract_formula_content(self, text: str, content_list: List[Dict[str, Any]] = None,
+                                 content_parts: Dict[str, str] = None) -> str:
         """从文本和content_list中提取公式内容"""
-        # 使用统一的内容分割方法
-        content_parts = self.split_content(text, content_list)
+        # 使用统一的内容分割方法（有分割上下文时直接复用）
+        content_parts = self._get_content_parts(text, content_list, content_parts)
         return content_parts.get('formula', '')
     
     def _extract_formulas_from_content_list(self, content_list: List[Dict[str, Any]]) -> List[str]:
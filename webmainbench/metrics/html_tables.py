@@ -0,0 +1,332 @@
+"""
+HTML table parsing backends for WebMainBench metrics.
+
+Two backends are available through the ``html_parser`` metric option:
+
+- ``'fast'``: a tag scanner that replays the markup the way
+  BeautifulSoup's ``html.parser`` tree builder does and only builds
+  lightweight elements for ``<table>`` subtrees. Markdown without a
+  ``<table`` is not scanned at all.
+- ``'bs4'`` (default): BeautifulSoup with ``html.parser``, the original
+  behaviour.
+
+Both backends give the same table HTML (``table_edit`` compares it byte for
+byte) and the same TEDS trees. lxml is not used here: libxml2 repairs
+malformed tables differently from ``html.parser`` and would change scores.
+The fast path falls back to BeautifulSoup for markup it does not model
+(comments, declarations, raw-text elements, loose tag syntax, unknown or
+unterminated character references anywhere in the document, ...).
+"""
+
+import re
+from functools import lru_cache
+from html import unescape
+from typing import Dict, List, Optional, Union
+
+from bs4 import BeautifulSoup
+
+HTML_PARSERS = ('fast', 'bs4')
+DEFAULT_HTML_PARSER = 'bs4'
+
+
+def check_html_parser(html_parser: Optional[str]) -> str:
+    """Validate a parser backend name (None selects the default)."""
+    if html_parser is None:
+        return DEFAULT_HTML_PARSER
+    if html_parser not in HTML_PARSERS:
+        raise ValueError(f"Unknown html_parser: {html_parser}, expected one of {HTML_PARSERS}")
+    return html_parser
+
+
+_HAS_TABLE_RE = re.compile(r'<table', re.IGNORECASE)
+
+# 标签扫描只处理规整的标签，其余写法交给 BeautifulSoup
+_TAG_OPEN_RE = re.compile(r'<(?=[a-zA-Z/!?])')
+# 无引号属性值不能以 / 结尾（html.parser 会把 / 算进属性值，而不是自闭合标记）
+_UNQUOTED_VALUE = r'[^\s"\'=<>`]*[^\s"\'=<>`/](?=[\s>])'
+_START_TAG_RE = re.compile(
+    r'<([a-zA-Z][a-zA-Z0-9:-]*)'
+    r'((?:\s+[^\s"\'>/=]+(?:\s*=\s*(?:"[^"]*"|\'[^\']*\'|{unquoted}))?)*)'
+    r'\s*/?>'.format(unquoted=_UNQUOTED_VALUE)
+)
+_ATTR_RE = re.compile(
+    r'\s+([^\s"\'>/=]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|{unquoted}))?'.format(unquoted=_UNQUOTED_VALUE)
+)
+_END_TAG_RE = re.compile(r'</([a-zA-Z][a-zA-Z0-9:-]*)\s*>')
+_NON_WHITESPACE_RE = re.compile(r'\S+')
+_ESCAPE_RE = re.compile(r'[&<>]')
+_ESCAPES = {'&': '&amp;', '<': '&lt;', '>': '&gt;'}
+_ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+# 以分号结尾的实体/字符引用（名称规则同 html.parser 的 entityref）
+_REFERENCE_RE = re.compile(r'&(?:[a-zA-Z][-.a-zA-Z0-9]*|#[0-9]+|#[xX][0-9a-fA-F]+);')
+# html.parser 当作引用处理的 & （其余的 & 是普通文本）
+_REFERENCE_START_RE = re.compile(r'&[a-zA-Z#]')
+
+# BeautifulSoup 立即闭合的空元素
+_VOID_TAGS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+    'menuitem', 'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound',
+    'command', 'frame', 'image', 'isindex', 'nextid', 'spacer',
+})
+# 内容不按普通标签解析（不同 Python 版本的 html.parser 也不同）或文本类型特殊的元素
+_UNSUPPORTED_TAGS = frozenset({
+    'script', 'style', 'textarea', 'title', 'xmp', 'iframe', 'noembed',
+    'noframes', 'noscript', 'plaintext', 'template', 'ruby', 'rt', 'rp',
+})
+# BeautifulSoup 按空白拆分成列表、序列化时以单个空格拼接的多值属性
+_MULTI_VALUED_ATTRS = frozenset({
+    'class', 'accesskey', 'dropzone', 'rel', 'rev', 'headers', 'accept-charset',
+    'archive', 'sizes', 'sandbox', 'for',
+})
+
+
+def _escape(text: str) -> str:
+    return _ESCAPE_RE.sub(lambda m: _ESCAPES[m.group(0)], text)
+
+
+class _Unsupported(Exception):
+    """Raised by the scanner for markup that only BeautifulSoup handles."""
+
+
+@lru_cache(maxsize=1024)
+def _reference_agrees(reference: str) -> bool:
+    """Whether BeautifulSoup decodes the terminated ``reference`` in text like ``html.unescape``."""
+    return BeautifulSoup(f'<p>{reference}</p>', 'html.parser').p.get_text() == unescape(reference)
+
+
+def _unescape_text(data: str) -> str:
+    """
+    Decode references in text data as BeautifulSoup's ``html.parser`` builder does.
+
+    That builder keeps unknown names without their ``;`` and treats
+    unterminated references by context, so every ``&`` must start a
+    terminated reference that decodes the same way in both.
+
+    Raises:
+        _Unsupported: Some ``&`` is not such a reference
+    """
+    if '&' not in data:
+        return data
+    references = _REFERENCE_RE.findall(data)
+    if len(references) != data.count('&') or not all(map(_reference_agrees, references)):
+        raise _Unsupported('&')
+    return unescape(data)
+
+
+def _check_outside_text(data: str) -> None:
+    """
+    Check text outside tables for references that change how the rest is parsed.
+
+    An unterminated ``&#`` makes ``html.parser`` treat the remainder of the
+    document as text (or drop the ``&#``), so outside tables every ``&``
+    followed by a letter or ``#`` must start a terminated reference.
+
+    Raises:
+        _Unsupported: Some such ``&`` is not a terminated reference
+    """
+    if '&' in data and len(_REFERENCE_START_RE.findall(data)) != len(_REFERENCE_RE.findall(data)):
+        raise _Unsupported('&')
+
+
+class TableElement:
+    """
+    Lightweight element built by the fast scanner.
+
+    Mirrors the parts of the BeautifulSoup Tag API used by the metrics:
+    ``name``, ``attrs``, ``children``, ``get_text()`` and ``str()``.
+    """
+
+    __slots__ = ('name', 'attrs', 'children')
+
+    def __init__(self, name: str, attrs: Dict[str, Union[str, List[str]]]):
+        self.name = name
+        self.attrs = attrs
+        self.children: List[Union[str, "TableElement"]] = []
+
+    def get_text(self, separator: str = '', strip: bool = False) -> str:
+        """Same as BeautifulSoup's ``Tag.get_text``."""
+        strings: List[str] = []
+        self._collect_strings(strings, strip)
+        return separator.join(strings)
+
+    def _collect_strings(self, strings: List[str], strip: bool) -> None:
+        for child in self.children:
+            if type(child) is str:
+                if strip:
+                    child = child.strip()
+                    if not child:
+                        continue
+                strings.append(child)
+            else:
+                child._collect_strings(strings, strip)
+
+    def __str__(self) -> str:
+        parts: List[str] = []
+        self._serialize(parts)
+        return ''.join(parts)
+
+    def _serialize(self, parts: List[str]) -> None:
+        """Serialize like ``str(tag)`` with BeautifulSoup's minimal formatter."""
+        parts.append('<' + self.name)
+        for key, value in sorted(self.attrs.items()):
+            if isinstance(value, list):
+                value = ' '.join(value)
+            value = _escape(value)
+            if '"' not in value:
+                parts.append(f' {key}="{value}"')
+            elif "'" not in value:
+                parts.append(f" {key}='{value}'")
+            else:
+                parts.append(' {}="{}"'.format(key, value.replace('"', '&quot;')))
+        if self.name in _VOID_TAGS:
+            parts.append('/>')
+            return
+        parts.append('>')
+        for child in self.children:
+            if type(child) is str:
+                parts.append(_escape(child))
+            else:
+                child._serialize(parts)
+        parts.append(f'</{self.name}>')
+
+
+def _parse_attrs(attr_text: str) -> Dict[str, Union[str, List[str]]]:
+    attrs: Dict[str, Union[str, List[str]]] = {}
+    for match in _ATTR_RE.finditer(attr_text):
+        key = match.group(1).lower()
+        value = match.group(2)
+        if value is None:
+            value = ''
+        else:
+            if value[:1] in ('"', "'"):
+                value = value[1:-1]
+            value = unescape(value)
+        if key in _MULTI_VALUED_ATTRS:
+            value = _NON_WHITESPACE_RE.findall(value)
+        attrs[key] = value  # 重复属性取最后一个值，与 BeautifulSoup 相同
+    return attrs
+
+
+def _scan_tables(text: str) -> List[TableElement]:
+    """
+    Build every ``<table>`` of ``text`` (nested ones included, document order).
+
+    Tags are replayed on an open-element stack the way BeautifulSoup builds
+    its tree with ``html.parser``: end tags close the most recent open
+    element of the same name and everything above it, stray end tags are
+    ignored, void and self-closing tags are never left open, and elements
+    still open at the end of the text are closed there. Only elements inside
+    a table are materialized.
+
+    Raises:
+        _Unsupported: The text contains markup the scanner does not model
+    """
+    tables: List[TableElement] = []
+    names: List[str] = []
+    # 与 names 平行：表格内的元素为 TableElement，表格外为 None
+    elements: List[Optional[TableElement]] = []
+    position = 0
+
+    def add_text(end: int) -> None:
+        if end <= position:
+            return
+        if not elements or elements[-1] is None:
+            _check_outside_text(text[position:end])
+            return
+        data = _unescape_text(text[position:end])
+        if not data.strip(_ASCII_SPACES) and 'pre' not in names:
+            # BeautifulSoup 把纯空白字符串压缩成一个换行或空格
+            data = '\n' if '\n' in data else ' '
+        elements[-1].children.append(data)
+
+    for match in _TAG_OPEN_RE.finditer(text):
+        start = match.start()
+        if start < position:
+            continue
+
+        start_tag = _START_TAG_RE.match(text, start)
+        if start_tag is not None:
+            name = start_tag.group(1).lower()
+            if name in _UNSUPPORTED_TAGS:
+                raise _Unsupported(name)
+            add_text(start)
+            position = start_tag.end()
+
+            parent = elements[-1] if elements else None
+            element = None
+            if parent is not None or name == 'table':
+                # 补上 '>' 供无引号属性值的前瞻匹配
+                element = TableElement(name, _parse_attrs(start_tag.group(2) + '>'))
+                if parent is not None:
+                    parent.children.append(element)
+                if name == 'table':
+                    tables.append(element)
+            if name not in _VOID_TAGS and not start_tag.group(0).endswith('/>'):
+                names.append(name)
+                elements.append(element)
+            continue
+
+        end_tag = _END_TAG_RE.match(text, start)
+        if end_tag is None:
+            raise _Unsupported(text[start:start + 10])
+        name = end_tag.group(1).lower()
+        if name in _VOID_TAGS:
+            # 空元素的结束标签（如 </br>）的处理依赖上文
+            raise _Unsupported(name)
+        add_text(start)
+        position = end_tag.end()
+        for index in range(len(names) - 1, -1, -1):
+            if names[index] == name:
+                del names[index:]
+                del elements[index:]
+                break
+
+    add_text(len(text))
+    return tables
+
+
+def _find_tables_bs4(text: str) -> List[str]:
+    soup = BeautifulSoup(text, "html.parser")
+    return [str(table) for table in soup.find_all("table")]
+
+
+def find_html_tables(text: str, html_parser: str = DEFAULT_HTML_PARSER) -> List[str]:
+    """
+    Serialize every ``<table>`` element of a document, nested ones included.
+
+    The result is the same as ``str(table)`` for each table found by
+    ``BeautifulSoup(text, "html.parser").find_all("table")``.
+
+    Args:
+        text: Markdown or HTML text
+        html_parser: Parser backend, see ``HTML_PARSERS``
+
+    Returns:
+        Serialized tables in document order
+    """
+    if html_parser == 'fast':
+        if not _HAS_TABLE_RE.search(text):
+            return []
+        try:
+            return [str(table) for table in _scan_tables(text)]
+        except _Unsupported:
+            pass
+    return _find_tables_bs4(text)
+
+
+def parse_first_table(html_str: str, html_parser: str = DEFAULT_HTML_PARSER):
+    """
+    Parse ``html_str`` and return its first ``<table>`` element, or None.
+
+    Returns a ``TableElement`` from the fast path or a BeautifulSoup ``Tag``;
+    both expose ``name``, ``attrs``, ``children`` and ``get_text()``.
+    """
+    if html_parser == 'fast':
+        if not _HAS_TABLE_RE.search(html_str):
+            return None
+        try:
+            tables = _scan_tables(html_str)
+            return tables[0] if tables else None
+        except _Unsupported:
+            pass
+    return BeautifulSoup(html_str, 'html.parser').find('table')
@@ -0,0 +1,429 @@
+"""
+Markdown content segmenter for WebMainBench metrics.
+
+Splits a markdown document into typed spans (code, formula, table, text)
+with offsets into the original text. The remaining text is built by slicing
+the uncovered ranges instead of repeatedly calling ``str.replace``, which
+was quadratic in the number of extracted segments.
+"""
+
+import re
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .html_tables import DEFAULT_HTML_PARSER, find_html_tables
+
+# 同时匹配行内代码 `...` 和代码块 ```...```
+_CODE_RE = re.compile(r'(```[\s\S]*?```|`[^`\n]+`)')
+
+# 各公式模式独立匹配整篇文本（匹配之间可以重叠），结果按模式顺序排列
+_FORMULA_RES = [
+    re.compile(r'(?<!\\)\$\$(.*?)(?<!\\)\$\$', re.DOTALL),  # 行间 $$...$$，确保 $ 没有被转义
+    re.compile(r'(?<!\\)\\\[(.*?)(?<!\\)\\\]', re.DOTALL),  # 行间 \[...\]，确保 \ 没有被转义
+    re.compile(r'(?<!\\)\$(.*?)(?<!\\)\$', re.DOTALL),  # 行内 $...$，确保 $ 没有被转义
+    re.compile(r'(?<!\\)\\\((.*?)(?<!\\)\\\)', re.DOTALL),  # 行内 \(...\)，确保 \ 没有被转义
+]
+
+_MD_SEPARATOR_CELL_RE = re.compile(r"^:?\-{3,}:?$")
+_BLANK_LINES_RE = re.compile(r'\n\s*\n')
+
+SEGMENT_KINDS = ('code', 'formula', 'table', 'text')
+# 缺口两侧字符组合的种类少于此数时，在片段中直接查找这些组合，否则逐个位置查索引
+_PAIR_SCAN_LIMIT = 64
+_GRAM_LENGTH = 6
+_GRAM_STEP = 4
+
+
+class Span(NamedTuple):
+    """
+    A typed piece of the document.
+
+    ``text[start:end]`` is the content, unless ``value`` is set (HTML tables
+    are compared in their normalized serialization, which is not a slice).
+    """
+
+    kind: str
+    start: int
+    end: int
+    value: Optional[str] = None
+
+
+class MarkdownSegments:
+    """Result of segmenting one markdown document."""
+
+    def __init__(self, text: str, parts: Dict[str, List[Span]], text_spans: List[Span]):
+        """
+        Args:
+            text: The original document
+            parts: Content spans of code/formula/table, in output order
+            text_spans: Uncovered ranges that make up the remaining text, in document order
+        """
+        self.text = text
+        self.parts = parts
+        self.text_spans = text_spans
+
+    def content(self, span: Span) -> str:
+        """Content string of one span."""
+        return span.value if span.value is not None else self.text[span.start:span.end]
+
+    def join(self, kind: str) -> str:
+        """Content of one kind, parts joined with newlines ('text' is the cleaned remaining text)."""
+        if kind == 'text':
+            remaining = ''.join(self.text[span.start:span.end] for span in self.text_spans)
+            return _BLANK_LINES_RE.sub('\n\n', remaining).strip()
+        return '\n'.join(self.content(span) for span in self.parts[kind])
+
+    def length(self, kind: str) -> int:
+        """Length of ``join(kind)``, computed from the spans for code/formula/table."""
+        if kind == 'text':
+            return len(self.join(kind))
+        spans = self.parts[kind]
+        return sum(
+            len(span.value) if span.value is not None else span.end - span.start for span in spans
+        ) + max(len(spans) - 1, 0)
+
+    def to_dict(self) -> Dict[str, str]:
+        """Same output as ``BaseMetric.split_content``."""
+        return {kind: self.join(kind) for kind in SEGMENT_KINDS}
+
+
+class ContentSplit(Mapping):
+    """
+    ``split_content`` result whose strings are built on first access.
+
+    Behaves like the ``{'code', 'formula', 'table', 'text'}`` dict returned
+    by ``split_content``; kinds that are never read are never joined, and
+    ``length()`` / ``spans()`` work on span offsets without building them.
+    """
+
+    def __init__(self, segments: Optional[MarkdownSegments] = None,
+                 values: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            segments: Segmented markdown to materialize lazily
+            values: Already built strings (e.g. extracted from a content_list)
+        """
+        self.segments = segments
+        self._values: Dict[str, str] = dict(values or {})
+
+    def __getitem__(self, kind: str) -> str:
+        value = self._values.get(kind)
+        if value is None:
+            if kind not in SEGMENT_KINDS:
+                raise KeyError(kind)
+            value = self.segments.join(kind) if self.segments is not None else ''
+            self._values[kind] = value
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(SEGMENT_KINDS)
+
+    def __len__(self) -> int:
+        return len(SEGMENT_KINDS)
+
+    def __repr__(self) -> str:
+        return f"ContentSplit({dict(self)!r})"
+
+    def is_materialized(self, kind: str) -> bool:
+        """Whether the string of ``kind`` has been built."""
+        return kind in self._values
+
+    def length(self, kind: str) -> int:
+        """Length of ``self[kind]``, without building it when possible."""
+        if kind in self._values or self.segments is None:
+            return len(self[kind])
+        return self.segments.length(kind)
+
+    def spans(self, kind: str) -> List[Span]:
+        """Spans of ``kind`` in the original text (empty when built from values)."""
+        if self.segments is None:
+            return []
+        return self.segments.text_spans if kind == 'text' else self.segments.parts[kind]
+
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Offsets of ``text[start:end].strip()``."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+class _Coverage:
+    """
+    Tracks which characters have been removed from the document.
+
+    ``remove`` has the semantics of the previous
+    ``clean_text = clean_text.replace(segment, '', 1)`` loop: it removes the
+    leftmost occurrence of the segment in the remaining text (the characters
+    not removed yet, in order), which may straddle removed ranges. Instead of
+    rebuilding that string, occurrences inside an intact stretch are found
+    in the original text, and occurrences across a removed range (a gap) are
+    looked up by the characters the gap brings together.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.covered = bytearray(len(text))
+        self._search_from: Dict[str, int] = {}
+        # 每隔 _GRAM_STEP 个字符采样的 n-gram -> 出现位置，首次查找时建立
+        self._grams: Optional[Dict[str, List[int]]] = None
+        # 被移除区域两侧的剩余字符下标: 左 -> 右、右 -> 左
+        self._gaps: Dict[int, int] = {}
+        self._gap_lefts: Dict[int, int] = {}
+        # 缺口按 (左侧前一个字符, 两侧字符, 右侧后一个字符) 索引，前后字符为 None 表示不限
+        self._gap_keys: Dict[int, set] = {}
+        self._gaps_by_key: Dict[tuple, set] = {}
+        self._pair_counts: Dict[str, int] = {}
+
+    def is_free(self, start: int, end: int) -> bool:
+        return self.covered.find(1, start, end) < 0
+
+    def remove(self, segment: str) -> None:
+        """Remove the leftmost occurrence of ``segment`` in the remaining text, if any."""
+        if not segment:
+            return
+        best = self._find_free(segment)
+        if len(segment) > 1 and self._gaps:
+            for offset, left in self._gap_candidates(segment):
+                start = self._straddling_start(segment, left, self._gaps[left], offset)
+                if start is not None and (best is None or start < best):
+                    best = start
+        if best is not None:
+            self._cover(self._take_right(best, len(segment)))
+
+    def _find_free(self, segment: str) -> Optional[int]:
+        """Leftmost occurrence of ``segment`` in the original text that is still intact."""
+        # 已移除的区域不会恢复，同一字符串的查找可以从上次的位置继续
+        position = self._search_from.get(segment)
+        if position is None:
+            position = self._first_occurrence(segment)
+        while True:
+            position = self.text.find(segment, position)
+            if position < 0:
+                self._search_from[segment] = len(self.text)
+                return None
+            if self.is_free(position, position + len(segment)):
+                self._search_from[segment] = position
+                return position
+            position += 1
+
+    def _first_occurrence(self, segment: str) -> int:
+        """Leftmost position of ``segment`` in the original text, or its length if absent."""
+        length = len(segment)
+        if length < _GRAM_LENGTH + _GRAM_STEP - 1:
+            position = self.text.find(segment)
+            return position if position >= 0 else len(self.text)
+        if self._grams is None:
+            self._grams = {}
+            for position in range(0, len(self.text) - _GRAM_LENGTH + 1, _GRAM_STEP):
+                self._grams.setdefault(self.text[position:position + _GRAM_LENGTH], []).append(position)
+        # 每个出现位置都覆盖某个采样的 n-gram；按起点对齐方式分组，每组从（至多 8 个）偏移中取最少见的 n-gram
+        stride = _GRAM_STEP * max(1, (length - _GRAM_LENGTH) // (_GRAM_STEP * 8))
+        starts = []
+        for alignment in range(_GRAM_STEP):
+            best_positions, best_offset = None, alignment
+            for offset in range(alignment, length - _GRAM_LENGTH + 1, stride):
+                positions = self._grams.get(segment[offset:offset + _GRAM_LENGTH], ())
+                if best_positions is None or len(positions) < len(best_positions):
+                    best_positions, best_offset = positions, offset
+                    if len(positions) <= 1:
+                        break
+            starts.extend(position - best_offset for position in best_positions if position >= best_offset)
+        for start in sorted(starts):
+            if self.text.startswith(segment, start):
+                return start
+        return len(self.text)
+
+    def _gap_candidates(self, segment: str) -> Iterator[Tuple[int, int]]:
+        """(offset, gap) pairs where ``segment[offset:offset + 2]`` may sit across the gap."""
+        length = len(segment)
+        if len(self._pair_counts) < _PAIR_SCAN_LIMIT:
+            offsets = (offset for pair in self._pair_counts for offset in _find_all(segment, pair))
+        else:
+            offsets = range(length - 1)
+        for offset in offsets:
+            key = (segment[offset - 1] if offset else None, segment[offset:offset + 2],
+                   segment[offset + 2] if offset + 2 < length else None)
+            for left in self._gaps_by_key.get(key, ()):
+                yield offset, left
+
+    def _straddling_start(self, segment: str, left: int, right: int, offset: int) -> Optional[int]:
+        """Start of the occurrence with ``segment[offset]`` at ``left`` and the next character at ``right``."""
+        before = self._take_left(left, offset + 1)
+        after = self._take_right(right, len(segment) - offset - 1)
+        if before is None or after is None:
+            return None
+        if ''.join(self.text[start:end] for start, end in before + after) != segment:
+            return None
+        return before[0][0]
+
+    def _take_right(self, position: int, count: int) -> Optional[List[Tuple[int, int]]]:
+        """Ranges of the ``count`` remaining characters from ``position`` (remaining) onwards."""
+        ranges = []
+        while count:
+            limit = min(len(self.text), position + count)
+            stop = self.covered.find(1, position, limit)
+            end = limit if stop < 0 else stop
+            ranges.append((position, end))
+            count -= end - position
+            if count:
+                position = self.covered.find(0, end)
+                if position < 0:
+                    return None
+        return ranges
+
+    def _take_left(self, position: int, count: int) -> Optional[List[Tuple[int, int]]]:
+        """Ranges of the ``count`` remaining characters ending at ``position`` (remaining)."""
+        ranges = []
+        end = position + 1
+        while count:
+            limit = max(0, end - count)
+            stop = self.covered.rfind(1, limit, end)
+            start = limit if stop < 0 else stop + 1
+            ranges.append((start, end))
+            count -= end - start
+            if count:
+                end = self.covered.rfind(0, 0, start) + 1
+                if end <= 0:
+                    return None
+        ranges.reverse()
+        return ranges
+
+    def _cover(self, ranges: List[Tuple[int, int]]) -> None:
+        """Remove the characters in ``ranges`` and update the gaps around them."""
+        for start, end in ranges:
+            self.covered[start:end] = b'\x01' * (end - start)
+        left = self.covered.rfind(0, 0, ranges[0][0])
+        right = self.covered.find(0, ranges[-1][1])
+        # 左侧为 left 或被移除字符的缺口合并为 (left, right)；相邻缺口的前后字符变化，重建索引
+        for gap_left in [left] + [end - 1 for _, end in ranges]:
+            if gap_left in self._gaps:
+                self._unindex_gap(gap_left)
+                del self._gap_lefts[self._gaps.pop(gap_left)]
+        neighbours = [gap_left for gap_left in (self._gap_lefts.get(left), right if right in self._gaps else None)
+                      if gap_left is not None]
+        for gap_left in neighbours:
+            self._unindex_gap(gap_left)
+        if left >= 0 and right >= 0:
+            self._gaps[left] = right
+            self._gap_lefts[right] = left
+            neighbours.append(left)
+        for gap_left in neighbours:
+            self._index_gap(gap_left)
+
+    def _index_gap(self, left: int) -> None:
+        right = self._gaps[left]
+        pair = self.text[left] + self.text[right]
+        before = self.covered.rfind(0, 0, left)
+        after = self.covered.find(0, right + 1)
+        previous = self.text[before] if before >= 0 else None
+        following = self.text[after] if after >= 0 else None
+        keys = {(previous, pair, following), (None, pair, following), (previous, pair, None), (None, pair, None)}
+        self._gap_keys[left] = keys
+        for key in keys:
+            self._gaps_by_key.setdefault(key, set()).add(left)
+        self._pair_counts[pair] = self._pair_counts.get(pair, 0) + 1
+
+    def _unindex_gap(self, left: int) -> None:
+        for key in self._gap_keys.pop(left):
+            lefts = self._gaps_by_key[key]
+            lefts.discard(left)
+            if not lefts:
+                del self._gaps_by_key[key]
+        pair = self.text[left] + self.text[self._gaps[left]]
+        self._pair_counts[pair] -= 1
+        if not self._pair_counts[pair]:
+            del self._pair_counts[pair]
+
+    def free_spans(self) -> List[Span]:
+        return [
+            Span('text', match.start(), match.end())
+            for match in re.finditer(rb'\x00+', self.covered)
+        ]
+
+
+def _find_all(text: str, pattern: str) -> Iterator[int]:
+    position = text.find(pattern)
+    while position >= 0:
+        yield position
+        position = text.find(pattern, position + 1)
+
+
+def _markdown_tables(text: str) -> List[Tuple[int, int]]:
+    """
+    Offsets of markdown tables: runs of lines with at least three ``|`` whose
+    second line is a separator line.
+    """
+    def is_separator(line: str) -> bool:
+        return all(not part or _MD_SEPARATOR_CELL_RE.match(part)
+                   for part in (p.strip() for p in line.split('|')))
+
+    tables = []
+    block_start = -1
+    block_lines: List[str] = []
+    offset = 0
+    for line in text.split('\n'):
+        if line.count('|') >= 3:
+            if block_start < 0:
+                block_start = offset
+            block_lines.append(line)
+        elif block_start >= 0:
+            if len(block_lines) >= 2 and is_separator(block_lines[1]):
+                tables.append((block_start, offset - 1))
+            block_start = -1
+            block_lines = []
+        offset += len(line) + 1
+
+    if block_start >= 0 and len(block_lines) >= 2 and is_separator(block_lines[1]):
+        tables.append((block_start, len(text)))
+    return tables
+
+
+def segment_markdown(text: str, html_parser: str = DEFAULT_HTML_PARSER) -> MarkdownSegments:
+    """
+    Segment a markdown document into code, formula, table and text spans.
+
+    Args:
+        text: Markdown text
+        html_parser: Parser backend used to find HTML tables
+
+    Returns:
+        MarkdownSegments
+    """
+    coverage = _Coverage(text)
+    parts: Dict[str, List[Span]] = {'code': [], 'formula': [], 'table': []}
+
+    # 代码：代码块保留内部缩进，只去掉首尾的 ``` 行；行内代码去掉反引号和前后空格
+    for match in _CODE_RE.finditer(text):
+        start, end = match.span()
+        coverage.remove(match.group(0))
+        if text.startswith('```', start):
+            first_newline = text.find('\n', start, end)
+            last_newline = text.rfind('\n', start, end)
+            if first_newline < 0 or first_newline == last_newline:
+                continue
+            content_start, content_end = first_newline + 1, last_newline
+        else:
+            content_start, content_end = _strip_span(text, start + 1, end - 1)
+        if content_end > content_start:
+            parts['code'].append(Span('code', content_start, content_end))
+
+    for pattern in _FORMULA_RES:
+        for match in pattern.finditer(text):
+            coverage.remove(match.group(0))
+            content_start, content_end = _strip_span(text, *match.span(1))
+            if content_end > content_start:
+                parts['formula'].append(Span('formula', content_start, content_end))
+
+    # HTML 表格按 BeautifulSoup 的序列化结果比较
+    for html_table in find_html_tables(text, html_parser):
+        coverage.remove(html_table)
+        parts['table'].append(Span('table', 0, 0, html_table))
+
+    for start, end in _markdown_tables(text):
+        coverage.remove(text[start:end])
+        parts['table'].append(Span('table', start, end))
+
+    return MarkdownSegments(text, parts, coverage.free_spans())
@@ -2,7 +2,7 @@
 Table extraction metrics for WebMainBench.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import re
 from .base import BaseMetric, MetricResult
 from .teds_metrics import TEDSMetric, StructureTEDSMetric
@@ -18,28 +18,54 @@ class TableEditMetric(EditDistanceMetric):
     def _calculate_score(self, predicted: str, groundtruth: str,
                         predicted_content_list: List[Dict[str, Any]] = None,
                         groundtruth_content_list: List[Dict[str, Any]] = None,
+                        predicted_parts: Dict[str, str] = None,
+                        groundtruth_parts: Dict[str, str] = None,
                         **kwargs) -> MetricResult:
         """计算表格内容的编辑距离"""
         
-        # 从content_list中提取表格内容
-        pred_table = self._extract_table_content(predicted, predicted_content_list)
-        gt_table = self._extract_table_content(groundtruth, groundtruth_content_list)
+        # 分割结果的长度由分段偏移计算，表格字符串只在需要计算编辑距离时才拼接
+        pred_parts = self._get_content_parts(predicted, predicted_content_list, predicted_parts)
+        gt_parts = self._get_content_parts(groundtruth, groundtruth_content_list, groundtruth_parts)
+        pred_length = self._content_length(pred_parts, 'table')
+        gt_length = self._content_length(gt_parts, 'table')
         
-        # 计算编辑距离
-        result = super()._calculate_score(pred_table, gt_table, **kwargs)
+        if pred_length == 0 or gt_length == 0:
+            # 一侧为空时编辑距离等于另一侧的长度
+            result = self._build_result(max(pred_length, gt_length), pred_length, gt_length)
+        else:
+            pred_table = self._extract_table_content(predicted, predicted_content_list, pred_parts)
+            gt_table = self._extract_table_content(groundtruth, groundtruth_content_list, gt_parts)
+            result = super()._calculate_score(pred_table, gt_table, **kwargs)
+        return self._add_table_details(result, pred_length, gt_length)
+    
+    def _extract_pair(self, predicted: str, groundtruth: str,
+                      predicted_content_list: List[Dict[str, Any]] = None,
+                      groundtruth_content_list: List[Dict[str, Any]] = None,
+                      predicted_parts: Dict[str, str] = None,
+                      groundtruth_parts: Dict[str, str] = None,
+                      **kwargs) -> Tuple[str, str]:
+        """从预测和真值中提取表格内容"""
+        return (self._extract_table_content(predicted, predicted_content_list, predicted_parts),
+                self._extract_table_content(groundtruth, groundtruth_content_list, groundtruth_parts))
+    
+    def _finalize_result(self, result: MetricResult, predicted: str, groundtruth: str) -> MetricResult:
+        return self._add_table_details(result, len(predicted), len(groundtruth))
+    
+    def _add_table_details(self, result: MetricResult, predicted_length: int,
+                           groundtruth_length: int) -> MetricResult:
         result.metric_name = self.name
         result.details.update({
-            "predicted_table_length": len(pred_table),
-            "groundtruth_table_length": len(gt_table),
+            "predicted_table_length": predicted_length,
+            "groundtruth_table_length": groundtruth_length,
             "content_type": "table"
         })
-        
         return result
     
-    def _extract_table_content(self, text: str, content_list: List[Dict[str, Any]] = None) -> str:
+    def _extract_table_content(self, text: str, content_list: List[Dict[str, Any]] = None,
+                               content_parts: Dict[str, str] = None) -> str:
         """从文本和content_list中提取表格内容"""
-        # 使用统一的内容分割方法
-        content_parts = self.split_content(text, content_list)
+        # 使用统一的内容分割方法（有分割上下文时直接复用）
+        content_parts = self._get_content_parts(text, content_list, content_parts)
         return content_parts.get('table', '')
     
     def _extract_tables_from_content_list(self, content_list: List[Dict[str, Any]]) -> List[str]:
@@ -84,12 +110,14 @@ class TableTEDSMetric(TEDSMetric):
     def _calculate_score(self, predicted: str, groundtruth: str,
                         predicted_content_list: List[Dict[str, Any]] = None,
                         groundtruth_content_list: List[Dict[str, Any]] = None,
+                        predicted_parts: Dict[str, str] = None,
+                        groundtruth_parts: Dict[str, str] = None,
                         **kwargs) -> MetricResult:
         """计算表格的TEDS分数"""
         
         # 从content_list中提取表格内容
-        pred_table = self._extract_table_content(predicted, predicted_content_list)
-        gt_table = self._extract_table_content(groundtruth, groundtruth_content_list)
+        pred_table = self._extract_table_content(predicted, predicted_content_list, predicted_parts)
+        gt_table = self._extract_table_content(groundtruth, groundtruth_content_list, groundtruth_parts)
         
         # 使用父类的TEDS计算
         result = super()._calculate_score(pred_table, gt_table, **kwargs)
@@ -101,8 +129,9 @@ class TableTEDSMetric(TEDSMetric):
         
         return result
     
-    def _extract_table_content(self, text: str, content_list: List[Dict[str, Any]] = None) -> str:
+    def _extract_table_content(self, text: str, content_list: List[Dict[str, Any]] = None,
+                               content_parts: Dict[str, str] = None) -> str:
         """从文本和content_list中提取表格内容"""
-        # 使用统一的内容分割方法
-        content_parts = self.split_content(text, content_list)
+        # 使用统一的内容分割方法（有分割上下文时直接复用）
+        content_parts = self._get_content_parts(text, content_list, content_parts)
         return content_parts.get('table', '') 
\ No newline at end of file
@@ -0,0 +1,199 @@
+"""
+Compact array-backed table trees for TEDS.
+
+A parsed table is stored as parallel post-order arrays of small integers
+(interned tag, text and colspan/rowspan ids, parent and sibling links)
+instead of nested dicts, so node equality is an integer comparison and one
+parsed tree serves both content-aware TEDS and structure-only S-TEDS.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from bs4 import NavigableString
+
+from .html_tables import DEFAULT_HTML_PARSER, parse_first_table
+
+
+class _Interner:
+    """
+    Maps hashable values to dense int ids.
+
+    The table is cleared when it grows beyond ``max_size``; ``generation`` is
+    bumped so trees built with older ids can be detected and rebuilt.
+    """
+
+    def __init__(self, max_size: int = 1_000_000):
+        self.max_size = max_size
+        self.generation = 0
+        self._ids: Dict[Any, int] = {}
+
+    def intern(self, value: Any) -> int:
+        value_id = self._ids.get(value)
+        if value_id is None:
+            value_id = len(self._ids)
+            self._ids[value] = value_id
+        return value_id
+
+    def check_capacity(self) -> None:
+        """Clear the table (new generation) if it has grown too large."""
+        if len(self._ids) > self.max_size:
+            self._ids.clear()
+            self.generation += 1
+
+
+_interner = _Interner()
+
+
+class TableTree:
+    """Table tree stored as parallel post-order arrays."""
+
+    __slots__ = (
+        "tags", "texts", "colspans", "rowspans", "parents", "next_siblings",
+        "labels", "structure_labels", "lmld", "sizes", "keyroots", "generation",
+    )
+
+    def __init__(self, nodes: List[Tuple[int, int, int, int]], children: List[List[int]]):
+        """
+        Build from post-order nodes.
+
+        Args:
+            nodes: (tag_id, text_id, colspan_id, rowspan_id) per node, in post-order
+            children: Child node indices of every node
+        """
+        size = len(nodes)
+        columns = np.asarray(nodes, dtype=np.int64).reshape(size, 4)
+        self.tags = columns[:, 0].astype(np.int32)
+        self.texts = columns[:, 1].astype(np.int32)
+        self.colspans = columns[:, 2].astype(np.int32)
+        self.rowspans = columns[:, 3].astype(np.int32)
+
+        parents = np.full(size, -1, dtype=np.int32)
+        next_siblings = np.full(size, -1, dtype=np.int32)
+        lmld = np.arange(size, dtype=np.int64)
+        for index, child_ids in enumerate(children):
+            if child_ids:
+                parents[child_ids] = index
+                next_siblings[child_ids[:-1]] = child_ids[1:]
+                # 后序编号下子节点先于父节点，其最左叶子后代已确定
+                lmld[index] = lmld[child_ids[0]]
+        self.parents = parents
+        self.next_siblings = next_siblings
+        self.lmld = lmld
+        self.sizes = np.arange(size, dtype=np.int64) - lmld + 1
+        # keyroot: 具有相同最左叶子后代的节点中后序编号最大的节点
+        self.keyroots = np.asarray(
+            sorted({l: i for i, l in enumerate(lmld.tolist())}.values()), dtype=np.int64
+        )
+
+        # 节点标签: 相等当且仅当标签、colspan、rowspan（及文本）都相等
+        self.labels = np.fromiter(
+            (_interner.intern(("node", *node)) for node in nodes), dtype=np.int64, count=size
+        )
+        self.structure_labels = np.fromiter(
+            (_interner.intern(("structure", node[0], node[2], node[3])) for node in nodes),
+            dtype=np.int64, count=size
+        )
+        self.generation = _interner.generation
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def label_array(self, structure_only: bool = False) -> np.ndarray:
+        """Node labels to compare; structure-only labels ignore cell text."""
+        return self.structure_labels if structure_only else self.labels
+
+    @classmethod
+    def from_element(cls, element, ignore_nodes: Iterable[str] = ()) -> "TableTree":
+        """
+        Build from a BeautifulSoup element (or a ``TableElement`` from the fast
+        parser), with the same node layout as ``TEDSMetric._element_to_tree``.
+
+        Each node's text is ``get_text(strip=True)`` of its element, computed
+        bottom-up instead of once per node.
+        """
+        ignore_nodes = frozenset(ignore_nodes)
+        intern = _interner.intern
+        nodes: List[Tuple[int, int, int, int]] = []
+        children: List[List[int]] = []
+
+        def walk(el) -> Tuple[List[int], str]:
+            """Convert the children of ``el``; returns (child node ids, text of el)."""
+            child_ids: List[int] = []
+            parts: List[str] = []
+            expand = el.name in ignore_nodes
+            for child in el.children:
+                if type(child) is NavigableString or type(child) is str:
+                    text = child.strip()
+                    if text:
+                        parts.append(text)
+                elif getattr(child, 'name', None):
+                    if expand:
+                        # 忽略节点的子元素本身被跳过，其子节点直接挂到忽略节点下
+                        grandchild_ids, text = walk(child)
+                        child_ids.extend(grandchild_ids)
+                    else:
+                        node_id, text = convert(child)
+                        child_ids.append(node_id)
+                    parts.append(text)
+            return child_ids, ''.join(parts)
+
+        def convert(el) -> Tuple[int, str]:
+            child_ids, text = walk(el)
+            attrs = el.attrs
+            nodes.append((
+                intern(el.name),
+                intern(text),
+                intern(attrs.get('colspan')),
+                intern(attrs.get('rowspan')),
+            ))
+            children.append(child_ids)
+            return len(nodes) - 1, text
+
+        convert(element)
+        return cls(nodes, children)
+
+
+# (html, ignore_nodes, html_parser) -> TableTree，table_TEDS 与 S-TEDS 等变体共享
+_TREE_CACHE_SIZE = 256
+_tree_cache: "OrderedDict[Tuple[str, Tuple[str, ...], str], Optional[TableTree]]" = OrderedDict()
+
+
+def _parse(html_str: str, ignore_nodes: Tuple[str, ...], html_parser: str) -> Optional[TableTree]:
+    key = (html_str, ignore_nodes, html_parser)
+    if key in _tree_cache:
+        tree = _tree_cache[key]
+        if tree is None or tree.generation == _interner.generation:
+            _tree_cache.move_to_end(key)
+            return tree
+
+    if not html_str.strip():
+        tree = None
+    else:
+        try:
+            table = parse_first_table(html_str, html_parser)
+            tree = TableTree.from_element(table, ignore_nodes) if table is not None else None
+        except Exception:
+            tree = None
+
+    _tree_cache[key] = tree
+    if len(_tree_cache) > _TREE_CACHE_SIZE:
+        _tree_cache.popitem(last=False)
+    return tree
+
+
+def parse_table_trees(html_strs: List[str],
+                      ignore_nodes: Iterable[str] = (),
+                      html_parser: str = DEFAULT_HTML_PARSER) -> List[Optional[TableTree]]:
+    """
+    Parse several HTML tables into trees whose ids are comparable.
+
+    Returns None for inputs without a table. Trees are cached by HTML.
+    ``html_parser`` selects the parser backend ('fast' or 'bs4').
+    """
+    ignore_nodes = tuple(ignore_nodes)
+    _interner.check_capacity()
+    trees = [_parse(html_str, ignore_nodes, html_parser) for html_str in html_strs]
+    # 解析过程中intern表不会被清空，同一批树的id可直接比较
+    return trees
@@ -8,12 +8,126 @@ The TEDS algorithm represents tables as tree structures and calculates
 similarity using tree edit distance.
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import re
-from lxml import etree, html
-from lxml.html import HtmlElement
-from bs4 import BeautifulSoup
+import numpy as np
 from .base import BaseMetric, MetricResult
+from .html_tables import check_html_parser, parse_first_table
+from .table_tree import TableTree, parse_table_trees
+
+
+# 批量计算一组keyroot对时，forest距离数组的元素数上限（控制内存）
+_MAX_BATCH_CELLS = 4_000_000
+
+
+def _zhang_shasha(tree1: TableTree, tree2: TableTree, structure_only: bool = False) -> int:
+    """
+    Ordered tree edit distance (unit insert/delete, 0/1 rename) by Zhang–Shasha.
+    
+    Keyroot pairs are grouped by subtree shape and processed in increasing
+    order of ``m + n`` so every distance a group needs is already known.
+    Small shapes are computed for all pairs of a group at once; large ones
+    pair by pair with one vectorised step per row of the forest-distance table.
+    """
+    labels1 = tree1.label_array(structure_only)
+    labels2 = tree2.label_array(structure_only)
+    td = np.zeros((len(tree1), len(tree2)), dtype=np.int64)
+    
+    groups: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]] = {}
+    sizes1 = tree1.sizes[tree1.keyroots]
+    sizes2 = tree2.sizes[tree2.keyroots]
+    for m in np.unique(sizes1):
+        kr1 = tree1.keyroots[sizes1 == m]
+        for n in np.unique(sizes2):
+            kr2 = tree2.keyroots[sizes2 == n]
+            groups[(int(m), int(n))] = (
+                np.repeat(kr1, len(kr2)), np.tile(kr2, len(kr1))
+            )
+    
+    for (m, n), (roots1, roots2) in sorted(groups.items(), key=lambda item: (sum(item[0]), item[0])):
+        pairs = len(roots1)
+        if max(m, n) <= pairs:
+            chunk = max(1, _MAX_BATCH_CELLS // ((m + 1) * (n + 1)))
+            for start in range(0, pairs, chunk):
+                _forest_distance_batch(tree1, tree2, labels1, labels2, td,
+                                       roots1[start:start + chunk], roots2[start:start + chunk], m, n)
+        elif m <= n:
+            for i, j in zip(roots1.tolist(), roots2.tolist()):
+                _forest_distance_rows(tree1, tree2, labels1, labels2, td, i, j)
+        else:
+            # 沿较短的一维迭代：交换两棵树，距离矩阵转置视图
+            for i, j in zip(roots1.tolist(), roots2.tolist()):
+                _forest_distance_rows(tree2, tree1, labels2, labels1, td.T, j, i)
+    
+    return int(td[-1, -1])
+
+
+def _forest_distance_rows(tree1: TableTree, tree2: TableTree,
+                          labels1: np.ndarray, labels2: np.ndarray, td: np.ndarray,
+                          i: int, j: int) -> None:
+    """Forest distances for one keyroot pair, one vectorised step per row."""
+    li = int(tree1.lmld[i])
+    lj = int(tree2.lmld[j])
+    m = i - li + 1
+    n = j - lj + 1
+    
+    cols = np.arange(lj, j + 1)
+    offsets = tree2.lmld[cols] - lj  # 每列对应子森林在fd中的起点
+    tree_cols = offsets == 0
+    tree_col_ids = cols[tree_cols]
+    col_labels = labels2[cols]
+    steps = np.arange(1, n + 1)
+    
+    fd = np.empty((m + 1, n + 1), dtype=np.int64)
+    fd[0] = np.arange(n + 1)
+    for x in range(1, m + 1):
+        ix = li + x - 1
+        p = int(tree1.lmld[ix]) - li
+        prev = fd[x - 1]
+        if p == 0:
+            diag = np.where(
+                tree_cols,
+                prev[:-1] + (col_labels != labels1[ix]),
+                offsets + td[ix, cols]
+            )
+        else:
+            diag = fd[p, offsets] + td[ix, cols]
+        best = np.minimum(prev[1:] + 1, diag)
+        # fd[x][y] = min(best[y], fd[x][y-1] + 1)，用前缀最小值一次算出
+        fd[x, 0] = x
+        fd[x, 1:] = np.minimum(np.minimum.accumulate(best - steps), x) + steps
+        if p == 0:
+            td[ix, tree_col_ids] = fd[x, 1:][tree_cols]
+
+
+def _forest_distance_batch(tree1: TableTree, tree2: TableTree,
+                           labels1: np.ndarray, labels2: np.ndarray, td: np.ndarray,
+                           roots1: np.ndarray, roots2: np.ndarray, m: int, n: int) -> None:
+    """Forest distances for many keyroot pairs of the same shape, cell by cell."""
+    pairs = len(roots1)
+    li = tree1.lmld[roots1]
+    lj = tree2.lmld[roots2]
+    pair_ids = np.arange(pairs)
+    
+    fd = np.empty((pairs, m + 1, n + 1), dtype=np.int64)
+    fd[:, 0, :] = np.arange(n + 1)
+    fd[:, :, 0] = np.arange(m + 1)
+    for x in range(1, m + 1):
+        ix = li + x - 1
+        p = tree1.lmld[ix] - li
+        row_labels = labels1[ix]
+        for y in range(1, n + 1):
+            jy = lj + y - 1
+            q = tree2.lmld[jy] - lj
+            is_tree = (p == 0) & (q == 0)
+            diag = np.where(
+                is_tree,
+                fd[:, x - 1, y - 1] + (row_labels != labels2[jy]),
+                fd[pair_ids, p, q] + td[ix, jy]
+            )
+            value = np.minimum(np.minimum(fd[:, x - 1, y], fd[:, x, y - 1]) + 1, diag)
+            fd[:, x, y] = value
+            td[ix[is_tree], jy[is_tree]] = value[is_tree]
 
 
 class TEDSMetric(BaseMetric):
@@ -26,6 +140,12 @@ class TEDSMetric(BaseMetric):
         """Setup the TEDS metric."""
         self.structure_only = self.config.get('structure_only', False)
         self.ignore_nodes = self.config.get('ignore_nodes', ['tbody', 'thead', 'tfoot'])
+        # 树编辑距离算法: 'zhang_shasha'（标准有序树编辑距离）或 'simple'（旧版自顶向下近似）
+        self.tree_edit_algorithm = self.config.get('tree_edit_algorithm', 'zhang_shasha')
+        if self.tree_edit_algorithm not in ('zhang_shasha', 'simple'):
+            raise ValueError(f"Unknown tree_edit_algorithm: {self.tree_edit_algorithm}")
+        # HTML解析后端: 'fast'（默认，与 html.parser 结果一致的快速扫描）或 'bs4'
+        self.html_parser = check_html_parser(self.config.get('html_parser'))
     
     def _calculate_score(self, predicted: Any, groundtruth: Any, **kwargs) -> MetricResult:
         """
@@ -56,8 +176,13 @@ class TEDSMetric(BaseMetric):
             pred_html = self._normalize_to_html(predicted)
             gt_html = self._normalize_to_html(groundtruth)
 
-            pred_tree = self._parse_html_table(pred_html)
-            gt_tree = self._parse_html_table(gt_html)
+            if self.tree_edit_algorithm == 'zhang_shasha':
+                pred_tree, gt_tree = parse_table_trees(
+                    [pred_html, gt_html], self.ignore_nodes, self.html_parser
+                )
+            else:
+                pred_tree = self._parse_html_table(pred_html)
+                gt_tree = self._parse_html_table(gt_html)
 
             # 后续逻辑保持不变...
             if pred_tree is None and gt_tree is None:
@@ -74,16 +199,23 @@ class TEDSMetric(BaseMetric):
                     details={"note": "One table is empty or invalid"}
                 )
 
-            edit_distance = self._tree_edit_distance(pred_tree, gt_tree)
-            max_nodes = max(self._count_nodes(pred_tree), self._count_nodes(gt_tree))
+            if self.tree_edit_algorithm == 'zhang_shasha':
+                edit_distance = float(_zhang_shasha(pred_tree, gt_tree, self.structure_only))
+                pred_nodes, gt_nodes = len(pred_tree), len(gt_tree)
+            else:
+                edit_distance = self._tree_edit_distance(pred_tree, gt_tree)
+                pred_nodes, gt_nodes = self._count_nodes(pred_tree), self._count_nodes(gt_tree)
+            max_nodes = max(pred_nodes, gt_nodes)
             teds_score = 1.0 - (edit_distance / max_nodes) if max_nodes > 0 else 1.0
 
             details = {
                 "edit_distance": edit_distance,
-                "predicted_nodes": self._count_nodes(pred_tree),
-                "groundtruth_nodes": self._count_nodes(gt_tree),
+                "predicted_nodes": pred_nodes,
+                "groundtruth_nodes": gt_nodes,
                 "max_nodes": max_nodes,
                 "structure_only": self.structure_only,
+                "tree_edit_algorithm": self.tree_edit_algorithm,
+                "html_parser": self.html_parser,
                 "algorithm": "TEDS"
             }
 
@@ -222,9 +354,8 @@ class TEDSMetric(BaseMetric):
             return None
         
         try:
-            # Use BeautifulSoup for more robust HTML parsing
-            soup = BeautifulSoup(html_str, 'html.parser')
-            table = soup.find('table')
+            # BeautifulSoup html.parser, or the equivalent fast scanner
+            table = parse_first_table(html_str, self.html_parser)
             
             if table is None:
                 return None
@@ -256,13 +387,16 @@ class TEDSMetric(BaseMetric):
         return tree
     
     def _count_nodes(self, tree: Dict) -> int:
-        """Count total nodes in tree."""
+        """Count total nodes in tree (cached on the node, trees are built per call)."""
         if tree is None:
             return 0
         
-        count = 1  # Current node
-        for child in tree.get('children', []):
-            count += self._count_nodes(child)
+        count = tree.get('_size')
+        if count is None:
+            count = 1  # Current node
+            for child in tree.get('children', []):
+                count += self._count_nodes(child)
+            tree['_size'] = count
         
         return count
     
@@ -2,12 +2,20 @@
 Text-based metrics for WebMainBench.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import difflib
 import re
 from .base import BaseMetric, MetricResult
 from rapidfuzz.distance import Levenshtein
 
+try:
+    from rapidfuzz.process import cpdist
+except ImportError:  # rapidfuzz < 3.6
+    cpdist = None
+
+# 编辑距离计算方式：exact 完整计算；banded 超过阈值后提前结束；anchored 超长文本按相同行锚定后分段计算
+DISTANCE_MODES = ('exact', 'banded', 'anchored')
+
 class EditDistanceMetric(BaseMetric):
     """Edit distance (Levenshtein distance) metric."""
     
@@ -17,6 +25,15 @@ class EditDistanceMetric(BaseMetric):
     def _setup(self) -> None:
         """Setup the edit distance metric."""
         self.normalize = self.config.get('normalize', True)
+        self.distance_mode = self.config.get('distance_mode', 'exact')
+        if self.distance_mode not in DISTANCE_MODES:
+            raise ValueError(f"Unknown distance_mode: {self.distance_mode}, expected one of {DISTANCE_MODES}")
+        # banded: 编辑距离超过 max_distance_ratio * 较长文本长度 时不再精确计算，按较长文本长度计
+        self.max_distance_ratio = self.config.get('max_distance_ratio', 0.5)
+        # anchored: 较长文本达到该长度时才分段计算，较短的文本仍精确计算
+        self.anchor_min_length = self.config.get('anchor_min_length', 20000)
+        # batch_calculate 中 rapidfuzz 使用的线程数，-1 表示使用全部CPU
+        self.batch_workers = self.config.get('batch_workers', -1)
     
     def _calculate_score(self, predicted: str, groundtruth: str, **kwargs) -> MetricResult:
         """
@@ -35,11 +52,23 @@ class EditDistanceMetric(BaseMetric):
             )
         
         # Calculate edit distance using difflib
-        distance = self._levenshtein_distance(predicted, groundtruth)
-        
+        distance, approximate = self._compute_distance(predicted, groundtruth)
+        return self._build_result(distance, len(predicted), len(groundtruth), approximate)
+
+    def _build_result(self, distance: int, predicted_length: int,
+                      groundtruth_length: int, approximate: bool = False) -> MetricResult:
+        """根据编辑距离和两侧长度构造结果（长度可由分段偏移直接得到，无需构造字符串）"""
+        result = self._build_exact_result(distance, predicted_length, groundtruth_length)
+        if result.success and self.distance_mode != 'exact':
+            result.details["distance_mode"] = self.distance_mode
+            result.details["approximate"] = approximate
+        return result
+
+    def _build_exact_result(self, distance: int, predicted_length: int,
+                            groundtruth_length: int) -> MetricResult:
         # Normalize by the length of the longer string
         if self.normalize:
-            max_len = max(len(predicted), len(groundtruth))
+            max_len = max(predicted_length, groundtruth_length)
             # if max_len == 0:
             #     score = 1.0  # Both strings are empty
             # else:
@@ -57,8 +86,8 @@ class EditDistanceMetric(BaseMetric):
                 score=score,
                 details={
                     "distance": distance,
-                    "predicted_length": len(predicted),
-                    "groundtruth_length": len(groundtruth),
+                    "predicted_length": predicted_length,
+                    "groundtruth_length": groundtruth_length,
                     "normalized": True
                 }
             )
@@ -69,8 +98,8 @@ class EditDistanceMetric(BaseMetric):
 
         details = {
             "distance": distance,
-            "predicted_length": len(predicted),
-            "groundtruth_length": len(groundtruth),
+            "predicted_length": predicted_length,
+            "groundtruth_length": groundtruth_length,
             "normalized": self.normalize,
         }
 
@@ -81,11 +110,120 @@ class EditDistanceMetric(BaseMetric):
             details=details
         )
     
+    def batch_calculate(self, predicted_list: List[Any],
+                        groundtruth_list: List[Any],
+                        sample_kwargs: Optional[List[Dict[str, Any]]] = None,
+                        **kwargs) -> List[MetricResult]:
+        """
+        Calculate the metric for a batch, computing all distances in one call.
+
+        Each pair goes through ``_extract_pair`` and ``_finalize_result`` like
+        ``calculate``, so the results are identical; in 'exact' mode the
+        distances come from one multi-threaded ``rapidfuzz.process.cpdist``.
+
+        Args:
+            predicted_list: List of predicted/extracted content
+            groundtruth_list: List of ground truth content
+            sample_kwargs: Per-sample arguments (content lists, split context)
+            **kwargs: Arguments shared by every sample
+
+        Returns:
+            List of MetricResult instances
+        """
+        results: List[Optional[MetricResult]] = [None] * len(predicted_list)
+        indices = []
+        pairs = []
+        for i, (predicted, groundtruth) in enumerate(zip(predicted_list, groundtruth_list)):
+            try:
+                pair = self._extract_pair(predicted, groundtruth,
+                                          **kwargs, **(sample_kwargs[i] if sample_kwargs else {}))
+            except Exception as e:
+                results[i] = MetricResult.create_error_result(self.name, f"Metric calculation failed: {str(e)}")
+                continue
+            if not isinstance(pair[0], str) or not isinstance(pair[1], str):
+                results[i] = MetricResult.create_error_result(self.name, "Both inputs must be strings")
+                continue
+            indices.append(i)
+            pairs.append(pair)
+
+        for i, (predicted, groundtruth), (distance, approximate) in zip(
+                indices, pairs, self._batch_distances(pairs)):
+            result = self._build_result(distance, len(predicted), len(groundtruth), approximate)
+            results[i] = self._finalize_result(result, predicted, groundtruth)
+        return results
+
+    def _batch_distances(self, pairs: List[Tuple[str, str]]) -> List[Tuple[int, bool]]:
+        """(distance, approximate) of every pair, via cpdist when the mode allows it."""
+        uses_default_distance = type(self)._levenshtein_distance is EditDistanceMetric._levenshtein_distance
+        if not pairs or self.distance_mode != 'exact' or cpdist is None or not uses_default_distance:
+            # banded 的阈值随每对文本的长度变化，anchored 需要逐对分段，逐对计算
+            return [self._compute_distance(predicted, groundtruth) for predicted, groundtruth in pairs]
+        distances = cpdist(
+            [predicted for predicted, _ in pairs],
+            [groundtruth for _, groundtruth in pairs],
+            scorer=Levenshtein.distance,
+            workers=self.batch_workers,
+        )
+        return [(distance, False) for distance in distances.tolist()]
+
+    def _extract_pair(self, predicted: Any, groundtruth: Any, **kwargs) -> Tuple[Any, Any]:
+        """The two texts to compare; content-type metrics extract their part here."""
+        return predicted, groundtruth
+
+    def _finalize_result(self, result: MetricResult, predicted: str, groundtruth: str) -> MetricResult:
+        """Add metric-specific details to the result of one pair."""
+        return result
+
     def _levenshtein_distance(self, s1: str, s2: str) -> int:
         """Calculate Levenshtein distance between two strings."""
 
         return Levenshtein.distance(s1, s2)
 
+    def _compute_distance(self, s1: str, s2: str) -> Tuple[int, bool]:
+        """
+        Edit distance according to ``distance_mode``.
+
+        Returns:
+            (distance, approximate). Approximate distances are upper bounds, so
+            the score is a lower bound: in 'banded' mode a distance above the
+            cutoff is reported as the length of the longer text (score 0); in
+            'anchored' mode it is the cost of a line-anchored alignment.
+        """
+        max_len = max(len(s1), len(s2))
+        if self.distance_mode == 'banded':
+            cutoff = int(self.max_distance_ratio * max_len)
+            distance = Levenshtein.distance(s1, s2, score_cutoff=cutoff)
+            if distance > cutoff:
+                return max_len, True
+            return distance, False
+        if self.distance_mode == 'anchored' and max_len >= self.anchor_min_length:
+            return self._anchored_distance(s1, s2), True
+        return self._levenshtein_distance(s1, s2), False
+
+    def _anchored_distance(self, s1: str, s2: str) -> int:
+        """
+        Edit distance of an alignment anchored on identical lines.
+
+        Lines are aligned first (one Levenshtein over line sequences); lines that
+        match exactly cost nothing and the text between two anchors is compared
+        character by character.
+        """
+        lines1 = s1.splitlines(keepends=True)
+        lines2 = s2.splitlines(keepends=True)
+        distance = 0
+        gap = None  # 当前未匹配区间的起点 (i, j)
+        for tag, i1, i2, j1, j2 in Levenshtein.opcodes(lines1, lines2):
+            if tag != 'equal':
+                if gap is None:
+                    gap = (i1, j1)
+                continue
+            if gap is not None:
+                distance += Levenshtein.distance(''.join(lines1[gap[0]:i1]), ''.join(lines2[gap[1]:j1]))
+                gap = None
+        if gap is not None:
+            distance += Levenshtein.distance(''.join(lines1[gap[0]:]), ''.join(lines2[gap[1]:]))
+        return distance
+
 
 
 class BLEUMetric(BaseMetric):
@@ -222,28 +360,44 @@ class CodeEditMetric(EditDistanceMetric):
     def _calculate_score(self, predicted: str, groundtruth: str, 
                         predicted_content_list: List[Dict[str, Any]] = None,
                         groundtruth_content_list: List[Dict[str, Any]] = None,
+                        predicted_parts: Dict[str, str] = None,
+                        groundtruth_parts: Dict[str, str] = None,
                         **kwargs) -> MetricResult:
         """计算代码块的编辑距离"""
         
         # 从content_list中提取代码内容
-        pred_code = self._extract_code_content(predicted, predicted_content_list)
-        gt_code = self._extract_code_content(groundtruth, groundtruth_content_list)
+        pred_code, gt_code = self._extract_pair(predicted, groundtruth,
+                                                predicted_content_list, groundtruth_content_list,
+                                                predicted_parts, groundtruth_parts)
         
         # 计算编辑距离
         result = super()._calculate_score(pred_code, gt_code, **kwargs)
+        return self._finalize_result(result, pred_code, gt_code)
+    
+    def _extract_pair(self, predicted: str, groundtruth: str,
+                      predicted_content_list: List[Dict[str, Any]] = None,
+                      groundtruth_content_list: List[Dict[str, Any]] = None,
+                      predicted_parts: Dict[str, str] = None,
+                      groundtruth_parts: Dict[str, str] = None,
+                      **kwargs) -> Tuple[str, str]:
+        """从预测和真值中提取代码内容"""
+        return (self._extract_code_content(predicted, predicted_content_list, predicted_parts),
+                self._extract_code_content(groundtruth, groundtruth_content_list, groundtruth_parts))
+    
+    def _finalize_result(self, result: MetricResult, predicted: str, groundtruth: str) -> MetricResult:
         result.metric_name = self.name
         result.details.update({
-            "predicted_code_length": len(pred_code),
-            "groundtruth_code_length": len(gt_code),
+            "predicted_code_length": len(predicted),
+            "groundtruth_code_length": len(groundtruth),
             "content_type": "code"
         })
-        
         return result
     
-    def _extract_code_content(self, text: str, content_list: List[Dict[str, Any]] = None) -> str:
+    def _extract_code_content(self, text: str, content_list: List[Dict[str, Any]] = None,
+                              content_parts: Dict[str, str] = None) -> str:
         """从文本和content_list中提取代码内容"""
-        # 使用统一的内容分割方法
-        content_parts = self.split_content(text, content_list)
+        # 使用统一的内容分割方法（有分割上下文时直接复用）
+        content_parts = self._get_content_parts(text, content_list, content_parts)
         return content_parts.get('code', '')
     
     def _extract_codes_from_content_list(self, content_list: List[Dict[str, Any]]) -> List[str]:
@@ -288,28 +442,44 @@ class TextEditMetric(EditDistanceMetric):
     def _calculate_score(self, predicted: str, groundtruth: str,
                         predicted_content_list: List[Dict[str, Any]] = None,
                         groundtruth_content_list: List[Dict[str, Any]] = None,
+                        predicted_parts: Dict[str, str] = None,
+                        groundtruth_parts: Dict[str, str] = None,
                         **kwargs) -> MetricResult:
         """计算纯文本的编辑距离"""
         
         # 从文本中移除代码、表格、公式
-        pred_text = self._extract_pure_text(predicted, predicted_content_list)
-        gt_text = self._extract_pure_text(groundtruth, groundtruth_content_list)
+        pred_text, gt_text = self._extract_pair(predicted, groundtruth,
+                                                predicted_content_list, groundtruth_content_list,
+                                                predicted_parts, groundtruth_parts)
         
         # 计算编辑距离
         result = super()._calculate_score(pred_text, gt_text, **kwargs)
+        return self._finalize_result(result, pred_text, gt_text)
+    
+    def _extract_pair(self, predicted: str, groundtruth: str,
+                      predicted_content_list: List[Dict[str, Any]] = None,
+                      groundtruth_content_list: List[Dict[str, Any]] = None,
+                      predicted_parts: Dict[str, str] = None,
+                      groundtruth_parts: Dict[str, str] = None,
+                      **kwargs) -> Tuple[str, str]:
+        """从预测和真值中提取纯文本内容"""
+        return (self._extract_pure_text(predicted, predicted_content_list, predicted_parts),
+                self._extract_pure_text(groundtruth, groundtruth_content_list, groundtruth_parts))
+    
+    def _finalize_result(self, result: MetricResult, predicted: str, groundtruth: str) -> MetricResult:
         result.metric_name = self.name
         result.details.update({
-            "predicted_text_length": len(pred_text),
-            "groundtruth_text_length": len(gt_text),
+            "predicted_text_length": len(predicted),
+            "groundtruth_text_length": len(groundtruth),
             "content_type": "text"
         })
-        
         return result
     
-    def _extract_pure_text(self, text: str, content_list: List[Dict[str, Any]] = None) -> str:
+    def _extract_pure_text(self, text: str, content_list: List[Dict[str, Any]] = None,
+                           content_parts: Dict[str, str] = None) -> str:
         """提取纯文本内容（排除代码、表格、公式）"""
-        # 使用统一的内容分割方法
-        content_parts = self.split_content(text, content_list)
+        # 使用统一的内容分割方法（有分割上下文时直接复用）
+        content_parts = self._get_content_parts(text, content_list, content_parts)
         return content_parts.get('text', '')
     
     def _extract_text_from_content_list(self, content_list: List[Dict[str, Any]]) -> List[str]:
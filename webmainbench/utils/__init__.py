@@ -2,10 +2,11 @@
 Utility functions for WebMainBench.
 """
 
-from .helpers import setup_logging, validate_config, format_results
+from .helpers import setup_logging, validate_config, format_results, with_slots
 
 __all__ = [
     "setup_logging",
     "validate_config", 
     "format_results",
+    "with_slots",
 ] 
\ No newline at end of file
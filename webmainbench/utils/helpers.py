@@ -2,6 +2,7 @@
 Helper functions for WebMainBench.
 """
 
+import dataclasses
 import logging
 import sys
 from typing import Dict, Any, List
@@ -61,6 +62,25 @@ def validate_config(config: Dict[str, Any], required_keys: List[str]) -> bool:
     return True
 
 
+def with_slots(cls: type) -> type:
+    """
+    Rebuild a dataclass with ``__slots__`` for its fields.
+
+    Equivalent to ``@dataclass(slots=True)``, which needs Python 3.10. Apply
+    it on top of ``@dataclass``. Instances have no ``__dict__``, so only the
+    declared fields can be assigned.
+    """
+    field_names = tuple(f.name for f in dataclasses.fields(cls))
+    namespace = dict(cls.__dict__)
+    # 字段默认值已保存在 __init__ 和 __dataclass_fields__ 中，类属性会与 slot 冲突
+    for name in field_names:
+        namespace.pop(name, None)
+    namespace.pop('__dict__', None)
+    namespace.pop('__weakref__', None)
+    namespace['__slots__'] = field_names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
 def format_results(results: Dict[str, Any], precision: int = 4) -> str:
     """
     Format evaluation results for display.